@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark a whole crawl end to end, without the live site or a browser. A `replay_server` serves
+a site built from the saved pages in `benchmarks/fixtures` (or the pages recorded in a
+`page_cache`), and `create_index` crawls its paginated listing before `scrape_index` downloads
+every article it found. Each scenario replays the site with a different mix of injected latency,
+429s, 503s and dropped connections, and runs in a fresh process, so its CPU time and peak RSS
+only cover that crawl. The articles/min, CPU time, peak RSS and bytes written of every run are
+appended to a JSON lines file, and compared with the last run of the same benchmark, so a
+regression shows up between two versions of the crawler.
+
+Run from the repository root with:
+    python benchmarks/bench_crawl.py [--articles 600] [--concurrency 8] [--scenarios clean flaky]
+
+To replay a recorded crawl instead, crawl the site with a `page_cache` and pass its folder:
+    python benchmarks/bench_crawl.py --cache ./cache --home https://www.coindesk.com
+                                     --listing "/category/markets/{page}"
+"""
+import argparse, datetime as dt, json, os, platform, random, subprocess, sys, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import multiprocessing
+
+## The package, and `FixtureSite` from the helpers the tests share in `tests/sites.py`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+from scrape_coindesk.replay import replay_server
+from sites import FixtureSite
+
+try:
+    import resource     # Peak RSS, not available on Windows
+except ImportError:
+    resource = None
+
+RESULTS  = os.path.join(ROOT, 'benchmarks', 'results', 'bench_crawl.jsonl')
+
+## The faults each scenario injects into the replayed site. `jittery` is left out of the default
+## run: the `crawl_scheduler` slows down whenever the response time climbs past twice the best one
+## seen, so a latency that varies that much holds the crawl near its slowest rate.
+SCENARIOS = {
+    'clean':     dict(latency=.01),
+    'throttled': dict(latency=.01, throttle_rate=.03),
+    'flaky':     dict(latency=.01, failure_rate=.03, drop_rate=.02),
+    'slow':      dict(latency=.1),
+    'jittery':   dict(latency=(.005, .05)),
+}
+
+def FolderBytes(folder):
+    return sum(os.path.getsize(os.path.join(root, file))
+               for root, _, files in os.walk(folder) for file in files)
+
+def Crawl(url, listing, concurrency, rate):
+    ## Index and download the replayed site in this (fresh) process, and return its numbers
+    from scrape_coindesk import create_index, scrape_index, crawl_metrics
+
+    ## The retry backoff is jittered, seed it so the retries wait the same between runs
+    random.seed(0)
+    metrics = crawl_metrics()
+    with tempfile.TemporaryDirectory() as folder, open(os.devnull, 'w') as devnull:
+        start, cpu = time.perf_counter(), time.process_time()
+        with redirect_stdout(devnull):
+            ci = create_index(url + listing.format(page=1), url, page_url=url + listing,
+                              requests_per_second=rate, metrics=metrics).go()
+            indexed = time.perf_counter() - start
+            scrape_index(ci.articles, url, folder, concurrency=concurrency, requests_per_second=rate,
+                         browser_fallback=False, metrics=metrics).scrape()
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+        written   = FolderBytes(folder)
+
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / 2**20 if sys.platform == 'darwin' else peak / 2**10   # bytes on macOS, KB elsewhere
+
+    counters = metrics.counters
+    return {'indexed': len(ci.articles), 'articles': counters['articles_written'],
+            'articles_per_min': 60 * counters['articles_written'] / wall, 'wall_seconds': wall,
+            'index_seconds': indexed, 'cpu_seconds': cpu, 'peak_rss_mb': peak,
+            'bytes_written': written, 'requests': counters['requests'],
+            'retries': counters['retries'], 'failures': counters['failures']}
+
+def Version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def Previous(results_path, settings):
+    ## The last saved run of the same benchmark settings, or None
+    previous = None
+    if os.path.exists(results_path):
+        with open(results_path, encoding='utf-8') as f:
+            for line in f:
+                run = json.loads(line)
+                if run['settings'] == settings:
+                    previous = run
+    return previous
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--articles', type=int, default=600)
+    parser.add_argument('--per-page', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=50,
+                        help="The starting requests per second of the crawl.")
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS),
+                        default=['clean', 'throttled', 'flaky', 'slow'])
+    parser.add_argument('--cache', help="Replay the pages recorded in this `page_cache` folder.")
+    parser.add_argument('--home', help="The home page the `--cache` pages were recorded from.")
+    parser.add_argument('--listing', default='/markets/{page}',
+                        help="The path of the listing pages, with a {page} placeholder.")
+    parser.add_argument('--results', default=RESULTS,
+                        help="The JSON lines file the runs are appended to and compared with.")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    if args.cache is None:
+        pages = FixtureSite(args.articles, args.per_page, args.listing)
+        site  = f"{args.articles:,} fixture articles, {args.per_page} to a listing page"
+    else:
+        pages = args.cache
+        site  = f"the pages recorded in {args.cache} from {args.home}"
+
+    settings = {'site': site, 'listing': args.listing, 'concurrency': args.concurrency,
+                'rate': args.rate, 'retry_after': args.retry_after, 'scenarios': args.scenarios}
+    previous = Previous(args.results, settings)
+    print(f"Crawling {site}, {args.concurrency} workers"
+          + (f", compared with {previous['version']} ({previous['date']})" if previous else ""))
+    print(f"{'scenario':<11}{'articles':>9}{'art/min':>10}{'wall s':>8}{'cpu s':>8}"
+          f"{'peak MB':>9}{'MB out':>8}{'retries':>9}{'failed':>8}{'vs last':>9}")
+
+    results = {}
+    spawn   = multiprocessing.get_context('spawn')
+    for name in args.scenarios:
+        ### A fresh process for every crawl, so the peak RSS is that crawl's own
+        with replay_server(pages, args.home, retry_after=args.retry_after, **SCENARIOS[name]) as server:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as worker:
+                result = worker.submit(Crawl, server.url, args.listing, args.concurrency, args.rate).result()
+            result['server'] = dict(server.stats)
+        results[name] = result
+
+        peak   = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else '-'
+        change = ''
+        if previous is not None and name in previous['results']:
+            change = f"{result['articles_per_min'] / previous['results'][name]['articles_per_min'] - 1:+.1%}"
+        print(f"{name:<11}{result['articles']:>9,}{result['articles_per_min']:>10,.0f}"
+              f"{result['wall_seconds']:>8.1f}{result['cpu_seconds']:>8.1f}{peak:>9}"
+              f"{result['bytes_written'] / 1e6:>8.1f}{result['retries']:>9,}{result['failures']:>8,}"
+              f"{change:>9}")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        run = {'version': Version(), 'date': dt.datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(), 'platform': platform.platform(),
+               'settings': settings, 'results': results}
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run) + '\n')
+        print(f"Saved to {args.results}")
+
+if __name__ == "__main__":
+    main()
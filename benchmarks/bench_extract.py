@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the compiled, single-pass extraction functions (`ArticleLinks` and `ExtractArticle`)
+against the original regex + `str.replace` loops they replaced. Both versions are run over the
+saved pages in `benchmarks/fixtures`, their output is checked to be identical, and the
+throughput of each is reported in pages/sec and MB/sec.
+
+Run from the repository root with:
+    python benchmarks/bench_extract.py [--repeat 200]
+"""
+import argparse, glob, os, re, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrape_coindesk import extract as cca
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+## The original extraction code, kept verbatim so the comparison stays honest
+def LegacyCustomCheck(title):
+    approx_matchs = ['Articles by ', 'articles by']
+    exact_matches = ['About', 'Advertise', 'Masthead', 'Ethics Policy', 'Contributors',
+                     'Events', 'Terms &amp; Conditions', 'Privacy Policy',
+                     "'Newsletters'", 'Newsletters', 'Terms amp; Conditions']
+    for word in approx_matchs:
+        if word in title:
+            return True
+    for word in exact_matches:
+        if word == title:
+            return True
+    return False
+
+def LegacyArticleLinks(page):
+    links = []
+    for art in re.findall("<a title=.*? href=.+?>", page):
+        title = re.search('title=.+?"', art).group(0)
+        for x in ["title=", "?", "$", "\\", "/", "|", "*", "&", "nbsp", "<", ">"]:
+            title = title.replace(x, "")
+            title = title.replace('"', "")
+        title = title.replace(':', ";")
+        link = re.search('href=.+?"', art).group(0)
+        link = link.replace("href=", "")
+        link = link.replace('"', "")
+        if LegacyCustomCheck(title) == False:
+            links.append((title, link))
+    return links
+
+def LegacyExtractArticle(page):
+    article_text = re.findall('<div class="article-hero-headline">.*?</h1>|' + \
+                              '<h5 class="heading">.*?</h5>|' + \
+                              '<div class="article-hero-datetime">.*?</time>|' + \
+                              'class="article-pharagraph">.*?</p>|' + \
+                              'class="article-list">.*?</ul>|' + \
+                              '<p>.*?</p>|' + '<p class="head2">.*?</p>|' + \
+                              '<p dir="ltr">.*?</p>|' + \
+                              '<p style="null.*?>.*?</p>|' + \
+                              'class="article-heading">.+?</h2>', page)
+    cleaned_article = []
+    for line in article_text:
+        line    = line.encode('unicode_escape').decode('ascii')
+        cleaned = line.replace('<div class="article-hero-headline">', 'Title: ')
+        cleaned = cleaned.replace('<h5 class="heading">', 'Author: ')
+        cleaned = cleaned.replace('<div class="article-hero-datetime">', 'Datetime: ')
+        for x in ['class="article-pharagraph">', 'class="article-heading">',
+                  'class="article-list">', '<.+?>', '&nbsp;', '&amp',
+                  r"\\u(.){4}", r"'\\u(.){4}'",
+                  'Please consider using a different web browser for better experience.',
+                  'Sign up for our newsletters', 'Image via', 'Shutterstock',
+                  'This report has been updated.']:
+            cleaned = re.sub(x, ' ', cleaned)
+        cleaned = cleaned.replace(' .', '.')
+        cleaned_article.append(cleaned.replace('  ', ' ').strip())
+    return [line for line in cleaned_article if line != '']
+
+def Throughput(func, pages, repeat):
+    ## Run `func` over every page `repeat` times and return (pages/sec, MB/sec)
+    n_bytes = sum(len(page.encode('utf-8')) for page in pages)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            func(page)
+    elapsed = time.perf_counter() - start
+    return repeat * len(pages) / elapsed, repeat * n_bytes / elapsed / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    def Load(pattern):
+        pages = []
+        for file in sorted(glob.glob(os.path.join(FIXTURES, pattern))):
+            with open(file, encoding='utf-8') as f:
+                pages.append(f.read())
+        return pages
+
+    cases = [('listing', Load('*listing*.html'), LegacyArticleLinks, lambda p: list(cca.ArticleLinks(p))),
+             ('article', Load('*article*.html'), LegacyExtractArticle, cca.ExtractArticle)]
+
+    print(f"{'pages':<10}{'version':<10}{'pages/sec':>12}{'MB/sec':>10}{'speedup':>10}")
+    for name, pages, legacy, current in cases:
+        for page in pages:
+            assert legacy(page) == current(page), f"{name} output differs from the original code"
+
+        old_pps, old_mbs = Throughput(legacy, pages, args.repeat)
+        new_pps, new_mbs = Throughput(current, pages, args.repeat)
+        print(f"{name:<10}{'original':<10}{old_pps:>12,.0f}{old_mbs:>10.2f}{'':>10}")
+        print(f"{name:<10}{'compiled':<10}{new_pps:>12,.0f}{new_mbs:>10.2f}{new_pps/old_pps:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
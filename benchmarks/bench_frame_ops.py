@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the per-row pandas work in `create_index.page_source` and `scrape_index.scrape`
+against the column-wise code in `scrape_coindesk.crawl` that replaced it:
+
+- `index`      : the original dict -> DataFrame build plus `DataFrame.apply(FullLink, axis=1)`,
+                 vs. `ArticleIndex`, which canonicalizes the link column with string operations
+                 and keys the articles on their canonical `FullLink`
+- `exists`     : one `path.exists` + `.loc` write per title vs. `SavedFiles`, one `os.listdir`
+                 + `isin` over the `File` column
+- `status`     : one `.loc[title, 'Downloaded'] = True` per download vs. `download_status`,
+                 which writes to an array by position and saves it to the column once
+
+The original row-by-row code gets very slow at large sizes, so by default it is timed on at most
+`--legacy-cap` rows and scaled linearly to the full size (marked with `*`).
+
+Run from the repository root with:
+    python benchmarks/bench_frame_ops.py [--sizes 10000 100000 1000000] [--legacy-cap 20000]
+"""
+import argparse, os, shutil, sys, tempfile, time
+from os import path
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrape_coindesk.crawl import ArticleIndex, SavedFiles, download_status
+
+HOME = 'https://www.coindesk.com'
+
+## The original row-by-row code, kept verbatim so the comparison stays honest
+def FullLink(lst):
+    full_link = ""
+    for i in lst:
+        full_link += i
+    return full_link
+
+def LegacyIndex(links, master_site):
+    article_links = {}
+    for title, link in links:
+        article_links[title] = [master_site, '', '', '', link]
+    articles = pd.DataFrame(article_links).T
+    articles.columns = ['Master Site', 'Extension_1', 'Extension_2', 'Extension_3', 'Href']
+    articles.loc[:, 'Downloaded'] = False
+    articles.loc[:, 'FullLink'] = articles.apply(lambda x: FullLink([x['Master Site'], x.Href]), axis=1)
+    return articles
+
+def LegacyExists(articles, download_folder):
+    articles.loc[:, 'Downloaded'] = False
+    for title in articles.index:
+        file_name = f"{title}.txt"
+        full_name = os.path.join(download_folder, file_name)
+        if path.exists(full_name):
+            articles.loc[title, 'Downloaded'] = True
+
+def LegacyStatus(articles):
+    for title in articles.index:
+        articles.loc[title, 'Downloaded'] = True
+
+## The shipped code, as `scrape_index.scrape` calls it
+def NewExists(articles, download_folder):
+    articles['Downloaded'] = SavedFiles(articles.File, download_folder)
+
+def NewStatus(articles):
+    status = download_status(articles)
+    for pos in range(len(articles)):
+        status.mark(pos)
+    status.save()
+
+def Links(n):
+    return [(f"Bitcoin Price Update {i}", f"/markets/2021/05/15/bitcoin-price-update-{i}/")
+            for i in range(n)]
+
+def Timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-cap', type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'operation':<10}{'original (s)':>15}{'column-wise (s)':>17}{'speedup':>10}")
+    for n in args.sizes:
+        links    = Links(n)
+        legacy_n = min(n, args.legacy_cap)
+        scale    = n / legacy_n
+        mark     = '*' if scale > 1 else ' '
+
+        ## The original code keys the articles on their titles, the shipped code on their links
+        ## with the titles in the `File` column
+        legacy_articles = LegacyIndex(links[:legacy_n], HOME)
+        articles        = ArticleIndex(links, HOME)
+        articles['File'] = articles.Title
+
+        ## Every 10th article has already been downloaded
+        folder = tempfile.mkdtemp()
+        try:
+            for title, _ in links[::10]:
+                open(os.path.join(folder, f"{title}.txt"), 'w').close()
+
+            results = [
+                ('index',  Timed(LegacyIndex, links[:legacy_n], HOME) * scale,
+                           Timed(ArticleIndex, links, HOME)),
+                ('exists', Timed(LegacyExists, legacy_articles.copy(), folder) * scale,
+                           Timed(NewExists, articles.copy(), folder)),
+                ('status', Timed(LegacyStatus, legacy_articles.copy()) * scale,
+                           Timed(NewStatus, articles.copy())),
+            ]
+        finally:
+            shutil.rmtree(folder)
+
+        for name, old, new in results:
+            print(f"{n:>10,}  {name:<10}{old:>14.3f}{mark}{new:>17.3f}{old/new:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
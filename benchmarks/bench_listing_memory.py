@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the peak memory of indexing a fully expanded listing page with tracemalloc. A synthetic
+coindesk listing with 50,000 article cards (about the size of the page after a thousand `More`
+clicks) is indexed into the `ArticleIndex` DataFrame three ways: the original `re.findall` over
+the whole page source, the lazy `DatedArticleLinks` over the whole page source, and
+`create_index.page_source` itself, which streams the links out of a stand-in browser in batches
+with `ListingBatches`. The whole-page cases count the page source string in their peak, as
+`driver.page_source` returns it in one piece. Every case keeps the DataFrame it built, so the
+rows are part of the peak. The streamed peak should follow the batch size and the number of
+articles, not the size of the page.
+
+Run from the repository root with:
+    python benchmarks/bench_listing_memory.py [--links 50000] [--batch-size 100 500 2000]
+"""
+import argparse, io, os, sys, time, tracemalloc
+from contextlib import redirect_stdout
+
+## The package, and the stand-in browser from the helpers the tests share in `tests/sites.py`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+from scrape_coindesk import create_index, crawl_metrics
+from scrape_coindesk.crawl import ArticleIndex
+from scrape_coindesk.extract import DatedArticleLinks
+from bench_extract import LegacyArticleLinks
+from sites import listing_driver, listing_pool
+
+HOME = "https://www.coindesk.com"
+
+## One article card of the coindesk listing, as in `benchmarks/fixtures/coindesk_listing.html`
+CARD = ('<div class="list-item-card post"><div class="card-text-block">\n'
+        '<a title="Ether volatility and liquidity story number {i}: What Comes Next" '
+        'href="/markets/2021/{month:02d}/{day:02d}/ether-volatility-liquidity-story-{i}/">'
+        '<h4 class="heading">Ether volatility and liquidity story number {i}: What Comes Next</h4></a>\n'
+        '<span class="card-desc">Market volatility ether rate drop ether price etf futures liquidity.</span>'
+        '<time class="time" datetime="2021-{month:02d}-{day:02d}T14:00:00Z">2021</time>\n'
+        '<a title="Articles by Jane Doe" href="/author/jane-doe/">Jane Doe</a></div></div>\n')
+
+def Cards(n_links, start=0):
+    for i in range(start, n_links):
+        yield CARD.format(i=i, month=12 - (i * 12 // n_links), day=28 - i % 28)
+
+class synthetic_cards:
+    ## The cards of the expanded listing, built as the `listing_driver` slices them out, like
+    ## the browser serializes them
+    def __init__(self, n_links):
+        self.n_links = n_links
+    
+    def __len__(self):
+        return self.n_links
+    
+    def __getitem__(self, items):
+        start, end, _ = items.indices(self.n_links)
+        return list(Cards(end, start))
+
+def WholePage(n_links, parse):
+    page = ''.join(Cards(n_links))
+    return ArticleIndex(parse(page), HOME)
+
+def Streamed(n_links, batch_size):
+    driver = listing_driver(synthetic_cards(n_links))
+    ci = create_index(HOME + '/category/markets', HOME, pool=listing_pool(driver),
+                      batch_size=batch_size, metrics=crawl_metrics())
+    with redirect_stdout(io.StringIO()):
+        ci.page_source()
+    return ci.articles
+
+def Measure(func, *args):
+    ## Return (rows, peak MB, seconds) of a call, with its DataFrame still held at the peak
+    tracemalloc.start()
+    start    = time.perf_counter()
+    articles = func(*args)
+    elapsed  = time.perf_counter() - start
+    _, peak  = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(articles), peak / 1e6, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--links', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[100, 500, 2000])
+    args = parser.parse_args()
+    
+    page_mb = sum(len(card) for card in Cards(args.links)) / 1e6
+    print(f"{args.links:,} article cards, a {page_mb:.1f} MB page source")
+    print(f"{'case':<34}{'rows':>9}{'peak MB':>10}{'seconds':>10}")
+    
+    cases = [('whole page, re.findall', WholePage, args.links, LegacyArticleLinks),
+             ('whole page, DatedArticleLinks', WholePage, args.links, DatedArticleLinks)]
+    cases += [(f'page_source, batches of {size:,}', Streamed, args.links, size) for size in args.batch_size]
+    
+    for name, func, *func_args in cases:
+        rows, peak, elapsed = Measure(func, *func_args)
+        print(f"{name:<34}{rows:>9,}{peak:>10.2f}{elapsed:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the `near_duplicates` index on a synthetic corpus. Random articles are generated, and
+every tenth one is followed by a copy with a few words changed, the way a republished or updated
+story differs from the original. All of them are added to a fresh index, and the run reports the
+articles indexed per second, the peak memory of the process, the size of the SQLite file, and the
+share of the planted near-duplicates that were found (recall) and of the flagged articles that
+really were near-duplicates (precision). Memory should stay flat as `--documents` grows.
+
+Run from the repository root with:
+    python benchmarks/bench_near_duplicates.py [--documents 100000] [--words 600]
+"""
+import argparse, os, random, resource, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrape_coindesk.similarity import near_duplicates
+
+VOCABULARY = [f"word{i}" for i in range(20000)]
+
+def Articles(n_documents, n_words, changed, seed=0):
+    ## Yield (key, article, key of the original or None), with a near-duplicate after every tenth
+    rng = random.Random(seed)
+    i = 0
+    while i < n_documents:
+        words = rng.choices(VOCABULARY, k=n_words)
+        yield f"doc-{i}", [' '.join(words)], None
+        i += 1
+        if i % 10 == 0 and i < n_documents:
+            for _ in range(changed):
+                words[rng.randrange(n_words)] = rng.choice(VOCABULARY)
+            yield f"doc-{i}", [' '.join(words)], f"doc-{i - 1}"
+            i += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=600)
+    parser.add_argument('--changed', type=int, default=10,
+                        help="The words changed in each planted near-duplicate.")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, 'similar.db')
+        index   = near_duplicates(db_path)
+        found, true_positives, planted = 0, 0, 0
+        
+        start = time.perf_counter()
+        for key, article, original in Articles(args.documents, args.words, args.changed):
+            match    = index.add(key, article)
+            planted += original is not None
+            found   += match is not None
+            true_positives += match is not None and match[0] == original
+        index.close()
+        elapsed = time.perf_counter() - start
+        
+        size = os.path.getsize(db_path) + sum(os.path.getsize(db_path + suffix)
+                                              for suffix in ('-wal', '-shm')
+                                              if os.path.exists(db_path + suffix))
+    
+    ## ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != 'darwin' else 1024**2)
+    print(f"{args.documents:,} articles of {args.words} words, {planted:,} planted near-duplicates")
+    print(f"{'articles/sec':<18}{args.documents / elapsed:>12,.0f}")
+    print(f"{'peak memory MB':<18}{peak:>12,.1f}")
+    print(f"{'index MB':<18}{size / 1e6:>12,.1f}")
+    print(f"{'recall':<18}{true_positives / max(planted, 1):>12.3f}")
+    print(f"{'precision':<18}{true_positives / max(found, 1):>12.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark crawling several sections side by side with the `crawl_orchestrator` against crawling
+them one after another. Four coindesk-style sections of different sizes (with some articles
+cross-posted between them) are replayed by one `replay_server`, and a fifth section by another,
+standing in for a second news site. The sections are first indexed and downloaded one at a
+time, each with its own `create_index` and `scrape_index`, then all at once by the orchestrator,
+which shares each host's scheduler and one `link_filter`. The orchestrated wall time should come
+close to that of the slowest section, and every cross-posted article should only be fetched once.
+
+Run from the repository root with:
+    python benchmarks/bench_orchestrator.py [--latency 0.05] [--concurrency 4] [--host-concurrency 8]
+"""
+import argparse, io, os, sys, tempfile, time
+from contextlib import redirect_stdout
+
+## The package, and `FixtureSite` from the helpers the tests share in `tests/sites.py`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+from scrape_coindesk import create_index, scrape_index, crawl_metrics
+from scrape_coindesk.orchestrator import crawl_orchestrator
+from scrape_coindesk.replay import replay_server
+from sites import FixtureSite
+
+## (section, host, articles, first article number). The article numbers of the sections on the
+## first host overlap, those are the cross-posted articles.
+SECTIONS = [('markets', 0, 240, 0), ('policy', 0, 120, 220), ('tech', 0, 80, 330),
+            ('business', 0, 60, 400), ('news', 1, 160, 0)]
+
+def Sections(servers):
+    return [{'name': name, 'index_site': servers[host].url + f'/{name}/1',
+             'page_url': servers[host].url + f'/{name}/{{page}}'} for name, host, _, _ in SECTIONS]
+
+def Sequential(sections, folder, args):
+    ## Crawl the sections one after another, the way a single `create_index`/`scrape_index` does
+    written = 0
+    for spec in sections:
+        metrics = crawl_metrics()
+        ci = create_index(spec['index_site'], spec['index_site'].rsplit('/', 2)[0],
+                          page_url=spec['page_url'], requests_per_second=args.rate, metrics=metrics).go()
+        os.makedirs(os.path.join(folder, spec['name']))
+        scrape_index(ci.articles, spec['index_site'], os.path.join(folder, spec['name']),
+                     concurrency=args.concurrency, requests_per_second=args.rate,
+                     browser_fallback=False, metrics=metrics).scrape()
+        written += metrics.counters['articles_written']
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--latency', type=float, default=.05)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--host-concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=100)
+    args = parser.parse_args()
+
+    sites = [{}, {}]
+    for name, host, n_articles, first in SECTIONS:
+        sites[host].update(FixtureSite(n_articles, 20, f'/{name}/{{page}}', first))
+    unique   = sum(len([path for path in site if '/story-' in path]) for site in sites)
+    listings = sum(len(site) for site in sites) - unique
+
+    with replay_server(sites[0], latency=args.latency) as coindesk, \
+         replay_server(sites[1], latency=args.latency) as other:
+        sections = Sections([coindesk, other])
+
+        with tempfile.TemporaryDirectory() as folder, redirect_stdout(io.StringIO()):
+            start      = time.perf_counter()
+            sequential = Sequential(sections, folder, args)
+            sequential_wall = time.perf_counter() - start
+
+        served = coindesk.stats['served'] + other.stats['served']
+        with tempfile.TemporaryDirectory() as folder, redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            co    = crawl_orchestrator(sections, folder, concurrency=args.concurrency,
+                                       host_concurrency=args.host_concurrency,
+                                       requests_per_second=args.rate, browser_fallback=False,
+                                       metrics=crawl_metrics())
+            orchestrated      = int(co.run().Downloaded.sum())
+            orchestrated_wall = time.perf_counter() - start
+        served = coindesk.stats['served'] + other.stats['served'] - served
+
+    report  = co.report
+    seconds = report.Index_Seconds + report.Scrape_Seconds
+    print(f"{len(SECTIONS)} sections, {unique:,} distinct articles, {args.latency * 1000:.0f} ms latency")
+    print(f"{'section':<10}{'indexed':>9}{'seconds':>9}")
+    for (_, row), section_seconds in zip(report.iterrows(), seconds):
+        print(f"{row.Section:<10}{row.Indexed:>9,}{section_seconds:>9.1f}")
+    print()
+    print(f"{'run':<28}{'articles':>9}{'wall s':>9}")
+    print(f"{'one after another':<28}{sequential:>9,}{sequential_wall:>9.1f}")
+    print(f"{'orchestrated':<28}{orchestrated:>9,}{orchestrated_wall:>9.1f}"
+          f"   {sequential_wall / orchestrated_wall:.2f}x faster, "
+          f"{orchestrated_wall / seconds.max():.2f}x the slowest section")
+    print(f"Article pages fetched by the orchestrator: {served - listings:,} "
+          f"for {unique:,} distinct articles")
+
+if __name__ == "__main__":
+    main()
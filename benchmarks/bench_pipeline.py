@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark how parsing throughput scales with the number of `parse_pipeline` processes. The saved
+article pages in `benchmarks/fixtures` are padded with markup to the size of a real coindesk page
+and served from memory by a `fetch_engine` that does not touch the network, so the run is bound by
+`ExtractArticle` alone. The threads-only `fetch_engine.map`, where the GIL serializes parsing, is
+timed as the baseline, then the pipeline with 1, 2, 4, ... processes up to the number of cores.
+On a single core the pipeline parses in threads by default, and that fallback is timed as well.
+
+Run from the repository root with:
+    python benchmarks/bench_pipeline.py [--pages 400] [--page-kb 400] [--processes 1 2 4 8]
+"""
+import argparse, glob, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrape_coindesk.fetch import fetch_engine
+from scrape_coindesk.pipeline import parse_pipeline
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+## Markup that is not part of the article, repeated to pad the fixtures to a realistic size
+FILLER = ('<div class="related-item"><a title="Related" href="/markets/related">Related story</a>'
+          '<span>\\u2019 &nbsp; market data &amp; prices</span></div>\n')
+
+class memory_engine(fetch_engine):
+    ## Serve the pages from a dict, so only the parsing is measured
+    def __init__(self, pages, concurrency):
+        super().__init__(concurrency=concurrency, requests_per_second=1e9)
+        self.pages = pages
+
+    def fetch_html(self, link):
+        self.metrics.count('requests')
+        return self.pages[link]
+
+def Corpus(n_pages, page_kb):
+    templates = []
+    for file in sorted(glob.glob(os.path.join(FIXTURES, '*article*.html'))):
+        with open(file, encoding='utf-8') as f:
+            page = f.read()
+        padding = FILLER * max(0, (page_kb * 1024 - len(page)) // len(FILLER))
+        templates.append(page.replace('</body>', padding + '</body>'))
+
+    return {f"https://www.coindesk.com/markets/article-{i}": templates[i % len(templates)]
+            for i in range(n_pages)}
+
+def Run(pages, concurrency, processes=None, fallback=False):
+    ## Return the pages/sec of the threads-only engine, or of a pipeline with `processes` parsers.
+    ## The pipeline's processes are used even on a single core, unless `fallback` is passed.
+    engine = memory_engine(pages, concurrency)
+    jobs   = enumerate(pages)
+    start  = time.perf_counter()
+    if processes is None:
+        n = sum(1 for _ in engine.map(jobs))
+    else:
+        pipeline = parse_pipeline(engine, processes=processes)
+        pipeline.threads = pipeline.threads and fallback
+        n = sum(len(batch) for batch in pipeline.map(jobs))
+    elapsed = time.perf_counter() - start
+    assert n == len(pages)
+
+    return n / elapsed
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--page-kb', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=[n for n in (1, 2, 4, 8, 16, 32) if n <= cores])
+    args = parser.parse_args()
+
+    pages = Corpus(args.pages, args.page_kb)
+    print(f"{args.pages} pages of {args.page_kb} KB, {cores} cores")
+    print(f"{'stage':<22}{'pages/sec':>12}{'speedup':>10}")
+
+    baseline = Run(pages, args.concurrency)
+    print(f"{'threads only':<22}{baseline:>12,.1f}{'':>10}")
+    if cores == 1:
+        rate = Run(pages, args.concurrency, 1, fallback=True)
+        print(f"{'pipeline, 1 core':<22}{rate:>12,.1f}{'':>10}")
+
+    single = None
+    for processes in args.processes:
+        rate   = Run(pages, args.concurrency, processes)
+        single = single or rate
+        print(f"{f'pipeline, {processes} proc':<22}{rate:>12,.1f}{rate/single:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
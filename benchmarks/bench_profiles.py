@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the extraction of each site profile. Every built-in profile (or the JSON profiles
+passed with `--profile`) is compiled once, then run over listing and article pages in its own
+markup: the saved coindesk pages in `benchmarks/fixtures`, and for the `generic` profile the same
+articles rewritten as plain semantic html. The compile time, the listing and article throughput
+and the title filter throughput are reported, along with the filter done the uncompiled way (a
+scan of the exact-title list and a `str.find` per substring) for comparison. The `coindesk`
+profile is checked to give the same output as the default extraction functions.
+
+Run from the repository root with:
+    python benchmarks/bench_profiles.py [--repeat 200] [--profile my_site.json --pages 'pages/*.html']
+"""
+import argparse, glob, html, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrape_coindesk import extract
+from scrape_coindesk.profiles import SITE_PROFILES, LoadProfile
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def Load(pattern):
+    pages = []
+    for file in sorted(glob.glob(pattern)):
+        with open(file, encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+def GenericPages(listings, articles):
+    ## Rewrite the coindesk fixtures in the markup the `generic` profile parses
+    listing_pages = []
+    for page in listings:
+        items = [f'<article><a class="story" title="{html.escape(title)}" href="{link}">{title}</a>'
+                 f'<time datetime="{published:%Y-%m-%dT%H:%M:%SZ}">{published:%b %d}</time></article>'
+                 for title, link, published in extract.DatedArticleLinks(page) if published]
+        listing_pages.append('<html><body><nav><a title="About" href="/about">About</a></nav>\n' +
+                             '\n'.join(items) + '</body></html>')
+    
+    article_pages = []
+    for page in articles:
+        fields = extract.ArticleFields(extract.ExtractArticle(page))
+        body   = ''.join(f'<p>{paragraph}</p><div class="ad">Ad</div>\n' for paragraph in fields['paragraphs'])
+        article_pages.append(f'<html><body><h1 class="headline">{fields["title"]}</h1>'
+                             f'<a href="/people/x" rel="author">{fields["author"]}</a>'
+                             f'<time datetime="2021-05-15T14:00:00Z">{fields["datetime"]}</time>\n'
+                             f'{body}</body></html>')
+    
+    return listing_pages, article_pages
+
+def Throughput(func, items, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return repeat * len(items) / (time.perf_counter() - start)
+
+def UncompiledCheck(profile):
+    ## The title filter without the frozenset and the single pattern
+    exact = list(profile.spec['filters']['excluded_titles'])
+    parts = profile.spec['filters']['excluded_title_parts']
+    parts = parts.split('|') if isinstance(parts, str) else list(parts)   # A regex of plain alternatives
+    return lambda title: title in exact or any(title.find(part) != -1 for part in parts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--profile', action='append', default=[],
+                        help="A JSON profile to benchmark instead of the built-in ones.")
+    parser.add_argument('--pages', action='append', default=[],
+                        help="A glob of the pages of each --profile, in the same order.")
+    args = parser.parse_args()
+    
+    listings = Load(os.path.join(FIXTURES, '*listing*.html'))
+    articles = Load(os.path.join(FIXTURES, '*article*.html'))
+    
+    if args.profile:
+        cases = [(path, pages, pages) for path, pages in zip(args.profile, map(Load, args.pages))]
+    else:
+        cases = [('coindesk', listings, articles), ('generic', *GenericPages(listings, articles))]
+    
+    print(f"{'profile':<12}{'compile ms':>11}{'listings/s':>12}{'articles/s':>12}"
+          f"{'titles/s':>12}{'uncompiled':>12}{'speedup':>9}")
+    for name, listing_pages, article_pages in cases:
+        start   = time.perf_counter()
+        profile = LoadProfile(SITE_PROFILES.get(name, name))
+        compile_ms = (time.perf_counter() - start) * 1e3
+        
+        ## Every profile has to find the articles on its own pages
+        titles = [title for page in listing_pages for title, _ in profile.article_links(page)]
+        assert titles and all(profile.extract_article(page) for page in article_pages), name
+        if name == 'coindesk':
+            for page in listing_pages + article_pages:
+                assert list(profile.article_links(page)) == list(extract.ArticleLinks(page))
+                assert profile.extract_article(page) == extract.ExtractArticle(page)
+        
+        ## Time the filter over every title on the pages, including the excluded ones
+        titles   += sorted(profile.excluded_titles)
+        links     = Throughput(lambda page: list(profile.dated_article_links(page)), listing_pages, args.repeat)
+        extracted = Throughput(profile.extract_article, article_pages, args.repeat)
+        checked   = Throughput(profile.custom_check, titles, args.repeat * 20)
+        unchecked = Throughput(UncompiledCheck(profile), titles, args.repeat * 20)
+        print(f"{profile.name:<12}{compile_ms:>11.2f}{links:>12,.0f}{extracted:>12,.0f}"
+              f"{checked:>12,.0f}{unchecked:>12,.0f}{checked / unchecked:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
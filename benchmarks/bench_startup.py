@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the cold start of a worker that only parses pages: a fresh interpreter imports
+`scrape_coindesk` and extracts one saved article from `benchmarks/fixtures`. The median wall time
+over several runs is checked against a budget, along with the heavy dependencies (selenium,
+pandas, IPython) the import pulled in. The legacy `Collect_Coindesk_Articles` script with the full
+crawler loaded is timed the same way for comparison.
+
+Run from the repository root with:
+    python benchmarks/bench_startup.py [--runs 10] [--budget 0.5]
+"""
+import argparse, os, statistics, subprocess, sys, time
+
+ROOT     = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE  = os.path.join(ROOT, 'benchmarks', 'fixtures', 'coindesk_article_1.html')
+HEAVY    = ('selenium', 'pandas', 'IPython')
+
+## The code each fresh interpreter runs. It prints the heavy modules that ended up imported.
+EXTRACT = f"""
+import sys
+import scrape_coindesk
+with open({FIXTURE!r}, encoding='utf-8') as f:
+    assert scrape_coindesk.ExtractArticle(f.read())
+print(','.join(m for m in {HEAVY!r} if m in sys.modules))
+"""
+
+LEGACY = f"""
+import sys
+import Collect_Coindesk_Articles as cca
+cca.create_index
+with open({FIXTURE!r}, encoding='utf-8') as f:
+    assert cca.ExtractArticle(f.read())
+print(','.join(m for m in {HEAVY!r} if m in sys.modules))
+"""
+
+def Startup(code, runs):
+    ## Time `runs` fresh interpreters running `code`, and return the median and the modules loaded
+    times = []
+    for _ in range(runs):
+        start  = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                                capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times), result.stdout.strip() or '-'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help="The largest median startup (in seconds) of the extraction worker.")
+    args = parser.parse_args()
+
+    baseline, _   = Startup("pass", args.runs)
+    worker, heavy = Startup(EXTRACT, args.runs)
+    legacy, full  = Startup(LEGACY, args.runs)
+
+    print(f"{'case':<28}{'median sec':>12}  heavy imports")
+    print(f"{'bare interpreter':<28}{baseline:>12.3f}  -")
+    print(f"{'import + extract one page':<28}{worker:>12.3f}  {heavy}")
+    print(f"{'legacy script, full crawler':<28}{legacy:>12.3f}  {full}")
+
+    if heavy != '-':
+        sys.exit(f"FAIL: extracting a page imported {heavy}")
+    if worker > args.budget:
+        sys.exit(f"FAIL: {worker:.3f}s is over the {args.budget:.3f}s budget")
+    print(f"OK: within the {args.budget:.3f}s budget")
+
+if __name__ == "__main__":
+    main()
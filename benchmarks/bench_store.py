@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the `article_store` operations on a large index. A store of `--rows` articles (1M by
+default), published every few minutes and half of them already downloaded, is built with
+`upsert`, then every read `create_index` and `scrape_index` make of it is timed:
+
+- `len`, `in`           : the size of the index, and one lookup by link (`known_links`)
+- `between`             : one day of articles, a range scan of the publication date index
+- `pending`             : every article left to download, read in one piece
+- `pending page`        : one page of `--page-size` of them, the first and one from the middle
+- `pages`               : every article left to download, read page by page with `pages`
+- `to_frame`            : the whole index, read in one piece
+- `mark_downloaded`     : flagging one page of articles as downloaded
+
+Run from the repository root with:
+    python benchmarks/bench_store.py [--rows 1000000] [--page-size 10000]
+"""
+import argparse, os, shutil, sys, tempfile, time
+import datetime as dt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrape_coindesk.crawl import ArticleIndex
+from scrape_coindesk.store import article_store
+
+HOME = 'https://www.coindesk.com'
+
+def Links(n):
+    ## One article every 7 minutes, newest first, as the listing pages list them
+    newest = dt.datetime(2021, 5, 15, 14)
+    for i in range(n):
+        published = newest - dt.timedelta(minutes=7 * i)
+        yield f"Bitcoin Price Update {i}", f"/markets/{published:%Y/%m/%d}/bitcoin-price-update-{i}/", published
+
+def Timed(func, *args, **kwargs):
+    start  = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--page-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        store    = article_store(os.path.join(folder, 'index.db'))
+        articles = ArticleIndex(Links(args.rows), HOME)
+        upsert, _ = Timed(store.upsert, articles)
+        store.mark_downloaded(articles.FullLink[::2])
+
+        link = articles.FullLink.iat[args.rows // 2]
+        day  = articles.Published.iat[args.rows // 2].normalize()
+        del articles
+
+        def Run(name, func, *func_args):
+            seconds, result = Timed(func, *func_args)
+            results.append((name, seconds, result if isinstance(result, int) else len(result)))
+            return result
+
+        results = [('upsert', upsert, args.rows)]
+        Run('len', len, store)
+        Run('in', lambda: int(link in store))
+        Run('between, one day', store.between, day, day + dt.timedelta(days=1))
+        Run('pending', store.pending)
+        first = Run('pending page, first', store.pending, args.page_size)
+        Run('pending page, middle', store.pending, args.page_size, link)
+        Run('pages', lambda: sum(len(page) for page in store.pages(args.page_size)))
+        Run('to_frame', store.to_frame)
+        Run('mark_downloaded, one page', lambda: store.mark_downloaded(first.FullLink) or len(first))
+        store.close()
+    finally:
+        shutil.rmtree(folder)
+
+    print(f"{args.rows:,} articles, half of them downloaded, pages of {args.page_size:,}")
+    print(f"{'operation':<28}{'seconds':>10}{'rows':>12}")
+    for name, seconds, rows in results:
+        print(f"{name:<28}{seconds:>10.3f}{rows:>12,}")
+
+if __name__ == "__main__":
+    main()
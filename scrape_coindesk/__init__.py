@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Python scripts used to collect articles published to coindesk.com. Eventually will be capable of
+scraping any news site.
+
+The package is split into modules so that importing it stays cheap: selenium and pandas are only
+loaded by the modules that need them, and those modules are only imported when one of their
+names is first used, e.g. `scrape_coindesk.ExtractArticle` never loads pandas.
+
+    extract     Parse the article text and the article index out of a page source
+    metrics     Stage timings and counters of a crawl
+    scheduler   Per-host pacing and the retry queue
+    browsers    Firefox drivers and the `driver_pool`
+    fetch       The concurrent `fetch_engine`
+    pipeline    The `parse_pipeline` that parses downloaded pages in a pool of processes
+    store       The SQLite `article_store`, the compressed `corpus_writer` and the `page_cache`
+    checkpoint  The resumable `crawl_checkpoint` journal
+    dedup       The `link_filter` of canonical links downloaded on earlier runs
+    similarity  The `near_duplicates` index of republished and updated articles
+    profiles    The declarative `site_profile` of each news site, compiled at load time
+    replay      The `replay_server` of recorded pages, for crawling without the live site
+    crawl       `create_index`, `scrape_index`, `run_crawl` and `resume_crawl`
+    orchestrator  The `crawl_orchestrator` of several sections or sites crawled side by side
+    cli         The `scrape_coindesk` command line entry point
+"""
+import importlib
+
+## The module every public name is defined in
+_EXPORTS = {
+    'ARTICLE_ELEMENTS': 'extract', 'ARTICLE_MARKUP': 'extract', 'ARTICLE_BOILERPLATE': 'extract',
+    'ExtractArticle': 'extract', 'ArticleRendered': 'extract', 'EXCLUDED_TITLES': 'extract',
+    'EXCLUDED_TITLE_PARTS': 'extract', 'ARTICLE_ANCHOR': 'extract', 'CustomCheck': 'extract',
+    'QuotedValue': 'extract', 'ArticleLinks': 'extract', 'LinkDate': 'extract',
+    'ArticleFields': 'extract', 'ExtractPages': 'extract',
+    'CanonicalLink': 'extract', 'TRACKING_PARAMS': 'extract', 'ArticleAnchors': 'extract',
+    'LISTING_TIME': 'extract', 'PublishedAt': 'extract', 'DateBound': 'extract',
+    'DatedArticleLinks': 'extract', 'ARTICLE_HEADERS': 'extract', 'ARTICLE_HEADER_NAMES': 'extract',
+    'DatedAnchors': 'extract', 'LinkTime': 'extract',
+    'crawl_metrics': 'metrics', 'METRICS': 'metrics',
+    'Retryable': 'scheduler', 'crawl_scheduler': 'scheduler',
+    'ElementClickInterceptedException': 'browsers', 'StartFirefox': 'browsers',
+    'BrowserMemory': 'browsers', 'pooled_driver': 'browsers', 'driver_pool': 'browsers',
+    'LinkCount': 'browsers', 'WaitForLinks': 'browsers', 'OldestListed': 'browsers',
+    'LISTING_NODES': 'browsers', 'ListingBatches': 'browsers',
+    'fetch_engine': 'fetch',
+    'parse_pipeline': 'pipeline',
+    'article_store': 'store', 'corpus_writer': 'store', 'page_cache': 'store',
+    'crawl_checkpoint': 'checkpoint',
+    'link_filter': 'dedup',
+    'near_duplicates': 'similarity', 'ArticleText': 'similarity',
+    'site_profile': 'profiles', 'LoadProfile': 'profiles', 'SITE_PROFILES': 'profiles',
+    'COINDESK': 'profiles', 'GENERIC': 'profiles',
+    'replay_server': 'replay',
+    'ArticleIndex': 'crawl', 'FetchLinks': 'crawl', 'download_status': 'crawl',
+    'SectionPattern': 'crawl', 'SavedFiles': 'crawl', 'CheckpointArticles': 'crawl',
+    'ResumedLinks': 'crawl', 'create_index': 'crawl', 'scrape_index': 'crawl', 'run_crawl': 'crawl',
+    'resume_crawl': 'crawl',
+    'crawl_orchestrator': 'orchestrator', 'SectionSpec': 'orchestrator',
+    'main': 'cli',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    ## Import the module behind a name the first time it is used
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+Run a crawl with `python -m scrape_coindesk`, see `scrape_coindesk.cli`.
+"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
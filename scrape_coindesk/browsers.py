@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Firefox drivers used to render pages that need JavaScript. selenium is only imported once a
+browser is started.
+
+NOTE: CURRENTLY, BROWSERS CAN ONLY BE STARTED IF FIREFOX IS INSTALLED...
+"""
+import time
+import threading       # Locks shared by the workers checking drivers out of the pool
+import queue           # Idle drivers waiting in the `driver_pool`
+
+from .extract import PublishedAt
+
+## psutil is optional. When it is installed the `driver_pool` measures the memory of the whole
+## Firefox process tree, otherwise only the main process is read from /proc (Linux only)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+## Define a generic exception for working with Selenium
+## This is not working as intended, but will return to this in the future
+class ElementClickInterceptedException(Exception):
+    pass
+
+def StartFirefox(headless=True):
+    ## Start a new Firefox browser with a fresh profile
+    from selenium import webdriver  # Imported here so parsing pages does not load selenium
+    
+    options = webdriver.FirefoxOptions()
+    options.profile = webdriver.FirefoxProfile()
+    if headless:
+        options.add_argument('-headless')
+    
+    return webdriver.Firefox(options=options)
+
+def BrowserMemory(driver):
+    """
+    Return the resident memory of the Firefox process behind a driver in MB, or None when it
+    cannot be measured.
+    """
+    pid = driver.capabilities.get('moz:processID')
+    if pid is None:
+        return None
+    
+    if psutil is not None:
+        ## Firefox runs each tab in a child process, so count the whole tree
+        try:
+            process = psutil.Process(pid)
+            rss = process.memory_info().rss
+            rss += sum(child.memory_info().rss for child in process.children(recursive=True))
+            return rss / 2**20
+        except psutil.Error:
+            return None
+    
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    
+    return None
+
+class pooled_driver:
+    """
+    A selenium driver checked out of a `driver_pool`. It behaves like the driver it wraps, but
+    counts the pages the browser has loaded with `get`, remembers if the browser failed, and
+    `quit` hands the browser back to the pool instead of closing it. A worn out or crashed
+    browser is swapped for a fresh one before the next `get`, so a long loop over a single
+    checkout is recycled too.
+    """
+    
+    def __init__(self, pool, driver, pages=0):
+        self._pool   = pool
+        self._driver = driver
+        self.pages   = pages
+        self.crashed = False
+    
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+    
+    def get(self, link):
+        if self._pool.worn_out(self):
+            self._pool.renew(self)
+        
+        self.pages += 1
+        try:
+            return self._driver.get(link)
+        except Exception:  # Selenium errors do not share a common base class we can import here
+            self.crashed = True
+            raise
+    
+    def quit(self):
+        self._pool.release(self)
+
+class driver_pool:
+    """
+    `driver_pool` keeps a set of warm, headless Firefox drivers that `create_index`,
+    `scrape_index` and `fetch_engine` check out and hand back, so a long crawl does not pay the
+    browser start up cost for every run and can keep several browsers busy at once. Drivers are
+    recycled after `max_pages` page loads, after an error, or when their memory use passes
+    `max_memory_mb`.
+    
+    Parameters
+    ----------
+    size : int
+    |    The maximum number of browsers open at the same time. The default is 2.
+    
+    max_pages : int
+    |    The number of pages a browser may load before it is closed and replaced.
+    |    The default is 500 pages.
+    
+    max_memory_mb : float
+    |    The memory use (in MB) above which a browser is closed and replaced when it is handed
+    |    back. Use None to disable the check. The default is 1500 MB.
+    
+    headless : bool
+    |    Whether the browsers are started without a window. The default is True.
+    
+    warm : bool
+    |    Whether all `size` browsers are started when the pool is created, rather than the
+    |    first time they are needed. The default is True.
+    
+    Methods
+    ----------
+    `acquire`
+    |    Check out a driver, waiting for one to be handed back when all `size` are in use.
+    
+    `release`
+    |    Hand a driver back. Calling `quit()` on a checked out driver does the same.
+    
+    `close`
+    |    Quit every idle browser in the pool.
+    """
+    
+    def __init__(self, size=2, max_pages=500, max_memory_mb=1500, headless=True, warm=True):
+        self.size          = size
+        self.max_pages     = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.headless      = headless
+        self.warm          = warm
+        self.idle          = queue.LifoQueue()
+        self.slots         = threading.Semaphore(size)
+        
+        if warm:
+            for _ in range(size):
+                self.idle.put((StartFirefox(headless), 0))
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            driver, pages = self.idle.get_nowait()
+        except queue.Empty:
+            try:
+                driver, pages = StartFirefox(self.headless), 0
+            except Exception:
+                self.slots.release()
+                raise
+        
+        return pooled_driver(self, driver, pages)
+    
+    def worn_out(self, checked_out, check_memory=False):
+        ## Decide whether this browser has done enough work to be replaced. Reading the memory
+        ## use takes a few system calls, so while a driver is checked out it is only read every
+        ## 25 pages.
+        if checked_out.crashed or checked_out.pages >= self.max_pages:
+            return True
+        
+        if self.max_memory_mb is not None and (check_memory or checked_out.pages % 25 == 24):
+            memory = BrowserMemory(checked_out._driver)
+            return memory is not None and memory > self.max_memory_mb
+        
+        return False
+    
+    def renew(self, checked_out):
+        ## Swap the browser of a checked out driver for a fresh one, keeping its slot
+        try:
+            checked_out._driver.quit()
+        except Exception:  # The browser may already be gone
+            pass
+        
+        try:
+            checked_out._driver, checked_out.pages = self.idle.get_nowait()
+        except queue.Empty:
+            checked_out._driver, checked_out.pages = StartFirefox(self.headless), 0
+        checked_out.crashed = False
+    
+    def release(self, checked_out):
+        driver = checked_out._driver
+        if driver is None:  # Already handed back
+            return
+        
+        recycle = self.worn_out(checked_out, check_memory=True)
+        checked_out._driver = None
+        
+        if recycle:
+            try:
+                driver.quit()
+            except Exception:  # The browser may already be gone
+                pass
+            
+            ### Keep the pool warm by starting the replacement in the background. It keeps the
+            ### slot until it has started, so no more than `size` browsers are ever open.
+            if self.warm:
+                threading.Thread(target=self.replace, daemon=True).start()
+                return
+        else:
+            self.idle.put((driver, checked_out.pages))
+        
+        self.slots.release()
+    
+    def replace(self):
+        ## Start a browser in place of a recycled one, then free the slot the recycled one held
+        try:
+            self.idle.put((StartFirefox(self.headless), 0))
+        except Exception:  # The next `acquire` will try again
+            pass
+        finally:
+            self.slots.release()
+    
+    def close(self):
+        while True:
+            try:
+                driver, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+def LinkCount(driver):
+    ## Count the links on the page the driver has open
+    return driver.execute_script("return document.getElementsByTagName('a').length")
+
+def OldestListed(driver):
+    ## Return the publication time of the last article listed on the page the driver has open,
+    ## read from its `<time datetime="...">` element without copying the whole page source
+    stamp = driver.execute_script("var t = document.querySelectorAll('time[datetime]');"
+                                  "return t.length ? t[t.length - 1].getAttribute('datetime') : null")
+    return PublishedAt(stamp) if stamp else None
+
+## Return the html of the `arguments[1]` links on the page from the `arguments[0]`-th one on, each
+## followed by the `<time datetime>` of the listing item (`article`, `li` or `div`) holding it,
+## and the number of links read. The browser serializes only these nodes, never the whole page.
+LISTING_NODES = """
+var anchors = document.getElementsByTagName('a');
+var end = Math.min(anchors.length, arguments[0] + arguments[1]);
+var nodes = [];
+for (var i = arguments[0]; i < end; i++) {
+    var item = anchors[i].closest('article, li, div');
+    var time = item === null ? null : item.querySelector('time[datetime]');
+    nodes.push(anchors[i].outerHTML + (time === null ? '' : time.outerHTML));
+}
+return [end - arguments[0], nodes.join('\\n')];
+"""
+
+def ListingBatches(driver, start=0, batch_size=500):
+    """
+    Yield the html of the links on the page the driver has open, from the `start`-th link on,
+    `batch_size` links at a time, along with the number of links read so far. Pass that number
+    back as `start` to only read the links added by later `More` clicks. The batches are parsed
+    with `DatedArticleLinks`, so only one batch is in memory at once.
+    """
+    while True:
+        count, batch = driver.execute_script(LISTING_NODES, start, batch_size)
+        if count == 0:
+            return
+        start += count
+        yield start, batch
+
+def WaitForLinks(driver, links, timeout=10, poll=.05):
+    """
+    Wait until the page holds more than `links` links (i.e. a click on `More` has loaded), or
+    until `timeout` seconds have passed, and return the new number of links.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        count = LinkCount(driver)
+        if count > links or time.monotonic() >= deadline:
+            return count
+        time.sleep(poll)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+The append-only journal that lets a crawl be resumed after it was interrupted.
+"""
+import os, json, time
+from os import path
+import threading       # Events are recorded by the concurrent fetching workers
+
+class crawl_checkpoint:
+    """
+    `crawl_checkpoint` records the progress of a crawl in an append-only journal file, so a crawl
+    that dies partway through can pick up where it stopped with `resume_crawl`. The journal holds
+    the crawl settings, the index cursor (listing page or `More` clicks), the articles indexed so
+    far, the queue of articles to download, and the status and retry count of each download.
+    Events are buffered and appended to the file every `interval` seconds, so recording progress
+    never rewrites the index or the DataFrame.
+    
+    Parameters
+    ----------
+    checkpoint_path : str
+    |    The path of the journal file. An existing journal is read back into `state` and new
+    |    events are appended to it.
+    
+    interval : float
+    |    The number of seconds between writes to the file. The default is 5 seconds.
+    
+    Methods
+    ----------
+    `run`, `cursor`, `indexed`, `queued`, `status`
+    |    Record the crawl settings, the index cursor, an indexed article, a queued article and
+    |    the outcome of a download.
+    
+    `flush`
+    |    Append the buffered events to the file now.
+    
+    Attributes
+    ----------
+    `state` : dict
+        The progress read back from the journal (and kept up to date as events are recorded),
+        with the keys 'run', 'cursor', 'index' (link -> title), 'queue' (link -> title),
+        'status' (link -> 'done', 'retry' or 'failed') and 'attempts' (link -> retries).
+    """
+    
+    def __init__(self, checkpoint_path, interval=5):
+        self.checkpoint_path = checkpoint_path
+        self.interval        = interval
+        self.buffer          = []
+        self.last_flush      = time.monotonic()
+        self._lock           = threading.Lock()
+        self.state           = {'run': {}, 'cursor': {}, 'index': {}, 'queue': {},
+                                'status': {}, 'attempts': {}}
+        
+        if path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.apply(json.loads(line))
+                    except ValueError:  # A line cut short by the crash, skip it
+                        continue
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.flush()
+    
+    def apply(self, event):
+        ## Update `state` with a single journal event
+        kind, state = event[0], self.state
+        if kind == 'run':
+            state['run'].update(event[1])
+        elif kind == 'cursor':
+            state['cursor'][event[1]] = event[2]
+        elif kind == 'index':
+            state['index'][event[2]] = event[1]
+        elif kind == 'queue':
+            state['queue'][event[2]] = event[1]
+        elif kind == 'status':
+            state['status'][event[1]]   = event[2]
+            state['attempts'][event[1]] = event[3]
+    
+    def record(self, *event):
+        with self._lock:
+            self.apply(event)
+            self.buffer.append(json.dumps(event))
+            due = time.monotonic() - self.last_flush >= self.interval
+        
+        if due:
+            self.flush()
+    
+    def run(self, **settings):
+        self.record('run', settings)
+    
+    def cursor(self, stage, value):
+        self.record('cursor', stage, value)
+    
+    def indexed(self, title, link):
+        self.record('index', title, link)
+    
+    def queued(self, title, link):
+        self.record('queue', title, link)
+    
+    def status(self, link, status, attempt=0):
+        self.record('status', link, status, attempt)
+    
+    def flush(self):
+        with self._lock:
+            lines, self.buffer = self.buffer, []
+            self.last_flush    = time.monotonic()
+            if not lines:
+                return
+            
+            with open(self.checkpoint_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+The command line entry point, installed as `scrape_coindesk` and also run by
+`python -m scrape_coindesk`. e.g. to index 15 pages of the coindesk markets section and save the
+articles as .txt files:
+
+    scrape_coindesk ./articles --site https://www.coindesk.com/category/markets -n 15
+
+Pass `--checkpoint` to record the crawl in a journal, and run the same command again to resume
+it after an interruption. With `--near-duplicates` every article is checked against the ones
+already saved, and `--scan-near-duplicates` checks a folder that was downloaded earlier:
+
+    scrape_coindesk ./articles --near-duplicates ./articles/similar.db --scan-near-duplicates
+
+Pass `--section` several times to crawl the sections side by side into one index:
+
+    scrape_coindesk ./articles --section https://www.coindesk.com/category/markets \
+                               --section https://www.coindesk.com/category/policy
+"""
+import argparse, os
+from os import path
+from urllib.parse import urlparse
+
+from .extract import PublishedAt
+from .profiles import LoadProfile
+
+def ParseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog='scrape_coindesk',
+                                     description="Index a news site and download its articles.")
+    parser.add_argument('output',
+                        help="The folder the articles are saved to.")
+    parser.add_argument('--site', default="https://www.coindesk.com/category/markets",
+                        help="The section of the news site to index (default: %(default)s).")
+    parser.add_argument('--home', default=None,
+                        help="The home page of the news site. Taken from the --profile, or else "
+                             "from --site, by default.")
+    parser.add_argument('--section', action='append', default=[], metavar='SITE',
+                        help="A section (or news site) to crawl in place of --site. Pass it "
+                             "several times to crawl them side by side, sharing each host's "
+                             "request rate and one index. The home page is taken from each link.")
+    parser.add_argument('--host-concurrency', type=int, default=None,
+                        help="The most requests in flight to one host across the --section "
+                             "crawls (default: the site profile's limit).")
+    parser.add_argument('--extension', action='append', default=[], metavar='EXTENSION',
+                        help="Only index the articles under this link extension (e.g. /markets), "
+                             "up to three times.")
+    parser.add_argument('--profile', default=None,
+                        help="The site profile to index and extract the articles with, either a "
+                             "built-in one (coindesk, generic) or a JSON file (default: coindesk).")
+    parser.add_argument('-n', type=int, default=1000,
+                        help="The number of times the `More` button is clicked (default: %(default)s).")
+    parser.add_argument('--since', default=None, metavar='DATE',
+                        help="Only index the articles published on or after this ISO 8601 date, "
+                             "and stop expanding the listing once it is passed.")
+    parser.add_argument('--until', default=None, metavar='DATE',
+                        help="Only index the articles published before this ISO 8601 date.")
+    parser.add_argument('--page-url', default=None,
+                        help="A listing page template with a {page} placeholder. When passed, the "
+                             "listing pages are crawled over plain HTTP instead of in Firefox.")
+    parser.add_argument('--format', dest='output_format', choices=['txt', 'jsonl.gz'],
+                        default='txt', help="How the articles are saved (default: %(default)s).")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="The number of articles downloaded at once (default: %(default)s).")
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help="Parse the pages in this many processes, when --concurrency is "
+                             "greater than 1 (default: %(default)s, parse in the download threads).")
+    parser.add_argument('--requests-per-second', type=float, default=None,
+                        help="The starting request rate per host (default: the rate of the "
+                             "site profile, 2 for coindesk).")
+    parser.add_argument('--store', default=None,
+                        help="An SQLite file keeping the article index between runs.")
+    parser.add_argument('--cache', default=None,
+                        help="A folder the raw pages are cached in, so unchanged pages are not "
+                             "downloaded again.")
+    parser.add_argument('--cache-ttl', type=float, default=7 * 24,
+                        help="The hours a cached page is used without asking the site (default: %(default)s).")
+    parser.add_argument('--offline', action='store_true',
+                        help="Extract every article in --store again from the pages in --cache, "
+                             "without any network I/O.")
+    parser.add_argument('--page-size', type=int, default=10000,
+                        help="With --offline, read the articles from --store this many at a "
+                             "time (default: %(default)s).")
+    parser.add_argument('--dedup', default=None,
+                        help="A file of the canonical links already downloaded, so articles "
+                             "saved on an earlier run are not indexed again.")
+    parser.add_argument('--dedup-capacity', type=int, default=None,
+                        help="Keep --dedup as a Bloom filter sized for this many links, for very "
+                             "large crawls. An exact set by default.")
+    parser.add_argument('--near-duplicates', default=None, metavar='DB',
+                        help="An SQLite file indexing the saved articles, so republished and "
+                             "updated stories are flagged as near-duplicates.")
+    parser.add_argument('--skip-near-duplicates', action='store_true',
+                        help="Do not save the articles --near-duplicates flags.")
+    parser.add_argument('--scan-near-duplicates', action='store_true',
+                        help="Only index the articles already in the output folder into "
+                             "--near-duplicates and list the near-duplicates found.")
+    parser.add_argument('--checkpoint', default=None,
+                        help="A journal file the crawl is recorded in, and resumed from.")
+    parser.add_argument('--metrics', default=None,
+                        help="Save the crawl metrics to this file (.prom for Prometheus text, "
+                             "JSON otherwise).")
+    
+    args = parser.parse_args(argv)
+    if len(args.extension) > 3:
+        parser.error("at most three --extension values can be passed")
+    if args.offline and (args.cache is None or args.store is None):
+        parser.error("--offline needs the --cache and the --store of an earlier crawl")
+    if args.section and (args.offline or args.checkpoint or args.page_url):
+        parser.error("--section cannot be combined with --offline, --checkpoint or --page-url")
+    if (args.skip_near_duplicates or args.scan_near_duplicates) and args.near_duplicates is None:
+        parser.error("--skip-near-duplicates and --scan-near-duplicates need --near-duplicates")
+    for bound in ('since', 'until'):
+        if getattr(args, bound) is not None and PublishedAt(getattr(args, bound)) is None:
+            parser.error(f"--{bound} {getattr(args, bound)!r} is not an ISO 8601 date")
+    try:
+        profile = LoadProfile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.home is None and profile is not None and profile.home:
+        args.home = profile.home
+    elif args.home is None:
+        site      = urlparse(args.site)
+        args.home = f"{site.scheme}://{site.netloc}"
+    
+    return args
+
+def main(argv=None):
+    args = ParseArgs(argv)
+    
+    ## A batch pass over an existing download folder needs neither pandas nor a browser
+    if args.scan_near_duplicates:
+        from .similarity import near_duplicates
+        
+        index = near_duplicates(args.near_duplicates)
+        try:
+            found = 0
+            for key, original, similarity in index.scan(args.output):
+                found += 1
+                print(f"{key} repeats {original} ({similarity:.0%} similar)")
+            print(f"{found:,} near-duplicates found, {len(index):,} articles indexed in "
+                  f"{args.near_duplicates}")
+        finally:
+            index.close()
+        return 0
+    
+    ## Import the crawler only now, so `--help` answers without loading pandas and selenium
+    from .crawl import create_index, scrape_index, run_crawl, resume_crawl
+    from .checkpoint import crawl_checkpoint
+    from .metrics import METRICS
+    from .store import page_cache
+    from .dedup import link_filter
+    from .similarity import near_duplicates
+    
+    if not path.isdir(args.output):
+        os.makedirs(args.output)
+    
+    extension1, extension2, extension3 = (args.extension + ["", "", ""])[:3]
+    cache = page_cache(args.cache, ttl=args.cache_ttl * 3600) if args.cache is not None else None
+    duplicates = near_duplicates(args.near_duplicates) if args.near_duplicates else None
+    if args.offline:
+        ### Re-extract the stored articles from the cache
+        si = scrape_index(None, args.site, args.output, output_format=args.output_format,
+                          store=args.store, cache=cache, offline=True, duplicates=duplicates,
+                          skip_duplicates=args.skip_near_duplicates, since=args.since,
+                          until=args.until, profile=args.profile, page_size=args.page_size)
+        si.scrape()
+    elif args.section:
+        ### Crawl the sections side by side. The orchestrator keeps the merged index in its
+        ### `articles`, like `scrape_index`.
+        from .orchestrator import crawl_orchestrator
+        
+        sections = [{'index_site': site, 'n': args.n, 'extension1': extension1,
+                     'extension2': extension2, 'extension3': extension3} for site in args.section]
+        si = crawl_orchestrator(sections, args.output, concurrency=args.concurrency,
+                                host_concurrency=args.host_concurrency,
+                                requests_per_second=args.requests_per_second, store=args.store,
+                                dedup=link_filter(args.dedup, capacity=args.dedup_capacity) if args.dedup else None,
+                                output_format=args.output_format,
+                                parse_processes=args.parse_processes, cache=cache,
+                                since=args.since, until=args.until, profile=args.profile,
+                                duplicates=duplicates, skip_duplicates=args.skip_near_duplicates)
+        si.run()
+    elif args.checkpoint is not None:
+        ### Resume the crawl recorded in the journal, or start a new one
+        if path.exists(args.checkpoint) and crawl_checkpoint(args.checkpoint).state['run']:
+            print(f"Resuming the crawl recorded in {args.checkpoint}")
+            si = resume_crawl(args.checkpoint)
+        else:
+            si = run_crawl(args.checkpoint, args.site, args.home, args.output,
+                           extension1, extension2, extension3, n=args.n, page_url=args.page_url,
+                           output_format=args.output_format, concurrency=args.concurrency,
+                           requests_per_second=args.requests_per_second,
+                           parse_processes=args.parse_processes, cache=args.cache,
+                           dedup=args.dedup, duplicates=args.near_duplicates,
+                           skip_duplicates=args.skip_near_duplicates, since=args.since,
+                           until=args.until, profile=args.profile, store=args.store,
+                           cache_ttl=args.cache_ttl * 3600, dedup_capacity=args.dedup_capacity)
+    else:
+        ci = create_index(args.site, args.home, extension1, extension2, extension3, n=args.n,
+                          page_url=args.page_url, requests_per_second=args.requests_per_second,
+                          store=args.store, cache=cache, since=args.since, until=args.until,
+                          profile=args.profile,
+                          dedup=link_filter(args.dedup, capacity=args.dedup_capacity) if args.dedup else None)
+        ci.go()
+        
+        si = scrape_index(ci.articles, args.site, args.output, output_format=args.output_format,
+                          store=ci.store, concurrency=args.concurrency,
+                          requests_per_second=args.requests_per_second,
+                          parse_processes=args.parse_processes, cache=cache,
+                          duplicates=duplicates, skip_duplicates=args.skip_near_duplicates,
+                          profile=ci.profile, dedup=ci.dedup)
+        si.scrape()
+    
+    downloaded = int(si.articles.Downloaded.sum())
+    print(f"{downloaded:,} of {len(si.articles):,} articles saved to {args.output}")
+    
+    if args.metrics is not None:
+        METRICS.dump(args.metrics)
+    
+    return 0
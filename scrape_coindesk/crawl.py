@@ -0,0 +1,1361 @@
+# -*- coding: utf-8 -*-
+"""
+The `create_index` and `scrape_index` classes used to index a news site and download its
+articles, and the resumable `run_crawl`.
+
+NOTE: CURRENTLY, BROWSERS CAN ONLY BE STARTED IF FIREFOX IS INSTALLED...
+"""
+## Import standard python libraries
+import pandas as pd    # For working with data frames
+import re, os          # Regular expressions (re), and standard shell commands (os)
+from os import path    # Create paths to save .txt files
+import time            # Pace the `More` clicks
+import datetime as dt  # Working with dates in python
+import hashlib         # Tell apart articles that share a title in their file names
+import urllib.error
+from urllib.parse import urlsplit
+
+## Import the clear_output module for jupyter notebook users. Headless workers without
+## IPython installed just print the progress lines one after another.
+try:
+    from IPython.display import clear_output
+except ImportError:
+    def clear_output(wait=False):
+        pass
+
+from .extract import (ExtractArticle, ArticleRendered, CanonicalLink, LinkTime, DatedArticleLinks,
+                      DateBound)
+from .scheduler import Retryable, crawl_scheduler
+from .browsers import StartFirefox, LinkCount, WaitForLinks, OldestListed, ListingBatches
+from .fetch import fetch_engine
+from .pipeline import parse_pipeline
+from .store import article_store, corpus_writer, page_cache
+from .checkpoint import crawl_checkpoint
+from .dedup import link_filter
+from .profiles import LoadProfile, site_profile
+from .similarity import near_duplicates
+from .metrics import METRICS
+
+## Expand number of columns and table width for output in spyder
+pd.set_option("display.max_columns", 10)
+pd.set_option('display.width', 1000)
+
+## Define `ArticleIndex()` to have the (title, link) pairs found by `ArticleLinks()` passed to it,
+## and return a dataframe of all article titles and scrapable link extensions. Articles are keyed
+## by their canonical full link, so two articles sharing a headline are both kept, while the
+## same article linked with a different query string or a trailing slash is only kept once.
+## The `Href` is kept as the site listed it, and `Master Site` + `Href` is the link the article
+## is downloaded from. Links already in the `dedup` filter (a `link_filter`) were downloaded on
+## an earlier run. `links` may also hold (title, link, published) tuples from `DatedArticleLinks`;
+## when there is no publication time, it is the date in the link. When link extensions are
+## passed, only the articles under one of them (e.g. '/markets' or '/policy') are kept.
+def ArticleIndex(links, master_site, extension_1="", extension_2="", extension_3="", dedup=None):
+    ## Collect the (title, link[, published]) tuples into the columns of a DataFrame
+    sections = SectionPattern(extension_1, extension_2, extension_3)
+    listed   = pd.DataFrame(list(links)).reindex(columns=range(3)).astype(object)
+    listed.columns = ['Title', 'Href', 'Published']
+    hrefs    = listed.Href
+    
+    ## Canonicalizing a link is the costly part of indexing. When the home page has no path, the
+    ## canonical full link of a relative link holding only a path (the usual article link) is the
+    ## canonical home followed by the path without its trailing slash, which is built for the
+    ## whole column at once. Any other link is canonicalized on its own with `CanonicalLink`.
+    site = urlsplit(master_site)
+    root = CanonicalLink(master_site).rstrip('/') if site.path in ('', '/') and not site.query else None
+    full_links = pd.Series(None, index=listed.index, dtype=object)
+    if root is not None:
+        simple = hrefs.str.fullmatch(r'(?:/[^/?#\s]+)+/?', na=False)
+        full_links[simple] = root + hrefs[simple].str.rstrip('/')
+    rest = full_links.isna().to_numpy()
+    full_links[rest] = [CanonicalLink(master_site + link) for link in hrefs[rest]]
+    
+    ## Keep the articles under the link extensions, the first link to each article, and the
+    ## articles that were not downloaded on an earlier run
+    keep = ~full_links.duplicated().to_numpy()
+    if sections is not None:
+        paths = full_links.str.replace(r'^[^:/?#]+://[^/?#]*|\?.*$', '', regex=True)
+        keep &= paths.str.match(sections.pattern).to_numpy()
+    if dedup is not None:
+        keep &= [link not in dedup for link in full_links]
+    listed, full_links = listed[keep], full_links[keep]
+    
+    ## Read the dates in the links for the articles listed without a publication time
+    published = pd.to_datetime(listed.Published)
+    if published.isna().any():
+        dates = listed.Href.str.extract(r"/(\d{4}/\d{2}/\d{2})/", expand=False)
+        published = published.fillna(pd.to_datetime(dates, format='%Y/%m/%d', errors='coerce'))
+    
+    ## Build the articles DataFrame, keyed by the canonical full links
+    Articles_df = pd.DataFrame({'Title': listed.Title.to_numpy(), 'Master Site': master_site,
+                                'Extension_1': extension_1, 'Extension_2': extension_2,
+                                'Extension_3': extension_3, 'Href': listed.Href.to_numpy(),
+                                'Published': published.to_numpy(dtype='datetime64[ns]')},
+                               index=full_links.to_numpy())
+    Articles_df['Downloaded'] = False
+    Articles_df['FullLink']   = Articles_df.index
+
+    return Articles_df
+
+def FetchLinks(articles):
+    ## Return the links to download the articles from, as an array: the home page followed by
+    ## the `Href` as the site listed it. The canonical `FullLink` only keys the articles, and is
+    ## used for the ones without an `Href` (e.g. an `articles_df` built by hand).
+    if 'Master Site' not in articles.columns or 'Href' not in articles.columns:
+        return articles.FullLink.to_numpy()
+    
+    return (articles['Master Site'] + articles.Href).fillna(articles.FullLink).to_numpy()
+
+class download_status:
+    ## The `Downloaded` flags of an articles DataFrame, updated by position while the articles
+    ## are downloaded, so duplicate titles don't clash and each update is an array write instead
+    ## of a `.loc` label lookup. `save` writes the flags back to the DataFrame.
+    def __init__(self, articles):
+        self.articles   = articles
+        self.downloaded = articles.Downloaded.to_numpy(dtype=bool, copy=True)
+    
+    def mark(self, pos):
+        self.downloaded[pos] = True
+    
+    def save(self):
+        self.articles['Downloaded'] = self.downloaded
+
+def SectionPattern(*extensions):
+    ## Compile the link extensions into one pattern matching the paths under any of them
+    extensions = ['/' + extension.strip('/') for extension in extensions if extension and extension.strip('/')]
+    if not extensions:
+        return None
+    
+    return re.compile('(?:' + '|'.join(re.escape(x) for x in extensions) + ')(?:/|$)')
+
+def CheckpointArticles(checkpoint, master_site, extension_1="", extension_2="", extension_3="",
+                       since=None, until=None):
+    ## Build the `articles` DataFrame from the articles recorded in a `crawl_checkpoint`, within
+    ## the `since` and `until` bounds
+    links = ((title, link) for link, title in checkpoint.state['index'].items())
+    
+    return ArticleIndex(ResumedInWindow(links, since, until), master_site,
+                        extension_1, extension_2, extension_3)
+
+def SavedFiles(files, download_folder):
+    ## Return which of the `File` names are already saved as .txt files in `download_folder`,
+    ## as a boolean Series. The folder is listed once and every file name is looked up in
+    ## that listing.
+    file_names = files.astype(str) + '.txt'
+    existing   = os.listdir(download_folder) if path.isdir(download_folder) else []
+    if os.name == 'nt':  # Windows file names are not case sensitive
+        file_names = file_names.str.lower()
+        existing   = [file.lower() for file in existing]
+    
+    return file_names.isin(existing)
+
+def InWindow(links, since=None, until=None):
+    ## Keep the (title, link, published) tuples published on or after `since` and before `until`.
+    ## Articles without a known publication time are kept.
+    for title, link, published in links:
+        if published is not None and ((since is not None and published < since) or
+                                      (until is not None and published >= until)):
+            continue
+        yield title, link, published
+
+def ResumedInWindow(links, since=None, until=None):
+    ## Keep the (title, link) pairs read back from a `crawl_checkpoint` that may have been
+    ## published on or after `since` and before `until`. The journal only holds the link, whose
+    ## date gives the day, so an article is only dropped when its whole day is out of bounds.
+    for title, link in links:
+        day = LinkTime(link)
+        if day is not None and ((since is not None and day + dt.timedelta(days=1) <= since) or
+                                (until is not None and day >= until)):
+            continue
+        yield title, link
+
+def ResumedLinks(resumed, links, checkpoint):
+    ## Yield the articles indexed before a crash, then the newly crawled ones, and record the
+    ## index as finished once the crawl has run to the end
+    try:
+        yield from resumed
+        yield from links
+        checkpoint.cursor('index', 'done')
+    finally:
+        checkpoint.flush()
+
+class create_index:
+    """
+    `create_index` is the module used to open a browser, go to a news site, and collect
+    publication titles and hyperlinks. A pandas DataFrame will be created with the canonical
+    article links as the index, and the titles and hyperlink info in the columns.
+    
+    Parameters
+    ----------
+    index_site : str
+    |    A string denoting the webpage of article links to be scraped.
+    |    This should be a specific section of the news site, not the base url.
+    
+    index_site_home_link : str
+    |    A string denoting the home page of the website to be scraped.
+    |    e.g. https://www.coindesk.com or https://www.bloomberg.com
+    |    The default is the `home` of the `profile`, or else the scheme and host of `index_site`.
+        
+    extension1 : str
+    |    A string denoting the first link extension that may, or may not, need to be included in
+    |    the hyperlink for specific articles, e.g. '/markets'. When any extension is passed, only
+    |    the articles whose link path starts with one of them are indexed.
+    |    The default is the empty string ("").
+        
+    extension2 : str
+    |    A string denoting the second link extension that may, or may not, need to be included in
+    |    the hyperlink for specific articles
+    |    The default is the empty string ("").
+        
+    extension3 : str
+    |    A string denoting the third link extension that may, or may not, need to be included in
+    |    the hyperlink for specific articles
+    |    The default is the empty string ("").
+        
+    n : int64
+    |    An integer denoting the number of times the `more` button will need to be clicked
+    |    when expanding the web page to include more articles in the `expand_page` method.
+    |    For some news sites, such WSJ, Twitter, Reddit, this needs to be replaced with
+    |    functionality that will instead keep scrolling a desired number of page lengthts.
+    |    The default is 1000 clicks (or page scrolls in the future).
+    
+    page_url : str
+    |    A link template for the paginated listing pages behind the `more` button, with a
+    |    `{page}` placeholder for the page number, e.g. https://www.coindesk.com/category/markets/{page}
+    |    When a template is passed no browser is opened, and the index is built by `index_pages`
+    |    instead of `expand_page` and `page_source`. The default is None.
+    
+    since : datetime.date, datetime.datetime or str
+    |    Only index the articles published on or after this date (or time, in UTC). Listings are
+    |    sorted newest first, so `expand_page` stops clicking `More`, and `crawl_pages` stops
+    |    requesting listing pages, once the oldest article listed is older than `since`. Strings
+    |    are read as ISO 8601, e.g. '2021-03-01'. The default is None (no cutoff).
+    
+    until : datetime.date, datetime.datetime or str
+    |    Only index the articles published before this date (or time, in UTC), e.g. `since`
+    |    '2021-03-01' and `until` '2021-04-01' index March 2021. The default is None.
+    
+    requests_per_second : float
+    |    The starting number of `More` clicks per second in `expand_page`, and of listing pages
+    |    requested per second by `crawl_pages`. The rate then adapts to how quickly the site
+    |    responds, see `crawl_scheduler`. The default is the rate of the `profile`, or 2
+    |    requests per second.
+    
+    profile : site_profile, dict or str
+    |    The `site_profile` of the news site (or its spec, the name of a built-in profile, or the
+    |    path of a JSON profile, see `LoadProfile`): the listing anchors and filters, how the
+    |    listing is paginated (clicking its `more_button`, scrolling, or a `page_url` template
+    |    used when `page_url` is not passed) and its request rate. The default is None, the
+    |    coindesk markup.
+    
+    batch_size : int
+    |    The number of links `page_source` pulls out of the expanded page at a time. Only the
+    |    html of those links is copied out of the browser, rather than the whole page source,
+    |    so memory follows the batch size instead of the number of `More` clicks. The default
+    |    is 500 links.
+    
+    store : article_store or str
+    |    A persistent `article_store` (or the path of its SQLite file). When passed, the articles
+    |    found by `page_source` and `index_pages` are added to the store, and `index_pages` stops
+    |    as soon as it reaches an article that is already stored. The default is None.
+    
+    pool : driver_pool
+    |    A `driver_pool` to check the browser out of, instead of starting a new Firefox.
+    |    The browser is handed back to the pool at the end of `page_source`. The default is None.
+    
+    checkpoint : crawl_checkpoint or str
+    |    A `crawl_checkpoint` (or the path of its journal) that the index cursor and the articles
+    |    found are recorded in. `crawl_pages` resumes from the last listing page in the journal.
+    |    A browser page cannot be restored, so `expand_page` still clicks `More` from the start,
+    |    but the articles it found before the crash are kept by `page_source`. The default is None.
+    
+    metrics : crawl_metrics
+    |    The `crawl_metrics` the `More` clicks, listing page requests and page parsing are timed
+    |    into. The default is the module's `METRICS`.
+    
+    cache : page_cache or str
+    |    A `page_cache` (or the folder of one) the listing pages requested by `crawl_pages` are
+    |    saved to. Listings change as articles are published, so cached listing pages are always
+    |    revalidated, and only downloaded again if they changed. The default is None.
+    
+    dedup : link_filter or str
+    |    A `link_filter` (or the path of its file) of the canonical links downloaded on earlier
+    |    runs, or by other crawls sharing it. Articles already in the filter are left out of
+    |    `articles`. Links are only added to the filter by `scrape_index` once their article is
+    |    downloaded, so pass it the same filter. The default is None.
+    
+    scheduler : crawl_scheduler
+    |    A `crawl_scheduler` shared with other crawls of the same site, which paces the `More`
+    |    clicks and listing page requests in place of one built from `requests_per_second`.
+    |    The default is None.
+    
+    Methods
+    ----------
+    `expand_page`
+    |    This method will expand the web page a desired number of times to display more articles
+    |    on the page. When lengthy periods of time (in excess of 2-3 months), this method will
+    |    require thousands of iterations, whether that be clicking a button to expand the page,
+    |    or continuing to scroll down the page. The behavior is inconsistent across major outlets,
+    |    and with sites that use buttons to expand the page, it is difficult to dynamically locate
+    |    a button that will expand the page.
+    
+    `page_source`
+    |    This method will collect all article titles and hyperlinks from the desired web page.
+    |    The `expand_page` method should be used first to expand the text corpus that will be
+    |    indexed, but it is not a requirement. A pandas DataFrame will be returned as a class
+    |    attribute called, `articles`.
+    
+    `crawl_pages`
+    |    This method will request the listing pages built from `page_url` one at a time and
+    |    yield the article titles and hyperlinks of each page as soon as it has been parsed.
+    |    The crawl stops at the end of the listing, when a page only holds articles older than
+    |    `since`, or when an article that is already in `known_links` is reached.
+    
+    `index_pages`
+    |    This method will collect the output of `crawl_pages` into the `articles` DataFrame,
+    |    the same way `page_source` does for an expanded page.
+    
+    `go`
+    |    This method will call the prior two methods (or `index_pages` when a `page_url` was
+    |    passed) and provides a slightly faster way to call the necessary attributes to index
+    |    a news site.
+    
+    Attributes
+    ----------
+    `driver` : Selenium Webbrowser Object
+        The selenium webdriver which will be used to scrape the article index.
+        
+    `articles` : pandas.DataFrame
+        A dataframe containing the article titles and hyperlinks to be scraped, with the
+        publication time of each article in a datetime64 `Published` column (NaT if unknown).
+        
+    All other parameters passed to the `create_index` class will be appended as attributes.
+    """
+
+    def __init__(self, index_site, index_site_home_link=None,
+                 extension1="", extension2="", extension3="", n=1000,
+                 page_url=None, requests_per_second=None, store=None, pool=None, checkpoint=None,
+                 metrics=None, cache=None, dedup=None, since=None, until=None, profile=None,
+                 batch_size=500, scheduler=None):
+        ## The profile supplies the pagination and the rate the caller did not
+        profile = LoadProfile(profile)
+        if page_url is None and profile is not None and profile.pagination == 'pages':
+            page_url = profile.page_url
+        if requests_per_second is None:
+            requests_per_second = profile.requests_per_second if profile is not None else 2.0
+        if index_site_home_link is None and profile is not None and profile.home:
+            index_site_home_link = profile.home
+        elif index_site_home_link is None:
+            site = urlsplit(index_site)
+            index_site_home_link = f"{site.scheme}://{site.netloc}"
+        
+        ## The paginated listing pages are plain html, so no browser is needed to crawl them
+        driver = None
+        if page_url is None and pool is not None:
+            ## Use a warm browser from the pool
+            driver = pool.acquire()
+            driver.get(index_site)
+        elif page_url is None:
+            ## Initiate `Firefox` browser and access the desired website to create an article index for.
+            ## Currently, this is really only works perfectly for specific sections of coindesk.com
+            ## I also could add functionality to work across multiple browsers such as chrome, edge, safari...
+            ## Open the browser and go to the desired news page to scrape.
+            ## This should not be the home page for the website. It should be a specific section
+            ## of the news site which itself is their own index of articles related to the desired category.
+            driver = StartFirefox(headless=False)
+            driver.get(index_site)
+                
+        ## Return the passed inputs as attributes of the `create_index` class
+        self.driver               = driver
+        self.index_site           = index_site
+        self.index_site_home_link = index_site_home_link
+        self.extension1           = extension1
+        self.extension2           = extension2
+        self.extension3           = extension3
+        self.n                    = n
+        self.page_url             = page_url
+        self.requests_per_second  = requests_per_second
+        self.store                = article_store(store) if isinstance(store, str) else store
+        self.pool                 = pool
+        self.checkpoint           = crawl_checkpoint(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        self.metrics              = metrics if metrics is not None else METRICS
+        self.cache                = page_cache(cache) if isinstance(cache, str) else cache
+        self.dedup                = link_filter(dedup) if isinstance(dedup, str) else dedup
+        self.since                = DateBound(since)
+        self.until                = DateBound(until)
+        self.profile              = profile
+        self.batch_size           = batch_size
+        self.streamed             = 0
+        self.scheduler            = scheduler
+        
+    def expand_page(self):
+        """
+        
+
+        Returns
+        -------
+        None.
+
+        """
+        ## Collect the necessary class attributes
+        driver = self.driver
+        n      = self.n
+        
+        ## Identify the button to expand the number of articles displayed, unless the site
+        ## loads more articles as the page is scrolled
+        profile  = self.profile
+        scroll   = profile is not None and profile.pagination == 'scroll'
+        more_btn = None
+        if not scroll:
+            from selenium.webdriver.common.by import By
+            more_btn = driver.find_element(By.CSS_SELECTOR, profile.more_button if profile is not None
+                                                            else "h3.heading")
+        
+        ## Notify user of the lengthy process that is about to start
+        print(f"The page will now be expanded, {n:,} times, to display more article links.")
+
+        ## The click rate adapts to how quickly the site loads the new articles
+        scheduler  = self.scheduler if self.scheduler is not None else crawl_scheduler(self.requests_per_second)
+        links      = LinkCount(driver)
+        stalled    = 0
+        checkpoint = self.checkpoint
+        metrics    = self.metrics
+
+        ## Click the `More` button `n` number of times
+        for i in range(n):
+            ### Notify user of progress due to this being a lengthy process
+            clear_output(wait=True)
+            print(f"{round(100*i/(n-1),2)}% - {i+1} of {n}")
+            
+            scheduler.wait(self.index_site)
+            start = time.monotonic()
+            try:
+                #### Try clicking the button (or scrolling to the bottom of the page)
+                if scroll:
+                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight)")
+                else:
+                    more_btn.click()
+            except:  # Bare except feels wrong... but python doesn't want to recognize this error from selenium...
+                #### Otherwise, scroll past the ad box blocking the button and try again
+                driver.maximize_window()
+                driver.execute_script("window.scrollTo(0, window.scrollY + 225)")
+
+                if more_btn is not None:
+                    more_btn.click()
+            
+            ### Wait for the new articles to show up, rather than sleeping a fixed time
+            new_links = WaitForLinks(driver, links)
+            scheduler.record(self.index_site, time.monotonic() - start,
+                             200 if new_links > links else None)
+            metrics.observe('navigation', time.monotonic() - start)
+            metrics.count('requests')
+            
+            ### Stop once a few clicks in a row have not added any articles
+            stalled = stalled + 1 if new_links <= links else 0
+            links   = new_links
+            if stalled >= 3:
+                print(f"No new articles after {stalled} clicks, the page is fully expanded.")
+                break
+            
+            ### Stop once the page lists articles older than the `since` cutoff
+            if self.since is not None:
+                oldest = OldestListed(driver)
+                if oldest is not None and oldest < self.since:
+                    print(f"Articles back to {oldest:%Y-%m-%d} are listed, the page is expanded "
+                          f"past {self.since:%Y-%m-%d}.")
+                    break
+            
+            ### Every 25 clicks, record the articles found so far in the checkpoint
+            if checkpoint is not None:
+                checkpoint.cursor('expand', i + 1)
+                if (i + 1) % 25 == 0:
+                    self.checkpoint_links()
+    
+    def streamed_links(self, start=0):
+        ## Pull the links on the page out of the browser `batch_size` at a time, from the
+        ## `start`-th one on, and yield the (title, link, published) of the articles among them
+        batches = ListingBatches(self.driver, start, self.batch_size)
+        while True:
+            with self.metrics.timer('page_source'):
+                batch = next(batches, None)
+            if batch is None:
+                return
+            self.streamed, nodes = batch
+            self.metrics.count('bytes_fetched', len(nodes.encode('utf-8')))
+            
+            with self.metrics.timer('extraction'):
+                rows = list(DatedArticleLinks(nodes, self.profile))
+            yield from rows
+    
+    def checkpoint_links(self):
+        ## Record the articles added to the page since the last call that are not in the
+        ## checkpoint yet
+        checkpoint = self.checkpoint
+        for title, link, _ in InWindow(self.streamed_links(self.streamed), self.since, self.until):
+            if link not in checkpoint.state['index']:
+                checkpoint.indexed(title, link)
+    
+    def checkpointed_links(self, links):
+        ## Record the articles in the checkpoint as they are indexed, then add the articles
+        ## found before a crash that are no longer on the page
+        checkpoint, seen = self.checkpoint, set()
+        for title, link, published in links:
+            seen.add(link)
+            if link not in checkpoint.state['index']:
+                checkpoint.indexed(title, link)
+            yield title, link, published
+        
+        checkpoint.cursor('index', 'done')
+        resumed = [(title, link) for link, title in checkpoint.state['index'].items() if link not in seen]
+        for title, link in ResumedInWindow(resumed, self.since, self.until):
+            yield title, link, LinkTime(link)
+
+    def page_source(self):
+        ## Collect the necessary class attributes
+        driver               = self.driver
+        index_site           = self.index_site
+        index_site_home_link = self.index_site_home_link
+        extension1           = self.extension1
+        extension2           = self.extension2
+        extension3           = self.extension3
+        
+        ## The full html page source is a MASSIVE string after thousands of clicks, so the links
+        ## are pulled out of the browser in batches instead. `ArticleIndex` collects the article
+        ## titles, links and publication times displayed on the markets page as they arrive,
+        ## within the `since` and `until` bounds. Only those are recorded in the checkpoint.
+        links = InWindow(self.streamed_links(), self.since, self.until)
+        if self.checkpoint is not None:
+            ### Record the finished index, and keep the articles found before a crash
+            links = self.checkpointed_links(links)
+        articles = ArticleIndex(links, index_site_home_link,
+                                extension1, extension2, extension3, self.dedup)
+        self.metrics.count('pages_indexed')
+        
+        ## Close the web driver (or hand it back to the `driver_pool`)
+        driver.quit()
+        
+        ## Add the new articles to the persistent index
+        if self.store is not None:
+            self.store.upsert(articles)
+        
+        self.articles = articles
+        
+    def crawl_pages(self, since=None, known_links=None, max_pages=None, until=None):
+        """
+        Request the listing pages one at a time and yield the (title, link, published) tuples
+        found on them, where `published` is the `datetime.datetime` the article was published
+        (or None if the listing does not show it).
+        
+        Parameters
+        ----------
+        since : datetime.date, datetime.datetime or str
+        |    Stop once a listing page only holds articles published before this date. Articles
+        |    published before `since` are skipped. The default is the `since` of `create_index`.
+        
+        known_links : set
+        |    Links (either the `Href` or the `FullLink`) of articles that are already indexed.
+        |    Listings are sorted newest first, so the crawl stops at the first known article
+        |    published within `since` and `until`.
+        |    The default is None.
+        
+        max_pages : int
+        |    The maximum number of listing pages to request. The default is None (no limit).
+        
+        until : datetime.date, datetime.datetime or str
+        |    Articles published on or after this date are skipped, while the crawl carries on to
+        |    the older listing pages. The default is the `until` of `create_index`.
+        
+        Yields
+        -------
+        (title, link, published) : tuple
+        """
+        ## Collect the necessary class attributes
+        page_url             = self.page_url
+        index_site_home_link = self.index_site_home_link
+        known_links          = known_links if known_links is not None else set()
+        since                = DateBound(since) if since is not None else self.since
+        until                = DateBound(until) if until is not None else self.until
+        
+        engine     = fetch_engine(concurrency=1, requests_per_second=self.requests_per_second,
+                                  scheduler=self.scheduler, metrics=self.metrics, cache=self.cache,
+                                  revalidate=True)
+        seen       = set()
+        page_n     = 0
+        checkpoint = self.checkpoint
+        
+        ## Pick up after the last listing page recorded in the checkpoint
+        if checkpoint is not None:
+            page_n = checkpoint.state['cursor'].get('pages', 0)
+            seen   = {CanonicalLink(link) for link in checkpoint.state['index']}
+        
+        while max_pages is None or page_n < max_pages:
+            page_n += 1
+            
+            ### Download the next listing page. A missing page means we are past the last one
+            try:
+                page = engine.fetch_html_retry(page_url.format(page=page_n))
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    break
+                raise
+            
+            print(f"Listing page {page_n} - {len(seen):,} articles indexed")
+            self.metrics.count('pages_indexed')
+            
+            ### Stop once every dated article on the page is older than the cutoff
+            listed = list(DatedArticleLinks(page, self.profile))
+            dates  = [published for _, _, published in listed if published is not None]
+            if since is not None and dates and max(dates) < since:
+                break
+            
+            new_links = 0
+            for title, link, published in listed:
+                href = CanonicalLink(link)
+                if href in seen:
+                    continue
+                seen.add(href)
+                new_links += 1
+                
+                if published is not None and ((since is not None and published < since) or
+                                              (until is not None and published >= until)):
+                    continue
+                
+                #### Listings are newest first, so a known article in the window means the rest
+                #### of the window is indexed too. Known articles outside it (e.g. newer than the
+                #### `until` of a backfill) are passed over.
+                keys = (href, CanonicalLink(index_site_home_link + link), link, index_site_home_link + link)
+                if any(key in known_links for key in keys):
+                    return
+                
+                if checkpoint is not None:
+                    checkpoint.indexed(title, link)
+                yield title, link, published
+            
+            if checkpoint is not None:
+                checkpoint.cursor('pages', page_n)
+            
+            ### A page without any new links means the site is repeating its last page
+            if new_links == 0:
+                break
+    
+    def index_pages(self, since=None, known_links=None, max_pages=None, until=None):
+        ## Articles in the persistent index have been crawled on an earlier run
+        if known_links is None:
+            known_links = self.store
+        
+        ## Stream the listing pages straight into the article index, after any articles
+        ## indexed before a crash
+        links = self.crawl_pages(since, known_links, max_pages, until)
+        if self.checkpoint is not None:
+            since   = DateBound(since) if since is not None else self.since
+            until   = DateBound(until) if until is not None else self.until
+            resumed = [(title, link) for link, title in self.checkpoint.state['index'].items()]
+            links   = ResumedLinks(list(ResumedInWindow(resumed, since, until)), links, self.checkpoint)
+        articles = ArticleIndex(links,
+                                self.index_site_home_link,
+                                self.extension1, self.extension2, self.extension3, self.dedup)
+        
+        ## Add the new articles to the persistent index
+        if self.store is not None:
+            self.store.upsert(articles)
+        
+        self.articles = articles
+    
+    def go(self):
+        
+        ## Skip the index stage of a resumed crawl that had already finished it
+        if self.checkpoint is not None and self.checkpoint.state['cursor'].get('index') == 'done':
+            self.articles = CheckpointArticles(self.checkpoint, self.index_site_home_link,
+                                               self.extension1, self.extension2, self.extension3,
+                                               self.since, self.until)
+            return self
+        
+        if self.page_url is not None:
+            self.index_pages()
+            return self
+
+        try:
+            self.expand_page()
+            self.page_source()
+        finally:
+            if self.checkpoint is not None:
+                self.checkpoint.flush()
+        
+        return self
+
+class scrape_index:
+    """
+    `scrape_index` provides methods for iterating over the DataFrame created from the `create_index`
+    class. The articles will be saved as .txt files to a desired folder on the local machine. 
+    
+    Parameters
+    ----------
+    articles_df : pandas.DataFrame
+    |    A pandas DataFrame that was returned as the .articles attribute from the `create_index`
+    |    class. It is necessary for this df to have the article titles in a 'Title' column (or
+    |    in the index), and full article hyperlinks that need to be scraped. Additionally, there
+    |    needs to be a boolean column called 'Downloaded' which denotes if the article has
+    |    already been downloaded.
+    |    Pass None to read the articles from `store` instead.
+    
+    index_site : str
+    |    A string denoting the webpage of article links to be scraped.
+    |    This should be a specific section of the news site, not the base url.
+    |    For the `scrape_index` class this is really only used as an initial landing spot
+    |    for the web driver before individual articles are scraped.
+    
+    download_folder : str
+    |    The local folder path which will be used to save the .txt files.
+    |    This should NOT include the sytstem path seperators at the end of the string.
+    
+    output_format : str
+    |    How the articles are saved to `download_folder`. Either 'txt' for one .txt file per
+    |    article, or 'jsonl.gz' to append them to the compressed shards of a `corpus_writer`.
+    |    The default is 'txt'.
+    
+    store : article_store or str
+    |    A persistent `article_store` (or the path of its SQLite file). When `articles_df` is None,
+    |    the articles that have not been downloaded yet are read from the store. The articles
+    |    downloaded by `scrape` are flagged in the store. The default is None.
+    
+    page_size : int
+    |    When the articles are read from `store`, `scrape` reads and downloads them `page_size`
+    |    at a time (see `article_store.pages`), so a large index is never loaded in one piece
+    |    and the first downloads start without waiting for it. With the default of None they
+    |    are all read when `scrape_index` is created.
+    
+    dedup : link_filter or str
+    |    The `link_filter` (or the path of its file) passed to `create_index`. The canonical links
+    |    of the articles downloaded by `scrape` are added to it, so a download that failed is
+    |    indexed again on the next run. The default is None.
+    
+    concurrency : int
+    |    The number of articles downloaded at the same time. With the default of 1 every article
+    |    is opened in the Firefox driver one at a time. With more than 1 worker, articles are
+    |    downloaded over plain HTTP by a `fetch_engine`, and the driver is only used for pages
+    |    that need JavaScript to display the article.
+    
+    requests_per_second : float
+    |    The starting number of requests per second sent to the news site. The rate then adapts
+    |    to how quickly the site responds, see `crawl_scheduler`. Articles that fail to download
+    |    with an error `Retryable` accepts (a dropped connection, a throttled request or a browser
+    |    error) are retried with a backoff once the others are done. The default is the rate of the
+    |    `profile`, or 2 requests per second.
+    
+    browser_fallback : bool
+    |    Whether pages that do not render over plain HTTP should be opened in the Firefox driver
+    |    when `concurrency` is greater than 1. Without it, no browser is started at all.
+    |    The default is True.
+    
+    pool : driver_pool
+    |    A `driver_pool` to check browsers out of, instead of starting a new Firefox. With more
+    |    than 1 worker, every page that needs JavaScript checks out its own browser, so several
+    |    can be rendered at the same time. The default is None.
+    
+    parse_processes : int
+    |    The number of processes that parse the downloaded pages when `concurrency` is greater
+    |    than 1. With the default of 0, each page is parsed by the thread that downloaded it.
+    |    Otherwise the downloads and the parsing run as separate stages of a `parse_pipeline`.
+    
+    checkpoint : crawl_checkpoint or str
+    |    A `crawl_checkpoint` (or the path of its journal) that the download queue and the status
+    |    and retry count of every article are recorded in. Articles the journal lists as done are
+    |    not downloaded again, and retries carry on from the recorded count. The default is None.
+    
+    metrics : crawl_metrics
+    |    The `crawl_metrics` that the navigation, page_source, extraction, cleaning and write
+    |    timings, and the request, retry and failure counts are recorded into. Call its `dump`
+    |    method after `scrape` to save them. The default is the module's `METRICS`.
+    
+    cache : page_cache or str
+    |    A `page_cache` (or the folder of one) of raw article pages. Pages fetched less than
+    |    `cache.ttl` seconds ago are not downloaded again, and every downloaded page is saved to
+    |    the cache. The default is None.
+    
+    offline : bool
+    |    Re-extract every article from the pages saved in `cache`, without any network I/O and
+    |    without opening a browser, e.g. after a change to `ExtractArticle`. Articles that were
+    |    already saved are written again, and articles missing from the cache are skipped. When
+    |    `articles_df` is None, every article in `store` is re-extracted. The default is False.
+    
+    duplicates : near_duplicates or str
+    |    A `near_duplicates` index (or the path of its SQLite file) that every article is checked
+    |    against and added to as it is written. The original each near-duplicate repeats is
+    |    recorded in the `Duplicate_Of` column of `articles`. The default is None.
+    
+    skip_duplicates : bool
+    |    Whether near-duplicates are left unsaved instead of only being flagged. They are still
+    |    marked as downloaded, so they are not fetched again. The default is False.
+    
+    profile : site_profile, dict or str
+    |    The `site_profile` the articles are extracted with (see `create_index`). `concurrency`
+    |    is capped at the profile's `max_concurrency`. The default is None, the coindesk markup.
+    
+    since, until : datetime.date, datetime.datetime or str
+    |    When `articles_df` is None, only read the articles published on or after `since` and
+    |    before `until` from `store`, with a range scan of its publication date index (see
+    |    `article_store.between`). The defaults are None.
+    
+    scheduler : crawl_scheduler
+    |    A `crawl_scheduler` used in place of one built from `requests_per_second`. Failed
+    |    articles are queued in its retry queue, so crawls running side by side should each pass
+    |    their own `share()` of a common scheduler. The default is None.
+        
+    Methods
+    ----------
+    `scrape`
+        This method will open the article on the news site, collect the full HTML page source,
+        and clean the page source to grab relevant article elements such as the title, author,
+        publishing date/time, and article text. Images, videos, and embedded hyperlinks, will
+        be dropped.
+
+    Attributes
+    ----------
+    `articles` : pandas.DataFrame
+        An updated dataframe containing the article titles and hyperlinks to be scraped,
+        with the downloaded status and the `File` name each article was saved under.
+    
+    """
+    def __init__(self, articles_df, index_site, download_folder, output_format='txt', store=None,
+                 concurrency=1, requests_per_second=None, browser_fallback=True, pool=None,
+                 parse_processes=0, checkpoint=None, metrics=None, cache=None, offline=False,
+                 duplicates=None, skip_duplicates=False, since=None, until=None, profile=None,
+                 scheduler=None, dedup=None, page_size=None):
+        profile = LoadProfile(profile)
+        if requests_per_second is None:
+            requests_per_second = profile.requests_per_second if profile is not None else 2.0
+        if profile is not None:
+            concurrency = min(concurrency, profile.max_concurrency)
+        cache = page_cache(cache) if isinstance(cache, str) else cache
+        duplicates = near_duplicates(duplicates) if isinstance(duplicates, str) else duplicates
+        if offline and cache is None:
+            raise ValueError("offline re-extraction needs the `cache` the pages were saved to")
+        
+        ## Read the articles that still need to be downloaded from the persistent index
+        ## (or all of them, to re-extract them from the cache). With a `page_size`, `scrape`
+        ## reads them a page at a time instead.
+        store = article_store(store) if isinstance(store, str) else store
+        if articles_df is None and page_size is None and (since is not None or until is not None):
+            articles_df = store.between(since, until, pending=not offline)
+        elif articles_df is None and page_size is None:
+            articles_df = store.to_frame() if offline else store.pending()
+        
+        ## Browsers from a `driver_pool` are checked out when `scrape` runs, and none are
+        ## needed offline, or by concurrent downloads without a browser fallback
+        driver = None
+        if pool is None and not offline and (concurrency <= 1 or browser_fallback):
+            ## Initiate `Firefox` browser and access the desired website to create an article index for.
+            ## Currently, this is really only works perfectly for specific sections of coindesk.com
+            ## Open the browser and go to the desired news page to scrape.
+            ## This should not be the home page for the website. It should be a specific section
+            ## of the news site which itself is their own index of articles related to the desired category.
+            driver = StartFirefox(headless=False)
+            driver.get(index_site)
+                
+        ## Return the passed inputs as attributes of the `scrape_index` class
+        self.driver = driver
+        self.articles_df = articles_df
+        self.download_folder = download_folder
+        self.output_format = output_format
+        self.store = store
+        self.dedup = link_filter(dedup) if isinstance(dedup, str) else dedup
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.browser_fallback = browser_fallback
+        self.pool = pool
+        self.parse_processes = parse_processes
+        self.checkpoint = crawl_checkpoint(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        self.metrics = metrics if metrics is not None else METRICS
+        self.cache = cache
+        self.offline = offline
+        self.duplicates = duplicates
+        self.skip_duplicates = skip_duplicates
+        self.profile = profile
+        self.scheduler = scheduler
+        self.since = since
+        self.until = until
+        self.page_size = page_size
+        
+    def scrape(self):
+        driver = self.driver
+        articles = self.articles_df
+        download_folder = self.download_folder
+        concurrency = self.concurrency
+        pool = self.pool
+        metrics = self.metrics
+        cache = self.cache
+        duplicates = self.duplicates
+        profile = self.profile
+        
+        ## The scheduler paces the requests to the site and keeps the failed articles for later
+        scheduler = self.scheduler if self.scheduler is not None else crawl_scheduler(self.requests_per_second)
+        
+        ## Record the outcome of every download in the checkpoint journal
+        checkpoint = self.checkpoint
+        attempts   = checkpoint.state['attempts'] if checkpoint is not None else {}
+        def Record(link, status, attempt=0):
+            if checkpoint is not None:
+                checkpoint.status(link, status, attempt)
+        
+        def Failed(link, attempt):
+            metrics.count('failures')
+            Record(link, 'failed', attempt)
+        
+        def Retry(pos, link, attempt):
+            if scheduler.retry_later(pos, link, attempt):
+                metrics.count('retries')
+                Record(link, 'retry', attempt)
+                return True
+            Failed(link, attempt)
+            return False
+        
+        ## Check a browser out of the pool for the one-at-a-time loop. With more workers the
+        ## `fetch_engine` checks browsers out as it needs them.
+        if pool is not None and concurrency <= 1:
+            driver = pool.acquire()
+        
+        ## Open the compressed corpus when the articles are not saved as .txt files
+        if self.output_format == 'txt':
+            corpus = None
+        elif self.output_format == 'jsonl.gz':
+            corpus = corpus_writer(download_folder)
+        else:
+            raise ValueError(f"Unknown output_format {self.output_format!r}, use 'txt' or 'jsonl.gz'")
+        
+        ## Define `clean_title()` to remove characters that can't be included in file names
+        def clean_title(title):
+            title = title.encode('unicode_escape').decode('ascii')
+            
+            ### Remove these characters
+            for x in [
+                r"\\u(.){3,4}", r"'\\u(.){3,4}'", r"\\u",
+                "\?", "\\!", "\\$", r"\\", "/", "|",
+                "\\*", "&", "nbsp", '<.+?>', '&nbsp;',
+                '&amp', "<", ">", '"', "  "
+            ]:
+        
+                title = re.sub(x, '', title)
+        
+            ### Replace these characters
+            for x in ["\\:", "\\;", "\\|", "\\.", "\\'"]:
+                title = re.sub(x, '-', title)
+            
+            return title
+        
+        ## Define `Collect_Article()` to have a link passed to it and return the article text
+        ## contained in that link as a `list`
+        def Collect_Article(driver, link):
+            ### Use the cached page if it was fetched recently
+            page = cache.get(link) if cache is not None else None
+            if page is not None:
+                metrics.count('cache_hits')
+                with metrics.timer('extraction'):
+                    return ExtractArticle(page, profile)
+            
+            with scheduler.slot(link):
+                scheduler.wait(link)
+                start = time.monotonic()
+                metrics.count('requests')
+                try:
+                    ### Try to open the article
+                    with metrics.timer('navigation'):
+                        driver.get(link)
+                except Exception:  # Selenium errors do not share a common base class we can import here
+                    ### No internet connection, or the browser connection was broken. `Retryable`
+                    ### decides whether the article is tried again.
+                    scheduler.record(link, time.monotonic() - start, None)
+                    raise
+                scheduler.record(link, time.monotonic() - start, 200)
+            
+            ### Collect the entire html page source data and clean it with `ExtractArticle`
+            with metrics.timer('page_source'):
+                page = driver.page_source
+            metrics.count('bytes_fetched', len(page.encode('utf-8')))
+            if cache is not None:
+                cache.put(link, page)
+            with metrics.timer('extraction'):
+                return ExtractArticle(page, profile)
+        
+        ## Define `Write_TXT()` to process a list of strings and convert that list into a .txt file
+        def Write_TXT(article, title, download_folder):
+            ### The following three variables could be inputs for the function.
+            ### Will keep these as local variables for now.
+            file_name = f"{title}.txt"
+            full_name = os.path.join(download_folder, file_name)
+            # Save the article as a .txt file
+            with open(full_name, 'w') as f:
+                #for item in article:
+                f.write("\n".join(article))
+                f.close()
+        
+        ## Define `Write_Article()` to save an article in the chosen `output_format`, after
+        ## checking it against the articles already written
+        duplicate_of = {}
+        def Write_Article(article, title, link):
+            if duplicates is not None:
+                with metrics.timer('near_duplicates'):
+                    match = duplicates.add(link, article)
+                if match is not None:
+                    duplicate_of[link] = match[0]
+                    metrics.count('near_duplicates')
+                    if self.skip_duplicates:
+                        return
+            
+            with metrics.timer('write'):
+                if corpus is None:
+                    Write_TXT(article, title, download_folder)
+                else:
+                    corpus.write(article, title, link)
+            metrics.count('articles_written')
+        
+        ## Define Collect_Corpus() to have the dataframe created from ArticleIndex()
+        ## (with FullLink applied) passed to this function, where the FullLink column will be
+        ## iterated over to collect the article text into a dictionary.
+        def Collect_Corpus(Articles_df):
+            ### Define storage dictionary and iterating variables
+            # corpus = {}
+            i, n = 0, Articles_df.shape[0]
+            start = dt.datetime.now()
+            
+            ### Track the download status by position (see `download_status`)
+            status     = download_status(Articles_df)
+            downloaded = status.downloaded
+            urls       = FetchLinks(Articles_df)
+            
+            ### Iterate over Articles_df. The download status is written back to the
+            ### DataFrame even if the loop is interrupted.
+            try:
+                for pos, (title, link) in enumerate(zip(Articles_df.File, Articles_df.FullLink)):
+                    i += 1
+                
+                    #### Due to this being a lengthy/costly loop, notify the user of what
+                    #### iteration and article the function is on
+                    if i % 5 == 0:
+                        clear_output(wait=True)
+                        timer = dt.datetime.now()
+                        print(f"{round(100*i/n,2)}% - {i} of {n} | {str(timer-start)}")
+                    print(f"{i} of {n}")
+                    print(f"Collecting: {title}")
+                
+                    #### Download the article if it is not already downloaded
+                    if downloaded[pos] == False:
+                
+                        try:
+                            ###### Collect the article text from the link and write it to a text file
+                            article = Collect_Article(driver, urls[pos])
+                            Write_Article(article, title, link)
+                            status.mark(pos)
+                            Record(link, 'done')
+                    
+                        except Exception as e:
+                            ###### Queue a dropped connection or a throttled request to be tried
+                            ###### again after the other articles. Other errors are not retried.
+                            if Retryable(e):
+                                print(f"{title} could not be downloaded. Trying again later")
+                                Retry(pos, link, attempts.get(link, 0) + 1)
+                            else:
+                                print(f"{title} could not be downloaded. {e!r}")
+                                Failed(link, attempts.get(link, 0))
+                    
+                    else:
+                        #### Notify user if the article was already downloaded
+                        print(f"{title} already downloaded!")
+                
+                ### Work through the retry queue, waiting out each article's backoff
+                for pos, link, attempt in scheduler.due_retries(block=True):
+                    title = Articles_df.File.iat[pos]
+                    
+                    try:
+                        article = Collect_Article(driver, urls[pos])
+                        Write_Article(article, title, link)
+                        status.mark(pos)
+                        Record(link, 'done')
+                    except Exception as e:
+                        if not Retryable(e):
+                            print(f"{title} could not be downloaded. {e!r}")
+                            Failed(link, attempt)
+                        elif not Retry(pos, link, attempt + 1):
+                            print(f"{title} could not be downloaded after {attempt} retries.")
+            finally:
+                status.save()
+                    
+            return Articles_df
+        
+        ## Define Collect_Corpus_Concurrent() as the multi-worker version of Collect_Corpus().
+        ## Articles are downloaded by a `fetch_engine` thread pool, while the .txt files are
+        ## written and the `Downloaded` flags are updated here, on the calling thread.
+        def Collect_Corpus_Concurrent(Articles_df):
+            ### Only hand the articles that still need to be downloaded to the fetch engine.
+            ### Articles are passed by position, so duplicate titles don't clash.
+            status     = download_status(Articles_df)
+            downloaded = status.downloaded
+            titles     = Articles_df.File.to_numpy()
+            pending    = (~downloaded).nonzero()[0]
+            links      = Articles_df.FullLink.to_numpy()
+            urls       = FetchLinks(Articles_df)
+            i, n = 0, len(pending)
+            start = dt.datetime.now()
+            
+            engine = fetch_engine(concurrency=concurrency,
+                                  driver=driver if self.browser_fallback else None,
+                                  pool=pool if self.browser_fallback else None,
+                                  scheduler=scheduler, metrics=metrics, cache=cache, profile=profile)
+            
+            try:
+                jobs = ((pos, urls[pos], attempts.get(links[pos], 0)) for pos in pending)
+                retry = lambda pos, link, attempt: Record(links[pos], 'retry', attempt)
+                
+                #### Parse in a pool of processes, which hands back the articles in batches
+                if self.parse_processes > 0:
+                    pipeline = parse_pipeline(engine, processes=self.parse_processes)
+                    results  = (result for batch in pipeline.map(jobs, on_retry=retry) for result in batch)
+                else:
+                    results  = engine.map(jobs, on_retry=retry)
+                
+                for pos, article, source in results:
+                    i += 1
+                    title = titles[pos]
+                    
+                    #### Notify the user of progress
+                    if i % 5 == 0:
+                        clear_output(wait=True)
+                        timer = dt.datetime.now()
+                        print(f"{round(100*i/n,2)}% - {i} of {n} | {str(timer-start)}")
+                    
+                    if isinstance(article, Exception):
+                        print(f"{title} could not be downloaded. {article!r}")
+                        Record(links[pos], 'failed', attempts.get(links[pos], 0))
+                        continue
+                    
+                    try:
+                        ##### Write the collected article to a text file
+                        Write_Article(article, title, links[pos])
+                        status.mark(pos)
+                        Record(links[pos], 'done')
+                    except OSError as e:
+                        print(f"{title} could not be saved. {e!r}")
+                        Record(links[pos], 'failed', attempts.get(links[pos], 0))
+            finally:
+                status.save()
+                    
+            return Articles_df
+        
+        ## Define Collect_Corpus_Offline() to extract the articles again from the cached pages,
+        ## without any network I/O.
+        def Collect_Corpus_Offline(Articles_df):
+            status     = download_status(Articles_df)
+            downloaded = status.downloaded
+            urls       = FetchLinks(Articles_df)
+            i, n = 0, Articles_df.shape[0]
+            missing, unrendered = 0, 0
+            start = dt.datetime.now()
+            
+            try:
+                for pos, (title, link) in enumerate(zip(Articles_df.File, Articles_df.FullLink)):
+                    i += 1
+                    if i % 100 == 0:
+                        clear_output(wait=True)
+                        timer = dt.datetime.now()
+                        print(f"{round(100*i/n,2)}% - {i} of {n} | {str(timer-start)}")
+                    
+                    #### Any cached copy will do, however old it is
+                    page = cache.get(urls[pos], max_age=float('inf'))
+                    if page is None:
+                        missing += 1
+                        continue
+                    
+                    with metrics.timer('extraction'):
+                        article = ExtractArticle(page, profile)
+                    unrendered += not ArticleRendered(article)
+                    
+                    try:
+                        Write_Article(article, title, link)
+                        status.mark(pos)
+                        Record(link, 'done')
+                    except OSError as e:
+                        print(f"{title} could not be saved. {e!r}")
+            finally:
+                status.save()
+            
+            print(f"{int(downloaded.sum()):,} of {n:,} articles re-extracted from the cache. "
+                  f"{missing:,} were not cached and {unrendered:,} cached pages had no article text.")
+            return Articles_df
+        
+        ## Define `Scrape_Articles()` to name the files of the articles in a DataFrame, check
+        ## which are already saved, download the rest and record them in the persistent index.
+        ## The file names used by earlier pages are kept, so articles sharing a title on two
+        ## pages are told apart as they are on one.
+        used_files = set()
+        def Scrape_Articles(articles):
+            ### Use `clean_title` to turn the titles into file names. Different articles can share
+            ### a title, so every article after the first one with a file name gets a short hash of
+            ### its link added to it.
+            if 'Title' not in articles.columns:
+                articles['Title'] = articles.index
+            articles = articles[~articles.FullLink.duplicated().to_numpy()].copy()
+            with metrics.timer('cleaning'):
+                files = pd.Series([clean_title(x) for x in articles.Title], index=articles.index, dtype=object)
+                names = files.str.lower() if os.name == 'nt' else files
+                clash = names.duplicated().to_numpy()
+                if used_files:
+                    clash |= names.isin(used_files).to_numpy()
+                files[clash] = files[clash] + [f"-{hashlib.sha1(link.encode('utf-8')).hexdigest()[:8]}"
+                                               for link in articles.FullLink[clash]]
+                articles['File'] = files
+                used_files.update(files.str.lower() if os.name == 'nt' else files)
+            
+            ### Check if the article has already been saved as a .txt file to the local folder
+            if corpus is None:
+                articles['Downloaded'] = SavedFiles(articles.File, download_folder)
+            ### Or if it is already in the compressed corpus
+            else:
+                articles['Downloaded'] = articles.FullLink.isin(corpus.urls())
+            
+            ### Drop the rows that do not contain enough hyperlink info to collect an article
+            articles.dropna(axis=0, thresh=2, inplace=True)
+            
+            ### Skip the articles a resumed crawl already downloaded, and queue the rest
+            if checkpoint is not None:
+                done = [link for link, status in checkpoint.state['status'].items() if status == 'done']
+                articles['Downloaded'] = articles.Downloaded | articles.FullLink.isin(done)
+                
+                queue = checkpoint.state['queue']
+                for title, link in zip(articles.Title, articles.FullLink):
+                    if link not in queue:
+                        checkpoint.queued(title, link)
+                checkpoint.flush()
+            
+            ### Offline, every article is extracted again, including the ones already saved
+            if self.offline:
+                articles['Downloaded'] = False
+            
+            ### Now collect and save the articles
+            try:
+                if self.offline:
+                    articles = Collect_Corpus_Offline(articles)
+                elif concurrency > 1:
+                    articles = Collect_Corpus_Concurrent(articles)
+                else:
+                    articles = Collect_Corpus(articles)
+            finally:
+                if checkpoint is not None:
+                    checkpoint.flush()
+                if duplicates is not None:
+                    duplicates.flush()
+            
+            ### Flag the near-duplicates with the link of the article they repeat
+            if duplicates is not None:
+                articles['Duplicate_Of'] = articles.FullLink.map(duplicate_of)
+            
+            ### Record the downloads in the persistent index
+            if self.store is not None:
+                self.store.mark_downloaded(articles.loc[articles.Downloaded == True, 'FullLink'])
+            if self.dedup is not None:
+                for link in articles.loc[articles.Downloaded == True, 'FullLink']:
+                    self.dedup.add(link)
+                self.dedup.flush()
+            
+            return articles
+        
+        ## Scrape the articles passed in, or read them from the store `page_size` at a time
+        if articles is not None:
+            pages = [articles]
+        else:
+            pages = self.store.pages(self.page_size, pending=not self.offline,
+                                     since=self.since, until=self.until)
+        scraped = []
+        try:
+            for page in pages:
+                scraped.append(Scrape_Articles(page))
+        finally:
+            if corpus is not None:
+                corpus.close()
+        
+        ## Close the web driver (or hand it back to the `driver_pool`)
+        if driver is not None:
+            driver.quit()
+        
+        ## Replace the articles attribute with the updated df, which includes download status
+        self.articles = pd.concat(scraped) if scraped else self.store.query(limit=0)
+
+def run_crawl(checkpoint_path, index_site, index_site_home_link, download_folder,
+              extension1="", extension2="", extension3="", n=1000, page_url=None,
+              output_format='txt', concurrency=1, requests_per_second=None, parse_processes=0,
+              cache=None, dedup=None, duplicates=None, skip_duplicates=False, since=None, until=None,
+              profile=None, store=None, cache_ttl=None, dedup_capacity=None, browser_fallback=True):
+    """
+    Index a news site and download its articles, recording the progress in a `crawl_checkpoint`
+    journal at `checkpoint_path`. `cache` is the folder of an optional `page_cache`, `dedup`
+    the file of an optional `link_filter`, and `duplicates` the SQLite file of an optional
+    `near_duplicates` index (see `scrape_index`). Only the articles published between `since`
+    and `until` are indexed (see `create_index`), with the markup of `profile`. If the process
+    dies, `resume_crawl(checkpoint_path)` picks the crawl up where it stopped. Returns the
+    `scrape_index` that downloaded the articles.
+    
+    `store` is the SQLite file of an optional `article_store` the index is kept in, `cache_ttl`
+    the seconds a cached page is used without asking the site (the `page_cache` default when
+    None), and `dedup_capacity` the size of the Bloom filter `dedup` is kept as (an exact set
+    when None). Pass `browser_fallback=False` to download the articles without Firefox (see
+    `scrape_index`). All of them are recorded in the journal, so a resumed crawl uses them too.
+    """
+    ## The bounds are recorded in the journal as ISO 8601 text
+    since = DateBound(since).isoformat() if since is not None else None
+    until = DateBound(until).isoformat() if until is not None else None
+    
+    ## A compiled profile is recorded as its spec
+    if isinstance(profile, site_profile):
+        profile = profile.spec
+    
+    checkpoint = crawl_checkpoint(checkpoint_path)
+    if not checkpoint.state['run']:
+        checkpoint.run(index_site=index_site, index_site_home_link=index_site_home_link,
+                       download_folder=download_folder, extension1=extension1,
+                       extension2=extension2, extension3=extension3, n=n, page_url=page_url,
+                       output_format=output_format, concurrency=concurrency,
+                       requests_per_second=requests_per_second, parse_processes=parse_processes,
+                       cache=cache, dedup=dedup, duplicates=duplicates,
+                       skip_duplicates=skip_duplicates, since=since, until=until, profile=profile,
+                       store=store, cache_ttl=cache_ttl, dedup_capacity=dedup_capacity,
+                       browser_fallback=browser_fallback)
+        checkpoint.flush()
+    
+    ## The index and the downloads share one cache, store and compiled profile
+    profile = LoadProfile(profile)
+    if cache is not None:
+        cache = page_cache(cache) if cache_ttl is None else page_cache(cache, ttl=cache_ttl)
+    if store is not None:
+        store = article_store(store)
+    if dedup is not None:
+        dedup = link_filter(dedup, capacity=dedup_capacity)
+    
+    ## Index the site, unless the journal shows the index was already finished
+    if checkpoint.state['cursor'].get('index') == 'done':
+        articles = CheckpointArticles(checkpoint, index_site_home_link,
+                                      extension1, extension2, extension3,
+                                      DateBound(since), DateBound(until))
+    else:
+        ci = create_index(index_site, index_site_home_link, extension1, extension2, extension3, n,
+                          page_url=page_url, requests_per_second=requests_per_second,
+                          checkpoint=checkpoint, cache=cache, dedup=dedup, since=since, until=until,
+                          profile=profile, store=store)
+        articles = ci.go().articles
+    
+    ## Then download the articles that are not done yet
+    si = scrape_index(articles, index_site, download_folder, output_format=output_format,
+                      concurrency=concurrency, requests_per_second=requests_per_second,
+                      parse_processes=parse_processes, checkpoint=checkpoint, cache=cache,
+                      duplicates=duplicates, skip_duplicates=skip_duplicates, profile=profile,
+                      store=store, browser_fallback=browser_fallback, dedup=dedup)
+    si.scrape()
+    
+    return si
+
+def resume_crawl(checkpoint_path):
+    """
+    Resume the crawl recorded in the `crawl_checkpoint` journal at `checkpoint_path`, with the
+    settings it was started with by `run_crawl`.
+    """
+    checkpoint = crawl_checkpoint(checkpoint_path)
+    if not checkpoint.state['run']:
+        raise ValueError(f"{checkpoint_path} does not hold a crawl started by `run_crawl`")
+    
+    return run_crawl(checkpoint_path, **checkpoint.state['run'])
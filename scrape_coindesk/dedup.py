@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+The set of articles that have already been downloaded, keyed on their canonical link and kept
+between runs, so an article is only indexed once however it was linked.
+"""
+import os, json, math
+import hashlib
+import threading       # The filter can be shared by crawls running at the same time
+
+from .extract import CanonicalLink
+
+class link_filter:
+    """
+    `link_filter` remembers the canonical links (see `CanonicalLink`) of the downloaded articles.
+    By default it is an exact hash set, saved as a file with one link per line that new links are
+    appended to. For very large crawls pass a `capacity` to use a Bloom filter instead: a fixed
+    size bit array that never forgets a link, but reports an unseen link as seen at a small
+    `error_rate`. Either way, a lookup costs the same however many links are stored.
+    
+    Parameters
+    ----------
+    filter_path : str
+    |    The file the filter is loaded from and saved to. An existing file keeps the kind (set or
+    |    Bloom filter) and size it was created with. The default is None, which only keeps the
+    |    filter in memory.
+    
+    capacity : int
+    |    The number of links a Bloom filter is sized for. The default is None, an exact set.
+    
+    error_rate : float
+    |    The rate of unseen links a Bloom filter holding `capacity` links reports as seen.
+    |    The default is 0.001.
+    
+    Methods
+    ----------
+    `add`
+    |    Add a link, and return True if it was not in the filter yet.
+    
+    `flush`
+    |    Save the links added since the last flush to `filter_path`.
+    
+    `close`
+    |    Flush the filter.
+    
+    The filter also supports `len()` and `link in filter`.
+    """
+    
+    def __init__(self, filter_path=None, capacity=None, error_rate=0.001):
+        self.filter_path = filter_path
+        self._lock       = threading.Lock()
+        self.links       = None   # The exact set
+        self.bits        = None   # Or the Bloom filter's bit array
+        self.count       = 0
+        self.new         = []
+        
+        exists = filter_path is not None and os.path.exists(filter_path)
+        header = None
+        if exists:
+            with open(filter_path, 'rb') as f:
+                first = f.readline()
+                if first.startswith(b'{'):
+                    header    = json.loads(first)
+                    self.bits = bytearray(f.read())
+        
+        if header is not None:
+            ### A saved Bloom filter
+            self.n_bits, self.n_hashes, self.count = header['bits'], header['hashes'], header['count']
+        elif capacity is not None and not exists:
+            ### A new Bloom filter, sized for `capacity` links at `error_rate`
+            self.n_bits   = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+            self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+            self.bits     = bytearray((self.n_bits + 7) // 8)
+        else:
+            ### An exact set, with the links saved by earlier runs
+            self.links = set()
+            if exists:
+                with open(filter_path, encoding='utf-8') as f:
+                    self.links.update(line.rstrip('\n') for line in f if line.strip())
+            self.count = len(self.links)
+    
+    def positions(self, link):
+        ## Derive the Bloom filter's bit positions from two halves of one digest
+        digest = hashlib.blake2b(link.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+    
+    def __contains__(self, link):
+        link = CanonicalLink(link)
+        with self._lock:
+            if self.links is not None:
+                return link in self.links
+            return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self.positions(link))
+    
+    def __len__(self):
+        return self.count
+    
+    def add(self, link):
+        link = CanonicalLink(link)
+        with self._lock:
+            if self.links is not None:
+                if link in self.links:
+                    return False
+                self.links.add(link)
+                self.new.append(link)
+            else:
+                positions = self.positions(link)
+                if all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions):
+                    return False
+                for p in positions:
+                    self.bits[p >> 3] |= 1 << (p & 7)
+                self.new.append(link)
+            
+            self.count += 1
+            return True
+    
+    def flush(self):
+        with self._lock:
+            if self.filter_path is None or not self.new:
+                return
+            
+            if self.links is not None:
+                ### Append the new links to the set's file
+                with open(self.filter_path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(self.new) + '\n')
+            else:
+                ### Rewrite the whole bit array, replacing the old file in one step
+                header = json.dumps({'bits': self.n_bits, 'hashes': self.n_hashes, 'count': self.count})
+                with open(self.filter_path + '.tmp', 'wb') as f:
+                    f.write(header.encode('utf-8') + b'\n')
+                    f.write(self.bits)
+                os.replace(self.filter_path + '.tmp', self.filter_path)
+            self.new = []
+    
+    def close(self):
+        self.flush()
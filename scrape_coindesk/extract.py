@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Functions that pull the article text and the article index out of a page source. Only the
+standard library is imported here, so workers that just parse pages start quickly and never
+load selenium or pandas.
+"""
+import re              # Regular expressions used to parse the page source
+import datetime as dt  # Publication dates found in article links
+import time            # Time the extraction done in `parse_pipeline` worker processes
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+## Compile the patterns used to pull article text out of a page source once, at import.
+## `ARTICLE_ELEMENTS` finds every element holding article text or header info in one scan of the page.
+ARTICLE_ELEMENTS = re.compile('<div class="article-hero-headline">.*?</h1>|' + \
+                              '<h5 class="heading">.*?</h5>|' + \
+                              '<div class="article-hero-datetime">.*?</time>|' + \
+                              'class="article-pharagraph">.*?</p>|' + \
+                              'class="article-list">.*?</ul>|' + \
+                              '<p>.*?</p>|' + '<p class="head2">.*?</p>|' + \
+                              '<p dir="ltr">.*?</p>|' + \
+                              '<p style="null.*?>.*?</p>|' + \
+                              'class="article-heading">.+?</h2>')
+
+## `ARTICLE_MARKUP` strips the html tags, entities and escaped non-ascii characters from a line,
+## and `ARTICLE_BOILERPLATE` then strips the sentences coindesk adds to every article. The two are
+## kept apart so boilerplate split up by a tag (e.g. `Image<br>via`) is still caught once the
+## tag has been replaced with a space.
+ARTICLE_MARKUP = re.compile('class="article-pharagraph">|class="article-heading">|' + \
+                            'class="article-list">|<.+?>|&nbsp;|&amp|' + r"\\u.{4}")
+ARTICLE_BOILERPLATE = re.compile('Please consider using a different web browser for better experience.|' + \
+                                 'Sign up for our newsletters|Image via|Shutterstock|' + \
+                                 'This report has been updated.')
+
+## The opening tags of the header elements, each replaced with its `ARTICLE_HEADER_NAMES` label
+ARTICLE_HEADERS = re.compile('(<div class="article-hero-headline">)|(<h5 class="heading">)|' + \
+                             '(<div class="article-hero-datetime">)')
+ARTICLE_HEADER_NAMES = ('Title: ', 'Author: ', 'Datetime: ')
+
+def ExtractArticle(page, profile=None):
+    """
+    Collect the article text from a full html page source and return it as a `list` of cleaned
+    lines. The first lines will be the `Title: `, `Author: ` and `Datetime: ` lines, followed by
+    the article paragraphs. Ads, images, videos and embedded hyperlinks are dropped. The coindesk
+    markup is parsed unless another `site_profile` is passed.
+    """
+    if profile is None:
+        elements, headers, names = ARTICLE_ELEMENTS, ARTICLE_HEADERS, ARTICLE_HEADER_NAMES
+        markup, boilerplate      = ARTICLE_MARKUP, ARTICLE_BOILERPLATE
+    else:
+        elements, headers, names = profile.elements, profile.headers, profile.header_names
+        markup, boilerplate      = profile.markup, profile.boilerplate
+    
+    cleaned_article = []
+    
+    ## Iterate over the elements that match article text or header parameters.
+    ## This allows ads and other garbage to be easily excluded.
+    for match in elements.finditer(page):
+        ### Replace the non-ascii characters with their escape codes
+        line = match.group(0).encode('unicode_escape').decode('ascii')
+
+        ### Replace the opening tag of the header elements with their label
+        header = headers.match(line)
+        if header is not None:
+            line = names[header.lastindex - 1] + line[header.end():]
+
+        ### Replace the html elements, non-ascii characters and boilerplate
+        cleaned = markup.sub(' ', line)
+        if boilerplate is not None:
+            cleaned = boilerplate.sub(' ', cleaned)
+
+        ### Append the cleaned paragraph to the storage list
+        cleaned = cleaned.replace(' .', '.').replace('  ', ' ').strip()
+        if cleaned != '':
+            cleaned_article.append(cleaned)
+
+    return cleaned_article
+
+def ExtractPages(pages, profile=None):
+    """
+    Run `ExtractArticle` over a list of page sources and return an (article, seconds) pair for
+    each. The `parse_pipeline` worker processes are sent a chunk of pages per call, and the
+    timings are passed back so they can be recorded in the parent's `crawl_metrics`.
+    """
+    results = []
+    for page in pages:
+        start = time.perf_counter()
+        results.append((ExtractArticle(page, profile), time.perf_counter() - start))
+    
+    return results
+
+def ArticleRendered(article):
+    """
+    Return True if the list returned by `ExtractArticle` holds a rendered article. Pages that
+    need JavaScript to build the article body come back from a plain HTTP request without the
+    `article-hero-headline` element, so no `Title: ` line will be found.
+    """
+    return any(line.startswith('Title:') for line in article)
+
+## Define two functions used to build the article index:
+## - `CustomCheck()` fucntion that will check an article title against a few conditions
+##    to see if the article collected is one we want to exclude.
+## - `ArticleLinks()` generator that will have a page source passed to it, and yield the
+##    cleaned title and link extension of every article on the page.
+## The (title, link) pairs are turned into a dataframe by `crawl.ArticleIndex()`.
+## Define the links/articles that are collected using the `<a title=.*? href=.+?>` regex
+## but are not actual articles. Exact matches are looked up in a frozenset and the approximate
+## matches are found with a single compiled pattern.
+EXCLUDED_TITLES = frozenset(['About', 'Advertise', 'Masthead', 'Ethics Policy', 'Contributors',
+                             'Events', 'Terms &amp; Conditions', 'Privacy Policy',
+                             "'Newsletters'", 'Newsletters', 'Terms amp; Conditions'])
+EXCLUDED_TITLE_PARTS = re.compile('Articles by |articles by')
+
+## Find every html element that contains an `article title` and `href` in one scan of the page
+ARTICLE_ANCHOR = re.compile('<a title=(?P<title>.*?) href=(?P<link>.+?)>')
+
+## Characters removed from titles. Those in `TITLE_CHARS` are removed before `nbsp`,
+## and `<` and `>` after it, the same order the original `str.replace` loop used. Most titles
+## hold none of them, and checking with `in` before each `replace` is several times faster than
+## a `str.translate` deletion table on strings this short.
+TITLE_CHARS = '?$\\/|*&"'
+TITLE_BRACKETS = '<>'
+
+def StripChars(value, chars):
+    for char in chars:
+        if char in value:
+            value = value.replace(char, '')
+    return value
+
+def CustomCheck(title, profile=None):
+    # Check the exact matches and then the approxiamate matches
+    exact, parts = ((EXCLUDED_TITLES, EXCLUDED_TITLE_PARTS) if profile is None else
+                    (profile.excluded_titles, profile.excluded_title_parts))
+    if title in exact:
+        return True
+    
+    return parts is not None and parts.search(title) is not None
+
+def QuotedValue(value):
+    # Return the shortest prefix of `value` (at least one character) that ends in a quote,
+    # which is what the `title=.+?"` and `href=.+?"` searches used to return.
+    end = value.find('"', 1)
+    return value[:end + 1] if end != -1 else None
+
+def ArticleAnchors(page, profile=None):
+    ## Loop through the html anchors to collect the article title and link extension, along
+    ## with the match, so callers can tell where on the page each article was found. A
+    ## `site_profile` anchor pattern captures the quoted title and link as `title` and `link`.
+    anchor = ARTICLE_ANCHOR if profile is None else profile.anchor
+    for match in anchor.finditer(page):
+        raw_title, raw_link = match.group('title', 'link')
+
+        title = QuotedValue(raw_title)
+        link  = QuotedValue(raw_link)
+        if title is None or link is None:
+            ### The quote closing the title is past the title attribute, fall back to a search
+            ### over the whole element
+            art   = match.group(0)
+            title = re.search('title=.+?"', art)
+            link  = re.search('href=.+?"', art)
+            if title is None or link is None:
+                continue
+            title, link = title.group(0)[6:], link.group(0)[5:]
+
+        ### First, clean up the title. The original code also removed any `title=` (and `href=`)
+        ### inside the value, which is kept so the index does not change.
+        title = StripChars(title.replace('title=', ''), TITLE_CHARS).replace('nbsp', '')
+        title = StripChars(title, TITLE_BRACKETS).replace(':', ';')
+
+        ### Second, clean up the link
+        link = link.replace('href=', '').replace('"', '')
+
+        ### Third, Determine if we want to store the link for this article
+        if CustomCheck(title, profile) == False:
+            yield match, title, link
+
+def ArticleLinks(page, profile=None):
+    for _, title, link in ArticleAnchors(page, profile):
+        yield title, link
+
+## Query parameters that only track where a reader came from, and never change the article
+TRACKING_PARAMS = re.compile('utm_.*|fbclid|gclid|dclid|mc_cid|mc_eid|cmpid|ref|ref_src|outputType')
+
+def CanonicalLink(link):
+    """
+    Return the canonical form of an article link, so the same article linked in different ways
+    is only indexed once: the scheme and host are lower-cased, default ports, fragments, tracking
+    query parameters, repeated and trailing slashes are dropped, and the remaining query
+    parameters are sorted. Relative links (e.g. an `Href`) stay relative.
+    """
+    scheme, netloc, path, query, _ = urlsplit(link.strip())
+    scheme, netloc = scheme.lower(), netloc.lower()
+    if (scheme, netloc[-3:]) == ('http', ':80') or (scheme, netloc[-4:]) == ('https', ':443'):
+        netloc = netloc.rsplit(':', 1)[0]
+    
+    path  = re.sub('/{2,}', '/', path).rstrip('/') or ('/' if netloc or path else '')
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.fullmatch(key)))
+    
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+def LinkDate(link):
+    """
+    Return the publication date embedded in an article link (e.g. `/markets/2021/05/15/...`) as a
+    `datetime.date`, or None if the link does not contain a date.
+    """
+    match = re.search(r"/(\d{4})/(\d{2})/(\d{2})/", link)
+    if match is None:
+        return None
+    try:
+        return dt.date(*(int(x) for x in match.groups()))
+    except ValueError:
+        return None
+
+## The `datetime` attribute of the `<time>` element listed with each article
+LISTING_TIME = re.compile(r'<time[^>]*? datetime="([^"]+)"')
+
+def PublishedAt(stamp):
+    """
+    Parse an ISO 8601 timestamp (e.g. `2021-05-15T14:00:00Z`) into a `datetime.datetime`. Times
+    with a UTC offset are converted to UTC, and all times are returned without a tzinfo so they
+    compare with each other and with the bounds from `DateBound`. Returns None if the timestamp
+    can not be parsed.
+    """
+    try:
+        published = dt.datetime.fromisoformat(stamp.strip().replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if published.tzinfo is not None:
+        published = published.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    
+    return published
+
+def DateBound(value):
+    """
+    Return a `since` or `until` bound, given as a `datetime.date`, a `datetime.datetime` or an
+    ISO 8601 string, as a `datetime.datetime` in UTC (a date is midnight of that day). None is
+    returned unchanged.
+    """
+    if value is None or isinstance(value, dt.datetime):
+        return PublishedAt(value.isoformat()) if value is not None else None
+    if isinstance(value, dt.date):
+        return dt.datetime(value.year, value.month, value.day)
+    
+    published = PublishedAt(value)
+    if published is None:
+        raise ValueError(f"{value!r} is not an ISO 8601 date or time")
+    return published
+
+def DatedArticleLinks(page, profile=None):
+    """
+    Yield the (title, link, published) of every article on a listing page, where `published` is
+    the `datetime.datetime` of the first `<time datetime="...">` between the article's anchor
+    and the next article, or else the date in its link (see `LinkDate`), or None.
+    """
+    for _, title, link, published in DatedAnchors(page, profile):
+        yield title, link, published
+
+def DatedAnchors(page, profile=None):
+    ## Yield the (start, title, link, published) of every article on the page. The anchors and
+    ## the listed times are both found in page order, so they are walked side by side rather
+    ## than collecting the times first.
+    listing_time = LISTING_TIME if profile is None else profile.listing_time
+    times  = listing_time.finditer(page)
+    listed = next(times, None)
+    
+    def Published(link, end):
+        ## The first listed time before `end`, or the date in the link
+        if listed is not None and listed.start() < end:
+            published = PublishedAt(listed.group(1))
+            if published is not None:
+                return published
+        return LinkTime(link)
+    
+    ## An article's time is only known once the next article has been found
+    previous = None
+    for match, title, link in ArticleAnchors(page, profile):
+        if previous is not None:
+            yield previous + (Published(previous[2], match.start()),)
+        while listed is not None and listed.start() < match.end():
+            listed = next(times, None)
+        previous = (match.start(), title, link)
+    
+    if previous is not None:
+        yield previous + (Published(previous[2], len(page)),)
+
+def LinkTime(link):
+    ## The date in an article link as a `datetime.datetime` at midnight, or None
+    date = LinkDate(link)
+    return dt.datetime(date.year, date.month, date.day) if date is not None else None
+
+def ArticleFields(article, title="", link=""):
+    """
+    Split the `list` returned by `ExtractArticle` into a `dict` with the title, author, datetime,
+    paragraphs, url and fetch time of the article.
+    """
+    fields = {'title': None, 'author': None, 'datetime': None, 'paragraphs': [], 'url': link,
+              'fetched_at': dt.datetime.now().isoformat(timespec='seconds')}
+    
+    ## The headline on the article page is preferred over the title from the article index
+    for line in article:
+        if line.startswith('Title: ') and fields['title'] is None:
+            fields['title'] = line[7:]
+        elif line.startswith('Author: ') and fields['author'] is None:
+            fields['author'] = line[8:]
+        elif line.startswith('Datetime: ') and fields['datetime'] is None:
+            fields['datetime'] = line[10:]
+        else:
+            fields['paragraphs'].append(line)
+    
+    if fields['title'] is None:
+        fields['title'] = title
+    
+    return fields
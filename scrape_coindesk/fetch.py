@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent downloading of article pages over plain HTTP, with a browser fallback.
+"""
+import time
+import threading                                             # Serializes calls to a single driver
+import urllib.request, urllib.error                          # Plain-HTTP page fetching
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as futures_wait  # Bounded worker pool
+
+from .extract import ExtractArticle, ArticleRendered
+from .scheduler import Retryable, crawl_scheduler
+from .metrics import METRICS
+
+class fetch_engine:
+    """
+    `fetch_engine` downloads article pages with a bounded pool of worker threads. Each page
+    is first requested over plain HTTP, and is only loaded in the selenium driver when the
+    plain html does not contain a rendered article (i.e. the page needs JavaScript).
+
+    Parameters
+    ----------
+    concurrency : int
+    |    The number of worker threads used to download pages at the same time.
+    |    The default is 8 workers.
+
+    requests_per_second : float
+    |    The starting number of requests per second sent to a single host. The rate then adapts
+    |    to the site's responses, see `crawl_scheduler`. The default is 2 requests per second.
+    
+    scheduler : crawl_scheduler
+    |    An optional `crawl_scheduler` shared with other crawls, used in place of one built
+    |    from `requests_per_second`. Requests to a host also wait for one of its `max_concurrency`
+    |    slots. The default is None.
+
+    driver : Selenium Webbrowser Object
+    |    An optional selenium webdriver used as a fallback for pages that need JavaScript.
+    |    A browser can only load one page at a time, so calls to the driver are serialized.
+    |    The default is None, which disables the fallback.
+
+    pool : driver_pool
+    |    An optional `driver_pool` used in place of `driver`. Every fallback checks a browser out
+    |    of the pool, so up to `pool.size` pages can be rendered at the same time.
+    |    The default is None.
+
+    timeout : float
+    |    The number of seconds to wait on a plain HTTP request. The default is 30 seconds.
+    
+    metrics : crawl_metrics
+    |    The `crawl_metrics` that request, byte, retry and failure counts and the navigation,
+    |    page_source and extraction timings are recorded into. The default is the module's
+    |    `METRICS`.
+    
+    cache : page_cache
+    |    An optional `page_cache` of raw pages. Pages cached less than `cache.ttl` seconds ago
+    |    are served without a request, older ones are revalidated with a conditional request,
+    |    and every downloaded page is saved to the cache. The default is None.
+    
+    revalidate : bool
+    |    Whether every cached page is revalidated, however recently it was fetched. Used for
+    |    listing pages, which change as new articles are published. The default is False.
+    
+    profile : site_profile
+    |    The `site_profile` the articles are extracted with. The default is None (coindesk).
+
+    Methods
+    ----------
+    `fetch_html`
+    |    Download the raw html of a link over plain HTTP.
+
+    `fetch_article`
+    |    Download a link and return the cleaned article `list` along with how it was fetched,
+    |    either 'http' or 'browser'.
+
+    `fetch_rendered`
+    |    Download a link in a browser from `pool`, or in `driver`, and return the page source.
+
+    `fetch_html_retry`
+    |    `fetch_html` with up to `scheduler.max_retries` retries of throttled or failed requests.
+    
+    `map`
+    |    Iterate over (key, link) pairs, or (key, link, attempts already made) triples, and yield
+    |    (key, article, source) tuples as the downloads complete. Failed downloads are put in the
+    |    scheduler's retry queue (calling `on_retry(key, link, attempt)` if passed), and only yield
+    |    the raised exception in place of the article once they have run out of retries.
+    """
+
+    user_agent = ("Mozilla/5.0 (X11; Linux x86_64; rv:88.0) Gecko/20100101 Firefox/88.0")
+
+    def __init__(self, concurrency=8, requests_per_second=2.0, driver=None, pool=None, timeout=30,
+                 scheduler=None, metrics=None, cache=None, revalidate=False, profile=None):
+        self.concurrency  = max(1, int(concurrency))
+        self.scheduler    = scheduler if scheduler is not None else crawl_scheduler(requests_per_second)
+        self.driver       = driver
+        self.pool         = pool
+        self.timeout      = timeout
+        self.metrics      = metrics if metrics is not None else METRICS
+        self.cache        = cache
+        self.revalidate   = revalidate
+        self.profile      = profile
+        self._driver_lock = threading.Lock()
+
+    def fetch_html(self, link):
+        ## Serve a recently fetched page from the cache, without touching the network
+        cache, entry = self.cache, None
+        if cache is not None:
+            if not self.revalidate:
+                page = cache.get(link)
+                if page is not None:
+                    self.metrics.count('cache_hits')
+                    return page
+            entry = cache.lookup(link)
+        
+        ## Wait for one of the host's slots before the request is paced and timed, so the wait
+        ## is not taken for the site slowing down
+        with self.scheduler.slot(link):
+            return self.request_html(link, entry)
+    
+    def request_html(self, link, entry=None):
+        cache = self.cache
+        self.scheduler.wait(link)
+
+        ## Time the request and report the outcome, so the scheduler can adapt the host's rate.
+        ## A cached page is only sent again if it changed since it was fetched.
+        start   = time.monotonic()
+        headers = {'User-Agent': self.user_agent}
+        if entry is not None:
+            headers.update(cache.validators(entry))
+        request = urllib.request.Request(link, headers=headers)
+        self.metrics.count('requests')
+        try:
+            with self.metrics.timer('navigation'):
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    charset = response.headers.get_content_charset() or 'utf-8'
+                    raw     = response.read()
+                    etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            ### 304 Not Modified, the cached copy is still current
+            if e.code == 304 and entry is not None:
+                page = cache.get(link, max_age=float('inf'))
+                if page is not None:
+                    self.scheduler.record(link, time.monotonic() - start, 200)
+                    self.metrics.count('cache_revalidated')
+                    cache.touch(link)
+                    return page
+            retry_after = e.headers.get('Retry-After') if e.headers is not None else None
+            retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+            self.scheduler.record(link, time.monotonic() - start, e.code, retry_after)
+            raise
+        except OSError:  # URLError, timeouts and dropped connections
+            self.scheduler.record(link, time.monotonic() - start, None)
+            raise
+
+        self.scheduler.record(link, time.monotonic() - start, 200)
+        self.metrics.count('bytes_fetched', len(raw))
+        page = raw.decode(charset, errors='replace')
+        if cache is not None:
+            cache.put(link, page, etag, last_modified)
+        return page
+
+    def fetch_html_retry(self, link):
+        attempt = 0
+        while True:
+            try:
+                return self.fetch_html(link)
+            except OSError as e:
+                attempt += 1
+                if not Retryable(e) or attempt > self.scheduler.max_retries:
+                    raise
+                time.sleep(self.scheduler.backoff(attempt))
+
+    def fetch_browser(self, driver, link):
+        ## Load a page in a browser, reporting the load time to the scheduler
+        self.scheduler.wait(link)
+        start = time.monotonic()
+        self.metrics.count('requests')
+        try:
+            with self.metrics.timer('navigation'):
+                driver.get(link)
+            with self.metrics.timer('page_source'):
+                page = driver.page_source
+        except Exception:  # Selenium errors do not share a common base class we can import here
+            self.scheduler.record(link, time.monotonic() - start, None)
+            raise
+
+        self.scheduler.record(link, time.monotonic() - start, 200)
+        self.metrics.count('bytes_fetched', len(page.encode('utf-8')))
+        
+        ## Keep the rendered page, so it is not rendered again while it is fresh
+        if self.cache is not None:
+            self.cache.put(link, page)
+        return page
+    
+    def extract(self, page):
+        with self.metrics.timer('extraction'):
+            return ExtractArticle(page, self.profile)
+
+    def fetch_article(self, link):
+        ## Try the cheap plain HTTP request first
+        article, error = [], None
+        try:
+            article = self.extract(self.fetch_html(link))
+            if ArticleRendered(article):
+                return article, 'http'
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            error = e
+
+        ## A throttled or struggling site will not do better in a browser, try again later
+        if isinstance(error, urllib.error.HTTPError) and Retryable(error):
+            raise error
+
+        ## Otherwise fall back to a browser, if there is one
+        if self.pool is None and self.driver is None:
+            if error is not None:
+                raise error
+            return article, 'http'
+
+        return self.extract(self.fetch_rendered(link)), 'browser'
+    
+    def fetch_rendered(self, link):
+        ## Load a page in a browser from the pool
+        if self.pool is not None:
+            driver = self.pool.acquire()
+            try:
+                with self.scheduler.slot(link):
+                    return self.fetch_browser(driver, link)
+            finally:
+                driver.quit()
+
+        ## Or in the single driver, one page at a time
+        with self._driver_lock, self.scheduler.slot(link):
+            return self.fetch_browser(self.driver, link)
+
+    def map(self, jobs, on_retry=None):
+        scheduler = self.scheduler
+
+        def Fetch(key, link, attempt):
+            try:
+                article, source = self.fetch_article(link)
+            except Exception as e:  # Selenium errors do not share a common base class with urllib
+                return key, link, attempt, e, None
+            return key, link, attempt, article, source
+
+        ## Only keep a few pages per worker in flight so a 20k article index does not
+        ## create 20k futures up front.
+        jobs      = iter(jobs)
+        window    = self.concurrency * 4
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            running = set()
+            while True:
+                ### Top up the workers with retries that are due, then with new links
+                for key, link, attempt in scheduler.due_retries():
+                    running.add(pool.submit(Fetch, key, link, attempt))
+                while not exhausted and len(running) < window:
+                    try:
+                        key, link, *attempt = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    running.add(pool.submit(Fetch, key, link, attempt[0] if attempt else 0))
+
+                ### Only retries are left, wait for the next one to be due
+                if not running:
+                    delay = scheduler.next_retry_in()
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+
+                ### Hand back the finished downloads, re-queueing the failures that can be retried
+                done, running = futures_wait(running, timeout=scheduler.next_retry_in(),
+                                             return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, link, attempt, article, source = future.result()
+                    if isinstance(article, Exception) and Retryable(article):
+                        if scheduler.retry_later(key, link, attempt + 1):
+                            self.metrics.count('retries')
+                            if on_retry is not None:
+                                on_retry(key, link, attempt + 1)
+                            continue
+                    if isinstance(article, Exception):
+                        self.metrics.count('failures')
+                    yield key, article, source
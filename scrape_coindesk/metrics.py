@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Timings and counters recorded while a crawl runs.
+"""
+import json, time
+import threading       # The metrics are shared by the concurrent fetching workers
+import bisect          # Histogram buckets of the `crawl_metrics`
+from contextlib import contextmanager
+
+class crawl_metrics:
+    """
+    `crawl_metrics` collects where a crawl spends its time. Each stage of the hot path
+    ('navigation', 'page_source', 'extraction', 'cleaning' and 'write') is timed into a
+    latency histogram, and counters keep track of the requests made, bytes fetched, retries,
+    failures, articles written and pages served from the `page_cache`. Every observation is
+    also passed to the hooks added with `add_hook`, so the numbers can be forwarded to another
+    metrics system.
+    
+    Parameters
+    ----------
+    buckets : tuple
+    |    The upper bounds (in seconds) of the histogram buckets.
+    |    The default runs from 1 ms to 30 s.
+    
+    Methods
+    ----------
+    `timer`
+    |    A context manager that times the code inside it as a stage, e.g.
+    |    `with metrics.timer('write'): ...`
+    
+    `observe`
+    |    Record a duration (in seconds) for a stage.
+    
+    `count`
+    |    Add to a counter.
+    
+    `add_hook`
+    |    Register a function called as `hook(kind, name, value)` for every observation, where
+    |    kind is 'timing' or 'counter'.
+    
+    `to_json`, `to_prometheus`
+    |    Return the metrics as a JSON string, or in the Prometheus text exposition format.
+    
+    `dump`
+    |    Write the metrics to a file, as Prometheus text if the name ends in `.prom` and as
+    |    JSON otherwise.
+    
+    `reset`
+    |    Clear all counters and histograms.
+    """
+    
+    stages  = ('navigation', 'page_source', 'extraction', 'cleaning', 'write')
+    buckets = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+    
+    def __init__(self, buckets=None):
+        if buckets is not None:
+            self.buckets = tuple(sorted(buckets))
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.started    = time.monotonic()
+            self.counters   = {'requests': 0, 'bytes_fetched': 0, 'pages_indexed': 0,
+                               'articles_written': 0, 'retries': 0, 'failures': 0,
+                               'cache_hits': 0, 'cache_revalidated': 0}
+            self.histograms = {}
+    
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+    
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = {'counts': [0] * (len(self.buckets) + 1),
+                                                      'sum': 0.0, 'count': 0}
+            histogram['counts'][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram['sum']   += seconds
+            histogram['count'] += 1
+        
+        for hook in self.hooks:
+            hook('timing', stage, seconds)
+    
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        
+        for hook in self.hooks:
+            hook('counter', name, value)
+    
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+    
+    def summary(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            stages  = {}
+            for stage, histogram in self.histograms.items():
+                stages[stage] = {'count': histogram['count'], 'total_seconds': histogram['sum'],
+                                 'mean_seconds': histogram['sum'] / histogram['count'],
+                                 'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'],
+                                                     histogram['counts']))}
+            
+            return {'elapsed_seconds': elapsed,
+                    'pages_per_second': self.counters['requests'] / elapsed,
+                    'bytes_per_second': self.counters['bytes_fetched'] / elapsed,
+                    'counters': dict(self.counters),
+                    'stages': stages}
+    
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+    
+    def to_prometheus(self):
+        summary = self.summary()
+        lines   = []
+        for name, value in summary['counters'].items():
+            lines += [f"# TYPE crawl_{name}_total counter", f"crawl_{name}_total {value}"]
+        for name in ('elapsed_seconds', 'pages_per_second', 'bytes_per_second'):
+            lines += [f"# TYPE crawl_{name} gauge", f"crawl_{name} {summary[name]:.6g}"]
+        
+        lines.append("# TYPE crawl_stage_seconds histogram")
+        with self._lock:
+            for stage, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(list(self.buckets) + ['+Inf'], histogram['counts']):
+                    cumulative += count
+                    lines.append(f'crawl_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'crawl_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6g}')
+                lines.append(f'crawl_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        
+        return '\n'.join(lines) + '\n'
+    
+    def dump(self, file_path):
+        with open(file_path, 'w') as f:
+            f.write(self.to_prometheus() if file_path.endswith('.prom') else self.to_json())
+
+## The metrics every crawl records into, unless it is passed its own `crawl_metrics`
+METRICS = crawl_metrics()
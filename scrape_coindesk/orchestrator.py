@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Several sections of a news site, or several news sites, indexed and downloaded side by side
+into one merged index.
+"""
+import os, re, time
+import threading                                             # The sections share their hosts' schedulers
+from concurrent.futures import ThreadPoolExecutor           # One worker per section
+from urllib.parse import urlsplit
+
+import pandas as pd    # The merged index
+
+from .crawl import create_index, scrape_index
+from .scheduler import crawl_scheduler
+from .profiles import LoadProfile
+from .dedup import link_filter
+from .store import article_store, page_cache
+from .similarity import near_duplicates
+from .metrics import METRICS
+
+def SectionSpec(section):
+    ## Turn a section (the link of its listing, or a dict of `create_index` arguments) into a
+    ## dict of `create_index` arguments along with its `name`, e.g. www.coindesk.com-category-markets
+    spec = {'index_site': section} if isinstance(section, str) else dict(section)
+    site = urlsplit(spec['index_site'])
+    spec.setdefault('index_site_home_link', f"{site.scheme}://{site.netloc}")
+    spec.setdefault('name', re.sub(r'[^\w.]+', '-', site.netloc + site.path).strip('-'))
+    return spec
+
+class crawl_orchestrator:
+    """
+    `crawl_orchestrator` crawls a list of sections (e.g. the markets, policy, tech and business
+    categories of coindesk), or of news sites, at the same time. Every section runs its own
+    `create_index` and then its own `scrape_index` on a worker thread, so one section can download
+    its articles while another is still expanding its listing, and the whole crawl takes about
+    as long as its slowest section. The sections on the same host share one `crawl_scheduler`,
+    so the host's request rate and `host_concurrency` hold for the crawl as a whole, and the
+    sections take turns at its request slots. An article cross-posted to several sections is
+    only indexed, and downloaded, by the first one to find it.
+
+    Parameters
+    ----------
+    sections : list
+    |    The sections to crawl. Each is either the link of a section's listing page, e.g.
+    |    https://www.coindesk.com/category/policy, or a dict of `create_index` arguments, e.g.
+    |    {'index_site': ..., 'page_url': ..., 'extension1': '/policy', 'profile': 'generic'}.
+    |    The home page is taken from the listing link unless `index_site_home_link` is passed,
+    |    and a dict may also give the section a `name`.
+
+    download_folder : str
+    |    The folder the articles are saved to. Every section saves its articles to a subfolder
+    |    named after it.
+
+    workers : int
+    |    The number of sections crawled at the same time. The default is None, all of them.
+
+    concurrency : int
+    |    The number of articles each section downloads at the same time (see `scrape_index`).
+    |    The default is 4.
+
+    host_concurrency : int
+    |    The largest number of requests in flight to a single host, across all the sections on
+    |    it. The default is None, the `max_concurrency` of the host's profile, or 8.
+
+    requests_per_second : float
+    |    The starting request rate of every host, shared by the sections on it. The default is
+    |    None, the rate of the host's profile, or 2 requests per second.
+
+    dedup : link_filter or str
+    |    The `link_filter` (or the path of its file) of the articles downloaded on earlier runs,
+    |    shared by the sections. The articles they download are added to it. The default is None.
+
+    store : article_store or str
+    |    An `article_store` (or the path of its SQLite file) the merged index is added to, and
+    |    the downloads are recorded in, once every section is done. An SQLite connection cannot
+    |    be shared by the section threads, so pass a `dedup` file as well to leave out the
+    |    articles downloaded on earlier runs. The default is None.
+
+    duplicates : near_duplicates or str
+    |    A `near_duplicates` index (or the path of its SQLite file) shared by the sections, so a
+    |    story republished in another section is flagged as well (see `scrape_index`). The
+    |    default is None.
+
+    skip_duplicates : bool
+    |    Whether the near-duplicates are left unsaved instead of only being flagged. The default
+    |    is False.
+
+    All other parameters (`output_format`, `browser_fallback`, `pool`, `parse_processes`,
+    `metrics`, `cache`, `since`, `until` and `profile`) are passed on to the `create_index` and
+    `scrape_index` of every section. A section's own dict can override `since`, `until` and
+    `profile`.
+
+    Methods
+    ----------
+    `run`
+    |    Crawl every section and return the merged index of their articles.
+
+    `crawl_section`
+    |    Index and download a single section, and return its articles.
+
+    Attributes
+    ----------
+    `articles` : pandas.DataFrame
+        The merged index of every section's articles, with the section each was indexed by in
+        a `Section` column, and the downloaded status and `File` name set by `scrape_index`.
+
+    `report` : pandas.DataFrame
+        The articles indexed and downloaded by every section, the seconds its index and
+        download phases took, and the error that stopped it (if any).
+    """
+
+    def __init__(self, sections, download_folder, workers=None, concurrency=4,
+                 host_concurrency=None, requests_per_second=None, dedup=None, store=None,
+                 output_format='txt', browser_fallback=True, pool=None, parse_processes=0,
+                 metrics=None, cache=None, since=None, until=None, profile=None,
+                 duplicates=None, skip_duplicates=False):
+        self.sections            = [SectionSpec(section) for section in sections]
+        self.download_folder     = download_folder
+        self.workers             = workers or max(1, len(self.sections))
+        self.concurrency         = concurrency
+        self.host_concurrency    = host_concurrency
+        self.requests_per_second = requests_per_second
+        self.dedup               = link_filter(dedup) if isinstance(dedup, str) else dedup
+        self.store               = article_store(store) if isinstance(store, str) else store
+        self.output_format       = output_format
+        self.browser_fallback    = browser_fallback
+        self.pool                = pool
+        self.parse_processes     = parse_processes
+        self.metrics             = metrics if metrics is not None else METRICS
+        self.cache               = page_cache(cache) if isinstance(cache, str) else cache
+        self.since               = since
+        self.until               = until
+        self.profile             = profile
+        self.duplicates          = near_duplicates(duplicates) if isinstance(duplicates, str) else duplicates
+        self.skip_duplicates     = skip_duplicates
+        self.schedulers          = {}
+        self._lock               = threading.Lock()
+
+        ## Cross-posted articles are only indexed by the first section to find them. The links
+        ## are claimed for this run only, `dedup` only keeps the ones that were downloaded.
+        self.claimed             = link_filter()
+
+        names = [spec['name'] for spec in self.sections]
+        if len(set(names)) < len(names):
+            raise ValueError(f"every section needs its own name, got {names}")
+
+    def host_scheduler(self, home, profile):
+        ## The scheduler every section on a host shares, set up from the first section's profile
+        host = urlsplit(home).netloc
+        with self._lock:
+            if host not in self.schedulers:
+                rate  = self.requests_per_second or (profile.requests_per_second if profile is not None else 2.0)
+                slots = self.host_concurrency or (profile.max_concurrency if profile is not None else 8)
+                self.schedulers[host] = crawl_scheduler(rate, max_concurrency=slots)
+            return self.schedulers[host]
+
+    def crawl_section(self, spec):
+        ## Collect the section's `create_index` arguments, on top of the orchestrator's
+        spec    = dict(spec)
+        name    = spec.pop('name')
+        profile = LoadProfile(spec.pop('profile', self.profile))
+        home    = spec['index_site_home_link']
+        folder  = os.path.join(self.download_folder, name)
+        os.makedirs(folder, exist_ok=True)
+
+        scheduler = self.host_scheduler(home, profile)
+        arguments = {'since': self.since, 'until': self.until, 'cache': self.cache,
+                     'pool': self.pool}
+        arguments.update(spec)
+        report = {'Section': name, 'Host': urlsplit(home).netloc, 'Indexed': 0, 'Downloaded': 0,
+                  'Index_Seconds': None, 'Scrape_Seconds': None, 'Error': None}
+
+        try:
+            ### Index the section. Each phase gets its own share of the host's scheduler, so
+            ### the retry queues of the sections are kept apart.
+            start = time.monotonic()
+            ci = create_index(**arguments, profile=profile, dedup=self.dedup, metrics=self.metrics,
+                              scheduler=scheduler.share())
+            ci.go()
+            articles = ci.articles.loc[ci.articles.FullLink.map(self.claimed.add).astype(bool)]
+            report['Index_Seconds'] = time.monotonic() - start
+            report['Indexed']       = len(articles)
+
+            ### Then download its articles, while the other sections carry on
+            start = time.monotonic()
+            si = scrape_index(articles, spec['index_site'], folder,
+                              output_format=self.output_format, concurrency=self.concurrency,
+                              browser_fallback=self.browser_fallback, pool=self.pool,
+                              parse_processes=self.parse_processes, metrics=self.metrics,
+                              cache=self.cache, profile=profile, scheduler=scheduler.share(),
+                              dedup=self.dedup, duplicates=self.duplicates,
+                              skip_duplicates=self.skip_duplicates)
+            si.scrape()
+            report['Scrape_Seconds'] = time.monotonic() - start
+            report['Downloaded']     = int(si.articles.Downloaded.sum())
+        except Exception as e:
+            print(f"{name} could not be crawled. {e!r}")
+            phase = 'Index_Seconds' if report['Index_Seconds'] is None else 'Scrape_Seconds'
+            report[phase], report['Error'] = time.monotonic() - start, repr(e)
+            return None, report
+
+        return si.articles.assign(Section=name), report
+
+    def run(self):
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as workers:
+            results = list(workers.map(self.crawl_section, self.sections))
+        wall = time.monotonic() - start
+
+        ## Merge the sections' articles into one index
+        frames   = [articles for articles, _ in results if articles is not None]
+        articles = pd.concat(frames) if frames else pd.DataFrame(columns=article_store.columns + ['Section'])
+        self.report = pd.DataFrame([report for _, report in results])
+
+        ## Record the merged index in the persistent store, from this thread only
+        if self.store is not None and len(articles):
+            self.store.upsert(articles)
+            self.store.mark_downloaded(articles.loc[articles.Downloaded == True, 'FullLink'])
+
+        seconds = self.report.Index_Seconds.fillna(0) + self.report.Scrape_Seconds.fillna(0)
+        print(f"{len(self.sections)} sections crawled in {wall:.1f}s. The slowest section took "
+              f"{seconds.max():.1f}s, and all of them {seconds.sum():.1f}s one after another.")
+
+        self.articles = articles
+        return articles
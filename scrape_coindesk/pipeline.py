@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+A staged download pipeline that keeps parsing off the fetching threads: pages are downloaded by
+threads, parsed by a pool of processes, and handed to the writer in batches.
+"""
+import os, time
+import collections
+import urllib.error
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED,
+                                wait as futures_wait)
+
+from .extract import ExtractPages, ArticleRendered
+from .scheduler import Retryable
+
+class parse_pipeline:
+    """
+    `parse_pipeline` runs the downloads of a `fetch_engine` as three stages, so parsing large pages
+    never holds up the network:
+    
+    1. The engine's worker threads download the raw html of each page.
+    2. The pages wait in a bounded queue, and are sent in chunks to a pool of processes that run
+       `ExtractArticle` on every core. Pages that do not render over plain HTTP are downloaded
+       again in the engine's browser (if it has one) and parsed a second time.
+    3. The parsed articles are handed back in batches, to be written by the caller.
+    
+    When the queue of raw pages is full no new downloads are started, so memory stays bounded
+    when parsing falls behind. On a machine with a single core the processes would only add the
+    cost of sending the pages to them, so the pages are parsed in the engine's threads instead
+    (the `fetch_engine.map` path) and handed back in the same batches.
+    
+    Parameters
+    ----------
+    engine : fetch_engine
+    |    The `fetch_engine` whose threads, scheduler, browsers and metrics are used.
+    
+    processes : int
+    |    The number of parsing processes. The default is None, one per core.
+    
+    queue_size : int
+    |    The largest number of downloaded pages waiting to be parsed. The default is None,
+    |    which allows 4 chunks per process.
+    
+    chunk_size : int
+    |    The number of pages sent to a parsing process at once. The default is 4 pages.
+    
+    batch_size : int
+    |    The number of articles handed to the writer at once. A smaller batch is handed over
+    |    when the pipeline would otherwise sit idle. The default is 32 articles.
+    
+    Methods
+    ----------
+    `map`
+    |    Iterate over (key, link) pairs, or (key, link, attempts already made) triples, the same
+    |    way as `fetch_engine.map`, but yield lists of (key, article, source) tuples.
+    """
+    
+    def __init__(self, engine, processes=None, queue_size=None, chunk_size=4, batch_size=32):
+        self.engine     = engine
+        self.processes  = max(1, int(processes or os.cpu_count() or 1))
+        self.chunk_size = max(1, int(chunk_size))
+        self.queue_size = queue_size if queue_size is not None else 4 * self.processes * self.chunk_size
+        self.batch_size = max(1, int(batch_size))
+        self.threads    = os.cpu_count() == 1
+    
+    def batches(self, results):
+        ## Group the (key, article, source) tuples of `fetch_engine.map` into batches
+        batch = []
+        for result in results:
+            batch.append(result)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def map(self, jobs, on_retry=None):
+        if self.threads:
+            yield from self.batches(self.engine.map(jobs, on_retry=on_retry))
+            return
+        
+        engine    = self.engine
+        scheduler = engine.scheduler
+        metrics   = engine.metrics
+        fallback  = engine.pool is not None or engine.driver is not None
+        
+        def Fetch(key, link, attempt, browser):
+            try:
+                page = engine.fetch_rendered(link) if browser else engine.fetch_html(link)
+            except Exception as e:  # Selenium errors do not share a common base class with urllib
+                return key, link, attempt, e, browser
+            return key, link, attempt, page, browser
+        
+        jobs      = iter(jobs)
+        window    = engine.concurrency * 4
+        exhausted = False
+        raw       = collections.deque()  # (key, link, attempt, page, source) waiting to be parsed
+        batch     = []
+        with ThreadPoolExecutor(max_workers=engine.concurrency) as threads, \
+             ProcessPoolExecutor(max_workers=self.processes) as processes:
+            fetching, parsing = set(), {}
+            while True:
+                ### Top up the downloads with retries that are due, then with new links, unless
+                ### the parsers have fallen behind
+                for key, link, attempt in scheduler.due_retries():
+                    fetching.add(threads.submit(Fetch, key, link, attempt, False))
+                while not exhausted and len(fetching) < window and len(raw) < self.queue_size:
+                    try:
+                        key, link, *attempt = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    fetching.add(threads.submit(Fetch, key, link, attempt[0] if attempt else 0, False))
+                
+                ### Send the waiting pages to the parsers, keeping two chunks per process in flight
+                while raw and len(parsing) < 2 * self.processes:
+                    chunk  = [raw.popleft() for _ in range(min(self.chunk_size, len(raw)))]
+                    future = processes.submit(ExtractPages, [page for *_, page, source in chunk],
+                                              engine.profile)
+                    parsing[future] = [(key, link, attempt, source)
+                                       for key, link, attempt, page, source in chunk]
+                
+                ### Hand the writer what is ready before waiting on the next retry
+                if not fetching and not parsing:
+                    if batch:
+                        yield batch
+                        batch = []
+                    delay = scheduler.next_retry_in()
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                
+                timeout = scheduler.next_retry_in()
+                if batch:
+                    timeout = .05 if timeout is None else min(timeout, .05)
+                done, _ = futures_wait(fetching | set(parsing), timeout=timeout,
+                                       return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    #### Parsed chunks go to the writer, or back to a browser if they did not render
+                    if future in parsing:
+                        pages = parsing.pop(future)
+                        for (key, link, attempt, source), (article, seconds) in zip(pages, future.result()):
+                            metrics.observe('extraction', seconds)
+                            if source == 'http' and fallback and not ArticleRendered(article):
+                                fetching.add(threads.submit(Fetch, key, link, attempt, True))
+                                continue
+                            batch.append((key, article, source))
+                        continue
+                    
+                    #### Downloaded pages wait in the queue for a parser
+                    fetching.discard(future)
+                    key, link, attempt, page, browser = future.result()
+                    if not isinstance(page, Exception):
+                        raw.append((key, link, attempt, page, 'browser' if browser else 'http'))
+                        continue
+                    
+                    #### A page that failed over plain HTTP is tried in a browser, unless the site
+                    #### is throttled or struggling
+                    throttled = isinstance(page, urllib.error.HTTPError) and Retryable(page)
+                    if not browser and fallback and not throttled:
+                        fetching.add(threads.submit(Fetch, key, link, attempt, True))
+                        continue
+                    
+                    #### Re-queue the failures that can be retried
+                    if Retryable(page) and scheduler.retry_later(key, link, attempt + 1):
+                        metrics.count('retries')
+                        if on_retry is not None:
+                            on_retry(key, link, attempt + 1)
+                        continue
+                    metrics.count('failures')
+                    batch.append((key, page, 'browser' if browser else 'http'))
+                
+                ### Hand over a full batch, or whatever is ready when nothing else finished
+                if len(batch) >= self.batch_size or (batch and not done):
+                    yield batch
+                    batch = []
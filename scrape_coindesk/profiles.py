@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Site profiles: the markup, pagination, filters and rate limits of a news site, written down as
+plain data (a `dict`, or a JSON file) and compiled once into the patterns the extraction
+functions run. Only the standard library is imported here, so compiled profiles can be sent to
+the `parse_pipeline` worker processes.
+"""
+import re, os, json
+
+from .extract import (ARTICLE_ELEMENTS, ARTICLE_MARKUP, ARTICLE_BOILERPLATE, ARTICLE_ANCHOR,
+                      LISTING_TIME, EXCLUDED_TITLES, EXCLUDED_TITLE_PARTS, ExtractArticle,
+                      ExtractPages, ArticleLinks, DatedArticleLinks, CustomCheck)
+
+## The coindesk.com markup the extraction functions parse by default
+COINDESK = {
+    'name': 'coindesk',
+    'home': "https://www.coindesk.com",
+    'pagination': {'strategy': 'button', 'more_button': "h3.heading"},
+    'rate_limit': {'requests_per_second': 2.0, 'max_concurrency': 8},
+    'listing': {'anchor': ARTICLE_ANCHOR.pattern, 'time': LISTING_TIME.pattern},
+    'article': {'elements': ARTICLE_ELEMENTS.pattern,
+                'headers': {'Title': '<div class="article-hero-headline">',
+                            'Author': '<h5 class="heading">',
+                            'Datetime': '<div class="article-hero-datetime">'},
+                'markup': ARTICLE_MARKUP.pattern},
+    'filters': {'excluded_titles': sorted(EXCLUDED_TITLES),
+                'excluded_title_parts': EXCLUDED_TITLE_PARTS.pattern,
+                'boilerplate': ARTICLE_BOILERPLATE.pattern},
+}
+
+## Sites with plain semantic markup: the headline in `<h1>`, the byline in a `rel="author"` link,
+## the publication time in `<time datetime>`, and listing links carrying a `title` attribute.
+## A starting point for a new profile, e.g. of a Bloomberg or WSJ style section page.
+GENERIC = {
+    'name': 'generic',
+    'home': "",
+    'pagination': {'strategy': 'scroll'},
+    'rate_limit': {'requests_per_second': 1.0, 'max_concurrency': 4},
+    'listing': {'anchor': r'<a (?=[^>]*?\stitle=(?P<title>"[^"]*"))(?=[^>]*?\shref=(?P<link>"[^"]+"))[^>]*>',
+                'time': LISTING_TIME.pattern},
+    'article': {'elements': r'<h1[^>]*>.*?</h1>|<a [^>]*?rel="author"[^>]*>.*?</a>|' + \
+                            r'<time [^>]*?datetime=[^>]*>.*?</time>|<p(?: [^>]*)?>.*?</p>',
+                'headers': {'Title': '<h1[^>]*>', 'Author': '<a [^>]*?rel="author"[^>]*>',
+                            'Datetime': '<time [^>]*?datetime=[^>]*>'},
+                'markup': '<.+?>|&nbsp;|&amp;?|' + r"\\u.{4}"},
+    'filters': {'excluded_titles': ['About', 'Advertise', 'Contact', 'Privacy Policy',
+                                    'Terms of Service', 'Newsletters', 'Subscribe', 'Sign In'],
+                'excluded_title_parts': ['Articles by ', 'articles by', 'More from '],
+                'boilerplate': []},
+}
+
+SITE_PROFILES = {'coindesk': COINDESK, 'generic': GENERIC}
+
+def Alternation(literals):
+    ## Compile a filter into one pattern. A string is a regex and is used as it is, a list holds
+    ## literal strings, tried longest first so the longest match wins.
+    if isinstance(literals, str):
+        return re.compile(literals) if literals else None
+    literals = sorted(set(literals), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(x) for x in literals)) if literals else None
+
+class site_profile:
+    """
+    `site_profile` compiles the declarative profile of a news site into the patterns used to
+    index and extract its articles: the exact-title filter becomes a frozenset, the substring
+    filters and the boilerplate each become a single regex, and the listing and article patterns
+    are compiled once. The profile is picklable, so it can be sent to worker processes.
+    
+    Parameters
+    ----------
+    spec : dict
+    |    The profile, with the keys (all but 'name' are optional, and fall back to `GENERIC`):
+    |    'name'       : the name of the profile
+    |    'home'       : the home page of the site, e.g. https://www.coindesk.com
+    |    'pagination' : {'strategy': 'button', 'more_button': <css selector of the `More` button>},
+    |                   {'strategy': 'scroll'}, or {'strategy': 'pages', 'page_url': <a listing
+    |                   page link with a {page} placeholder>}
+    |    'rate_limit' : {'requests_per_second': <starting rate>, 'max_concurrency': <workers per host>}
+    |    'listing'    : {'anchor': <regex with quoted `title` and `link` groups>,
+    |                   'time': <regex with the listed time in group 1>}
+    |    'article'    : {'elements': <regex of the header and paragraph elements>,
+    |                   'headers': {<label>: <regex of the opening tag of the header element>},
+    |                   'markup': <regex of the tags and entities to strip>}
+    |    'filters'    : {'excluded_titles': [...], 'excluded_title_parts': [...], 'boilerplate': [...]},
+    |                   literal strings, matched exactly, as a substring, and removed from the text.
+    |                   The last two may also be given as a single regex string instead.
+    
+    Methods
+    ----------
+    `article_links`, `dated_article_links`, `custom_check`, `extract_article`, `extract_pages`
+    |    `ArticleLinks`, `DatedArticleLinks`, `CustomCheck`, `ExtractArticle` and `ExtractPages`
+    |    run with the profile's patterns.
+    """
+    
+    def __init__(self, spec):
+        spec = {key: value for key, value in spec.items()}
+        for key in ('pagination', 'rate_limit', 'listing', 'article', 'filters'):
+            spec[key] = dict(GENERIC[key], **spec.get(key, {}))
+        pagination, rate_limit = spec['pagination'], spec['rate_limit']
+        listing, article, filters = spec['listing'], spec['article'], spec['filters']
+        
+        if pagination['strategy'] not in ('button', 'scroll', 'pages'):
+            raise ValueError(f"Unknown pagination strategy {pagination['strategy']!r}, "
+                             "use 'button', 'scroll' or 'pages'")
+        if pagination['strategy'] == 'pages' and '{page}' not in pagination.get('page_url', ''):
+            raise ValueError("The 'pages' pagination strategy needs a 'page_url' with a {page} placeholder")
+        
+        self.spec                 = spec
+        self.name                 = spec['name']
+        self.home                 = spec.get('home', "")
+        self.pagination           = pagination['strategy']
+        self.more_button          = pagination.get('more_button')
+        self.page_url             = pagination.get('page_url')
+        self.requests_per_second  = float(rate_limit['requests_per_second'])
+        self.max_concurrency      = int(rate_limit['max_concurrency'])
+        
+        ## The listing patterns
+        self.anchor               = re.compile(listing['anchor'])
+        self.listing_time         = re.compile(listing['time'])
+        if not {'title', 'link'} <= set(self.anchor.groupindex):
+            raise ValueError(f"The anchor pattern of the {self.name!r} profile needs `title` and `link` groups")
+        
+        ## The article patterns. Each header tag is a group, so the label is found by its number.
+        self.elements             = re.compile(article['elements'])
+        self.header_names         = tuple(f"{label}: " for label in article['headers'])
+        self.headers              = re.compile('|'.join(f"({tag})" for tag in article['headers'].values()))
+        self.markup               = re.compile(article['markup'])
+        
+        ## The filters
+        self.excluded_titles      = frozenset(filters['excluded_titles'])
+        self.excluded_title_parts = Alternation(filters['excluded_title_parts'])
+        self.boilerplate          = Alternation(filters['boilerplate'])
+    
+    def __repr__(self):
+        return f"site_profile({self.name!r})"
+    
+    def __reduce__(self):
+        ## Worker processes compile the profile again from its spec
+        return (site_profile, (self.spec,))
+    
+    def article_links(self, page):
+        return ArticleLinks(page, self)
+    
+    def dated_article_links(self, page):
+        return DatedArticleLinks(page, self)
+    
+    def custom_check(self, title):
+        return CustomCheck(title, self)
+    
+    def extract_article(self, page):
+        return ExtractArticle(page, self)
+    
+    def extract_pages(self, pages):
+        return ExtractPages(pages, self)
+    
+    @classmethod
+    def load(cls, path):
+        ## Compile a profile saved as a JSON file
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+def LoadProfile(profile):
+    """
+    Return a compiled `site_profile` given one, the name of a built-in profile in
+    `SITE_PROFILES`, the path of a JSON profile, or a profile `dict`. None is returned unchanged.
+    """
+    if profile is None or isinstance(profile, site_profile):
+        return profile
+    if isinstance(profile, dict):
+        return site_profile(profile)
+    if profile in SITE_PROFILES:
+        return site_profile(SITE_PROFILES[profile])
+    if os.path.isfile(profile):
+        return site_profile.load(profile)
+    
+    raise ValueError(f"{profile!r} is neither a built-in site profile ({', '.join(SITE_PROFILES)}) "
+                     "nor a JSON profile file")
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+A local web server that replays recorded listing and article pages, with injected latency,
+throttling and failures, so a crawl can be run end to end without the live site.
+"""
+import hashlib, random, time
+import threading                                             # The server runs beside the crawl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .store import page_cache
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    ## Hand every request to the `replay_server`, and keep the console quiet
+    def do_GET(self):
+        self.server.replay.respond(self)
+
+    def log_message(self, format, *args):
+        pass
+
+class replay_server:
+    """
+    `replay_server` serves recorded pages over HTTP on the local machine, so `create_index` (with
+    a `page_url` template) and `scrape_index` (with `browser_fallback=False`) can crawl them
+    exactly as they crawl the live site. Pages are recorded by crawling the site with a
+    `page_cache`, and are served under the same path they had on the site. Every request can be
+    delayed, throttled with a 429, failed with a 503 or have its connection dropped, at the rates
+    passed, so the retries and the rate control are exercised as well. The faults are drawn from
+    a seeded random generator, so a replay is repeatable.
+
+    Parameters
+    ----------
+    pages : page_cache, str or dict
+    |    The recorded pages: a `page_cache` (or its folder) the site was crawled with, or a dict
+    |    of the html served at each path (and query), e.g. {'/markets/1': '<html>...'}.
+
+    home : str
+    |    The home page the pages in a `page_cache` were recorded from, e.g. https://www.coindesk.com
+    |    A request for a path is answered with the cached page of `home` + path.
+    |    The default is None (only needed with a `page_cache`).
+
+    latency : float or tuple
+    |    The seconds every response is delayed by, or a (low, high) range it is drawn from.
+    |    The default is 0.
+
+    throttle_rate : float
+    |    The share of requests answered with a 429 and a `Retry-After` header. The default is 0.
+
+    failure_rate : float
+    |    The share of requests answered with a 503. The default is 0.
+
+    drop_rate : float
+    |    The share of requests whose connection is closed without a response. The default is 0.
+
+    retry_after : int
+    |    The seconds a throttled client is asked to wait. The default is 1 second.
+
+    seed : int
+    |    The seed of the random generator the latency and the faults are drawn from.
+    |    The default is 0.
+
+    host, port : str, int
+    |    The address the server listens on. The default port of 0 picks a free one.
+
+    Methods
+    ----------
+    `start`
+    |    Serve the pages from a background thread, and return the server.
+
+    `close`
+    |    Stop serving and free the port.
+
+    `page`
+    |    Return the html recorded for a path, exactly as it was requested, or None.
+
+    Attributes
+    ----------
+    `url` : str
+        The home page of the replayed site, e.g. http://127.0.0.1:50123, to crawl in place of
+        `home`.
+
+    `stats` : dict
+        The number of requests received, pages served, unchanged pages (304), requests throttled,
+        failed, dropped and not found, and the bytes sent.
+
+    The server is also a context manager, which starts it and closes it.
+    """
+
+    def __init__(self, pages, home=None, latency=0, throttle_rate=0, failure_rate=0, drop_rate=0,
+                 retry_after=1, seed=0, host='127.0.0.1', port=0):
+        self.pages         = page_cache(pages) if isinstance(pages, str) else pages
+        self.home          = (home or '').rstrip('/')
+        self.latency       = latency
+        self.throttle_rate = throttle_rate
+        self.failure_rate  = failure_rate
+        self.drop_rate     = drop_rate
+        self.retry_after   = retry_after
+        self.random        = random.Random(seed)
+        self._lock         = threading.Lock()
+        self.stats         = {'requests': 0, 'served': 0, 'not_modified': 0, 'throttled': 0,
+                              'failed': 0, 'dropped': 0, 'not_found': 0, 'bytes_sent': 0}
+
+        self.server        = ThreadingHTTPServer((host, port), ReplayHandler)
+        self.server.daemon_threads = True
+        self.server.replay = self
+        self.url           = f"http://{host}:{self.server.server_address[1]}"
+        self.thread        = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread = None
+        self.server.server_close()
+
+    def page(self, path):
+        ## Answer the path exactly as it was requested, like the site would without a redirect
+        if isinstance(self.pages, dict):
+            return self.pages.get(path)
+        return self.pages.get(self.home + path, max_age=float('inf'))
+
+    def draw(self):
+        ## Draw the delay and the fault (if any) of a request, under the lock so a seeded replay
+        ## draws the same sequence
+        with self._lock:
+            self.stats['requests'] += 1
+            latency = self.latency
+            if isinstance(latency, (tuple, list)):
+                latency = self.random.uniform(*latency)
+
+            roll = self.random.random()
+            for fault, rate in (('throttled', self.throttle_rate), ('failed', self.failure_rate),
+                                ('dropped', self.drop_rate)):
+                if roll < rate:
+                    return latency, fault
+                roll -= rate
+
+        return latency, None
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def respond(self, handler):
+        latency, fault = self.draw()
+        if latency > 0:
+            time.sleep(latency)
+
+        ## Inject the fault drawn for the request
+        if fault == 'dropped':
+            self.count('dropped')
+            handler.close_connection = True
+            return
+        if fault is not None:
+            self.count(fault)
+            handler.send_response(429 if fault == 'throttled' else 503)
+            if fault == 'throttled':
+                handler.send_header('Retry-After', str(self.retry_after))
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+
+        page = self.page(handler.path)
+        if page is None:
+            self.count('not_found')
+            handler.send_error(404)
+            return
+
+        ## Pages carry an ETag, so revalidated listing pages that did not change are not sent again
+        data = page.encode('utf-8')
+        etag = '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+        if handler.headers.get('If-None-Match') == etag:
+            self.count('not_modified')
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.end_headers()
+            return
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/html; charset=utf-8')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.send_header('ETag', etag)
+        handler.end_headers()
+        handler.wfile.write(data)
+        self.count('served')
+        self.count('bytes_sent', len(data))
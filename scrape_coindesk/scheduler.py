@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Per-host pacing of the requests sent to a news site, and the retry queue of failed downloads.
+"""
+import time, copy, sys
+import socket          # Timed out requests are retried
+import threading       # The scheduler is shared by the concurrent fetching workers
+import heapq, random   # Retry queue and backoff jitter of the `crawl_scheduler`
+import urllib.error
+from urllib.parse import urlparse  # Split links into hosts for rate limiting
+from contextlib import contextmanager
+
+def Retryable(error):
+    """
+    Return True if a failed request is worth retrying later: throttling (429), server errors
+    (5xx), timeouts, broken connections and browser errors. Other HTTP errors such as 404 are not,
+    and neither is any other error, e.g. a parsing bug.
+    """
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 429 or error.code >= 500
+    if isinstance(error, (urllib.error.URLError, socket.timeout, TimeoutError, ConnectionError)):
+        return True
+    
+    ## Only check for selenium's errors if it was imported, so it is not loaded here
+    selenium = sys.modules.get('selenium.common.exceptions')
+    return selenium is not None and isinstance(error, selenium.WebDriverException)
+
+class crawl_scheduler:
+    """
+    `crawl_scheduler` decides how fast each host is crawled and when failed links are tried again.
+    Every host gets a token bucket whose rate adapts to the responses: the rate grows slowly
+    while responses stay fast, shrinks when response times climb, and is halved on a 429 or 5xx
+    response (waiting out any `Retry-After`). Failed links go into a retry queue and are tried
+    again after an exponential backoff with jitter, instead of being dropped.
+    
+    Parameters
+    ----------
+    requests_per_second : float
+    |    The starting request rate for every host. The default is 2 requests per second.
+    
+    max_requests_per_second : float
+    |    The highest rate a host will be pushed to. The default is 4 times `requests_per_second`.
+    
+    min_requests_per_second : float
+    |    The lowest rate a host will be slowed to. The default is 0.05 (one request every 20 s).
+    
+    burst : int
+    |    The number of requests that may be sent back to back after a host has been idle.
+    |    The default is 1.
+    
+    max_retries : int
+    |    The number of times a failed link is tried again before it is given up on.
+    |    The default is 3 retries.
+    
+    backoff_base, backoff_cap : float
+    |    A link that failed `attempt` times waits a random time between 0 and
+    |    min(backoff_cap, backoff_base * 2**attempt) seconds before the next try.
+    |    The defaults are 1 and 60 seconds.
+    
+    max_concurrency : int
+    |    The largest number of requests in flight to a single host, across every worker (and
+    |    every crawl) sharing the scheduler. Requests over the limit wait for a `slot`, in about
+    |    the order they asked for one. The default is None (no limit).
+    
+    Methods
+    ----------
+    `wait`
+    |    Block the calling thread until the host of the passed link may be requested again.
+    
+    `slot`
+    |    A context manager holding one of the host's `max_concurrency` slots while a request is
+    |    in flight, e.g. `with scheduler.slot(link): ...`
+    
+    `share`
+    |    Return a scheduler with its own retry queue that paces (and limits) the hosts together
+    |    with this one, for crawls running side by side.
+    
+    `record`
+    |    Report the response time and HTTP status (None for a failed request) of a request,
+    |    so the host's rate can adapt.
+    
+    `backoff`
+    |    Return the number of seconds to wait before retry number `attempt`.
+    
+    `retry_later`
+    |    Put a failed link in the retry queue. Returns False once it has used up `max_retries`.
+    
+    `due_retries`
+    |    Yield the (key, link, attempt) of the queued links whose backoff has passed.
+    """
+    
+    def __init__(self, requests_per_second=2.0, max_requests_per_second=None,
+                 min_requests_per_second=0.05, burst=1, max_retries=3,
+                 backoff_base=1.0, backoff_cap=60.0, max_concurrency=None):
+        self.start_rate      = requests_per_second or float('inf')
+        self.max_rate        = max_requests_per_second or 4 * self.start_rate
+        self.min_rate        = min_requests_per_second
+        self.burst           = burst
+        self.max_retries     = max_retries
+        self.backoff_base    = backoff_base
+        self.backoff_cap     = backoff_cap
+        self.max_concurrency = max_concurrency
+        self.hosts           = {}
+        self.retries         = []
+        self.retry_n         = 0
+        self._lock           = threading.Lock()
+    
+    def host_state(self, link):
+        ## Return the state of a link's host, creating it on first use
+        host = urlparse(link).netloc
+        if host not in self.hosts:
+            self.hosts[host] = {'rate': self.start_rate, 'tokens': float(self.burst),
+                                'updated': time.monotonic(), 'blocked_until': 0.0,
+                                'latency': None, 'best_latency': None,
+                                'slots': threading.Semaphore(self.max_concurrency)
+                                         if self.max_concurrency else None}
+        return self.hosts[host]
+    
+    def share(self):
+        ## The copy shares the host states and the lock, but not the retry queue, whose keys
+        ## only mean something to the crawl that queued them
+        shared         = copy.copy(self)
+        shared.retries = []
+        shared.retry_n = 0
+        return shared
+    
+    @contextmanager
+    def slot(self, link):
+        ## Waiting threads are woken in (about) the order they started waiting, so the crawls
+        ## sharing a host take turns
+        with self._lock:
+            slots = self.host_state(link)['slots']
+        if slots is None:
+            yield
+            return
+        
+        slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+    
+    def wait(self, link):
+        ## Take a token from the host's bucket while holding the lock, and sleep outside of it
+        ## so other hosts are not blocked. Taking a token below zero reserves a later slot.
+        with self._lock:
+            state = self.host_state(link)
+            now   = time.monotonic()
+            state['tokens']  = min(self.burst, state['tokens'] + (now - state['updated']) * state['rate'])
+            state['updated'] = now
+            state['tokens'] -= 1
+            
+            delay = max(-state['tokens'] / state['rate'], state['blocked_until'] - now)
+        
+        if delay > 0:
+            time.sleep(delay)
+    
+    def record(self, link, latency, status=200, retry_after=None):
+        with self._lock:
+            state = self.host_state(link)
+            
+            ### Keep a moving average of the response time, and the best one seen
+            if status is not None and latency is not None:
+                state['latency'] = latency if state['latency'] is None else .8 * state['latency'] + .2 * latency
+                state['best_latency'] = min(state['best_latency'] or latency, latency)
+            
+            if status == 429 or status == 503:
+                #### The site asked us to slow down
+                state['rate'] = max(self.min_rate, state['rate'] / 2)
+                pause = retry_after if retry_after is not None else self.backoff(1)
+                state['blocked_until'] = max(state['blocked_until'], time.monotonic() + pause)
+            elif status is None or status >= 500:
+                #### Errors and server trouble
+                state['rate'] = max(self.min_rate, state['rate'] * .75)
+            elif state['latency'] > 2 * state['best_latency']:
+                #### The site is slowing down under our requests
+                state['rate'] = max(self.min_rate, state['rate'] * .9)
+            else:
+                #### Fast responses, speed up a little
+                state['rate'] = min(self.max_rate, state['rate'] + .05 * self.start_rate)
+    
+    def rate(self, link):
+        with self._lock:
+            return self.host_state(link)['rate']
+    
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+    
+    def retry_later(self, key, link, attempt):
+        if attempt > self.max_retries:
+            return False
+        
+        with self._lock:
+            self.retry_n += 1
+            heapq.heappush(self.retries, (time.monotonic() + self.backoff(attempt), self.retry_n,
+                                          key, link, attempt))
+        return True
+    
+    def pending_retries(self):
+        return len(self.retries)
+    
+    def next_retry_in(self):
+        with self._lock:
+            if not self.retries:
+                return None
+            return max(0.0, self.retries[0][0] - time.monotonic())
+    
+    def due_retries(self, block=False):
+        """
+        Yield the (key, link, attempt) of queued links whose backoff has passed. With `block`,
+        keep sleeping until the next one is due and only stop once the queue is empty (links
+        re-queued while iterating are included).
+        """
+        while True:
+            with self._lock:
+                if not self.retries:
+                    return
+                due, _, key, link, attempt = self.retries[0]
+                delay = due - time.monotonic()
+                if delay <= 0:
+                    heapq.heappop(self.retries)
+            
+            if delay <= 0:
+                yield key, link, attempt
+            elif block:
+                time.sleep(delay)
+            else:
+                return
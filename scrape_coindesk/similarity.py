@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Near-duplicate detection for the corpus: MinHash signatures of every article, indexed with
+locality sensitive hashing (LSH) in an SQLite file, so republished and updated stories are found
+without comparing every pair of articles, and without holding the corpus in memory.
+"""
+import os, re, zlib
+import hashlib
+import sqlite3
+import threading       # The index can be shared by crawls running at the same time
+import numpy as np
+
+from .store import corpus_writer
+
+## The signatures use the multiply-shift hash family: the top 32 bits of (a * x + b) mod 2**64
+SHIFT    = np.uint64(32)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+## Combines the hashes of the words in a shingle, so a shingle is hashed without joining its words
+SHINGLE_MULTIPLIER = np.uint64(0x100000001B3)
+
+## The header lines of an `ExtractArticle` list, left out of the text that is compared
+HEADER_LINE = re.compile('(Title|Author|Datetime): ')
+WORD        = re.compile(r'\w+')
+
+def ArticleText(article):
+    ## Return the body text of an article, either the `list` from `ExtractArticle` (or the lines
+    ## of a saved .txt file), or the fields of a `corpus_writer` record
+    if isinstance(article, dict):
+        return ' '.join(article.get('paragraphs') or [])
+    
+    return ' '.join(line for line in article if not HEADER_LINE.match(line))
+
+class near_duplicates:
+    """
+    `near_duplicates` finds articles whose text is nearly the same as an article seen before,
+    e.g. a story that was republished or updated under a slightly different title. Every
+    article is reduced to a MinHash signature of its word shingles, and the signature is split
+    into bands that are saved to an SQLite file. Only articles sharing a band are compared, so
+    the cost of a lookup does not grow with the corpus, and memory stays bounded however many
+    articles are indexed.
+    
+    Parameters
+    ----------
+    db_path : str
+    |    The path of the SQLite file. It will be created if it does not exist. An existing file
+    |    keeps the signature settings it was created with.
+    
+    threshold : float
+    |    The estimated Jaccard similarity of the shingles above which an article is a
+    |    near-duplicate. The default is 0.8.
+    
+    num_perm : int
+    |    The number of hash functions in a signature. The default is 128.
+    
+    bands : int
+    |    The number of LSH bands the signature is split into. More bands find pairs with a lower
+    |    similarity, at the cost of more comparisons. The default is 16 (8 hashes per band).
+    
+    shingle_size : int
+    |    The number of words in a shingle. The default is 5 words.
+    
+    Methods
+    ----------
+    `add`
+    |    Index an article under a key (its link or file name), and return the (key, similarity)
+    |    of the article it nearly duplicates, or None. Near-duplicates are recorded, but only the
+    |    originals are indexed for later lookups.
+    
+    `check`
+    |    Return the (key, similarity) of the indexed article that an article nearly duplicates,
+    |    or None, without indexing it.
+    
+    `scan`
+    |    Index every article saved to a download folder (.txt files or a compressed corpus)
+    |    and yield a (key, original key, similarity) tuple for every near-duplicate found.
+    
+    `duplicates`
+    |    Return the recorded (key, original key, similarity) tuples.
+    
+    The index also supports `len()` and `key in index`.
+    """
+    
+    def __init__(self, db_path, threshold=0.8, num_perm=128, bands=16, shingle_size=5):
+        self.db_path = db_path
+        self._lock   = threading.RLock()
+        
+        ## Sections crawled side by side share the index, and take turns through the lock
+        self.conn    = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS settings (
+                name  TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                id           INTEGER PRIMARY KEY,
+                key          TEXT UNIQUE NOT NULL,
+                signature    BLOB NOT NULL,
+                duplicate_of TEXT,
+                similarity   REAL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket   INTEGER NOT NULL,
+                document INTEGER NOT NULL,
+                PRIMARY KEY (bucket, document)
+            ) WITHOUT ROWID;
+        """)
+        
+        ## The settings of an existing index win, otherwise its signatures could not be compared
+        settings = dict(self.conn.execute("SELECT name, value FROM settings"))
+        if not settings:
+            settings = {'threshold': threshold, 'num_perm': num_perm, 'bands': bands,
+                        'shingle_size': shingle_size}
+            if num_perm % bands:
+                raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+            self.conn.executemany("INSERT INTO settings VALUES (?, ?)", settings.items())
+        self.conn.commit()
+        
+        self.threshold    = settings['threshold']
+        self.num_perm     = int(settings['num_perm'])
+        self.bands        = int(settings['bands'])
+        self.rows         = self.num_perm // self.bands
+        self.shingle_size = int(settings['shingle_size'])
+        self.pending      = 0
+        
+        ## A fixed seed, so every process draws the same hash functions
+        rng    = np.random.RandomState(1)
+        self.a = rng.randint(0, 1 << 63, size=self.num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 1 << 63, size=self.num_perm, dtype=np.uint64)
+    
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    
+    def __contains__(self, key):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM documents WHERE key = ?", (key,)).fetchone() is not None
+    
+    def signature(self, article):
+        ## Hash every word once, and combine the hashes of each run of `shingle_size` words
+        words = WORD.findall(ArticleText(article).lower())
+        if not words:
+            return None
+        
+        size   = min(self.shingle_size, len(words))
+        hashes = np.fromiter((zlib.crc32(w.encode('utf-8')) for w in words),
+                             dtype=np.uint64, count=len(words))
+        
+        ## uint64 overflow wraps around, which keeps the hashes well mixed
+        with np.errstate(over='ignore'):
+            shingles = np.zeros(len(words) - size + 1, dtype=np.uint64)
+            for i in range(size):
+                shingles = shingles * SHINGLE_MULTIPLIER + hashes[i:len(hashes) - size + 1 + i]
+            shingles = np.unique(shingles & MAX_HASH)
+            
+            ## Then take the minimum of each hash function over the shingles
+            permuted = (np.outer(shingles, self.a) + self.b) >> SHIFT
+        return permuted.min(axis=0).astype(np.uint32)
+    
+    def band_keys(self, signature):
+        ## Hash each band of the signature, and its number, to a signed 64 bit bucket
+        data = signature.tobytes()
+        step = self.rows * 4
+        return [int.from_bytes(hashlib.blake2b(data[band * step:(band + 1) * step],
+                                               digest_size=8, salt=bytes([band])).digest(),
+                               'little', signed=True)
+                for band in range(self.bands)]
+    
+    def match(self, signature, limit=200):
+        ## Compare the signature with the indexed articles sharing one of its bands
+        keys = self.band_keys(signature)
+        with self._lock:
+            rows = self.conn.execute(f"""
+                SELECT key, signature FROM documents WHERE id IN (
+                    SELECT DISTINCT document FROM buckets WHERE bucket IN ({', '.join('?' * len(keys))})
+                    LIMIT {int(limit)})""", keys).fetchall()
+        
+        best = None
+        for key, other in rows:
+            similarity = float(np.mean(signature == np.frombuffer(other, dtype=np.uint32)))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        
+        return best
+    
+    def check(self, article):
+        signature = self.signature(article)
+        return None if signature is None else self.match(signature)
+    
+    def indexed(self, key):
+        ## The (original key, similarity) an indexed article was matched with, (None, None) for
+        ## an original, or None if the article is not indexed
+        with self._lock:
+            return self.conn.execute("SELECT duplicate_of, similarity FROM documents WHERE key = ?",
+                                     (key,)).fetchone()
+    
+    def add(self, key, article):
+        ## An article indexed before keeps the original it was matched with
+        row = self.indexed(key)
+        if row is not None:
+            return None if row[0] is None else row
+        
+        ## The signature is computed outside the lock. The article is looked up again under it,
+        ## so two threads adding the same article cannot both index it.
+        signature = self.signature(article)
+        if signature is None:
+            return None
+        
+        with self._lock:
+            row = self.indexed(key)
+            if row is not None:
+                return None if row[0] is None else row
+            
+            best   = self.match(signature)
+            cursor = self.conn.execute("INSERT INTO documents (key, signature, duplicate_of, similarity) "
+                                       "VALUES (?, ?, ?, ?)",
+                                       (key, signature.tobytes(), *(best or (None, None))))
+            if best is None:
+                self.conn.executemany("INSERT OR IGNORE INTO buckets VALUES (?, ?)",
+                                      [(bucket, cursor.lastrowid) for bucket in self.band_keys(signature)])
+            
+            ### Commit in batches rather than once per article
+            self.pending += 1
+            if self.pending >= 1000:
+                self.flush()
+        
+        return best
+    
+    def scan(self, download_folder):
+        ## A compressed corpus is read record by record, .txt files one at a time
+        if any(f.endswith('.jsonl.gz') for f in os.listdir(download_folder)):
+            corpus = corpus_writer(download_folder)
+            try:
+                for fields in corpus:
+                    match = self.add(fields['url'], fields)
+                    if match is not None:
+                        yield (fields['url'],) + tuple(match)
+            finally:
+                corpus.close()
+        else:
+            with os.scandir(download_folder) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.txt'):
+                        continue
+                    with open(entry.path, encoding='utf-8', errors='replace') as f:
+                        match = self.add(entry.name, f.read().split('\n'))
+                    if match is not None:
+                        yield (entry.name,) + tuple(match)
+        
+        self.flush()
+    
+    def duplicates(self):
+        with self._lock:
+            return self.conn.execute("""SELECT key, duplicate_of, similarity FROM documents
+                                        WHERE duplicate_of IS NOT NULL ORDER BY id""").fetchall()
+    
+    def flush(self):
+        with self._lock:
+            self.conn.commit()
+            self.pending = 0
+    
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
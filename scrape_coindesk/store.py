@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent storage shared between runs: the SQLite article index, the compressed, sharded
+corpus the articles can be saved to, and the cache of raw pages.
+"""
+import os, time
+import datetime as dt
+import threading       # The page cache is shared by the concurrent fetching workers
+import hashlib         # Content addresses of the cached pages
+import sqlite3         # Persistent article index shared between runs
+import gzip, json      # Compressed, sharded corpus output
+import pandas as pd
+
+from .extract import ArticleFields, DateBound
+
+class article_store:
+    """
+    `article_store` is a persistent article index saved to an SQLite file. Articles are keyed by
+    their full hyperlink, so `create_index` can add the articles found on each run without
+    duplicating the ones already indexed, and `scrape_index` can ask for just the articles that
+    have not been downloaded yet. Lookups by link, the "not yet downloaded" query and date range
+    queries are served from indexes and do not read the whole table.
+    
+    Parameters
+    ----------
+    db_path : str
+    |    The path of the SQLite file. It will be created if it does not exist.
+    
+    Methods
+    ----------
+    `upsert`
+    |    Add the articles in a DataFrame from `create_index` to the store. Articles that are
+    |    already stored keep their download status.
+    
+    `pending`
+    |    Return the articles that have not been downloaded as a DataFrame in the same layout as
+    |    `create_index.articles`. Pass `limit` (and the `FullLink` of the last article read as
+    |    `after`) to read them a page at a time.
+    
+    `mark_downloaded`
+    |    Flag a list of links as downloaded.
+    
+    `to_frame`
+    |    Return every stored article as a DataFrame.
+    
+    `between`
+    |    Return the articles published on or after `since` and before `until`, oldest first,
+    |    e.g. `store.between('2021-03-01', '2021-04-01')` for March 2021. Only the part of the
+    |    sorted publication date index inside the range is read.
+    
+    `pages`
+    |    Yield the articles `pending`, `to_frame` or `between` return, `page_size` at a time.
+    |    Each page carries on from the last article of the previous one, so reading a page costs
+    |    the same wherever it is in the table, and articles flagged as downloaded while the pages
+    |    are read do not shift the pages that follow.
+    
+    The store also supports `len()` and `link in store`, so it can be passed as the
+    `known_links` of `create_index.crawl_pages`.
+    """
+    
+    columns = ['Title', 'Master Site', 'Extension_1', 'Extension_2', 'Extension_3', 'Href', 'Published',
+               'Downloaded', 'FullLink']
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn    = sqlite3.connect(db_path)
+        
+        ## WAL keeps readers fast while a crawl is writing to the file
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                full_link     TEXT PRIMARY KEY,
+                title         TEXT NOT NULL,
+                master_site   TEXT,
+                extension_1   TEXT,
+                extension_2   TEXT,
+                extension_3   TEXT,
+                href          TEXT,
+                downloaded    INTEGER NOT NULL DEFAULT 0,
+                indexed_at    TEXT,
+                downloaded_at TEXT,
+                published     TEXT
+            );
+            CREATE INDEX IF NOT EXISTS articles_pending ON articles (downloaded) WHERE downloaded = 0;
+        """)
+        
+        ## Stores created before publication times were indexed get the column added. The times
+        ## are saved as ISO 8601 text in UTC, which sorts in date order.
+        if 'published' not in {row[1] for row in self.conn.execute("PRAGMA table_info(articles)")}:
+            self.conn.execute("ALTER TABLE articles ADD COLUMN published TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS articles_published ON articles (published) "
+                          "WHERE published IS NOT NULL")
+        self.conn.commit()
+    
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+    
+    def __contains__(self, link):
+        row = self.conn.execute("SELECT 1 FROM articles WHERE full_link = ?", (link,)).fetchone()
+        return row is not None
+    
+    def upsert(self, articles_df):
+        now  = dt.datetime.now().isoformat(timespec='seconds')
+        if 'Published' in articles_df.columns:
+            published = pd.to_datetime(articles_df.Published).dt.strftime('%Y-%m-%dT%H:%M:%S')
+            published = published.astype(object).where(published.notna(), None)
+        else:
+            published = [None] * len(articles_df)
+        rows = zip(articles_df.FullLink, articles_df.Title, articles_df['Master Site'],
+                   articles_df.Extension_1, articles_df.Extension_2, articles_df.Extension_3,
+                   articles_df.Href, articles_df.Downloaded.astype(int), published)
+        
+        ## New links are inserted, known links only have their title/link info refreshed.
+        ## A download recorded in the DataFrame is kept, but never undone, and a publication
+        ## time is kept when the article is indexed again without one.
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO articles (full_link, title, master_site, extension_1, extension_2,
+                                      extension_3, href, downloaded, published, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (full_link) DO UPDATE SET
+                    title       = excluded.title,
+                    master_site = excluded.master_site,
+                    extension_1 = excluded.extension_1,
+                    extension_2 = excluded.extension_2,
+                    extension_3 = excluded.extension_3,
+                    href        = excluded.href,
+                    downloaded  = MAX(downloaded, excluded.downloaded),
+                    published   = COALESCE(excluded.published, published)
+            """, (row + (now,) for row in rows))
+    
+    def query(self, where=(), params=(), limit=None, order="rowid", after=None):
+        ## The articles meeting the `where` conditions, in `order` (a column, then the rowid),
+        ## from the one after the `after` link on
+        where, params = list(where), list(params)
+        key = "rowid" if order == "rowid" else f"{order}, rowid"
+        if after is not None:
+            where.append(f"({key}) > (SELECT {key} FROM articles WHERE full_link = ?)")
+            params.append(after)
+        
+        sql = """SELECT title, master_site, extension_1, extension_2, extension_3, href,
+                        published, downloaded, full_link
+                 FROM articles """
+        if where:
+            sql += "WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + key
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        
+        ## Building the DataFrame from the fetched rows is several times faster than `pd.read_sql_query`
+        rows     = self.conn.execute(sql, params).fetchall()
+        articles = pd.DataFrame.from_records(rows, columns=self.columns)
+        articles.index = articles.FullLink.to_numpy()
+        articles['Published']  = pd.to_datetime(articles.Published)
+        articles['Downloaded'] = articles.Downloaded.astype(bool)
+        
+        return articles
+    
+    def pending(self, limit=None, after=None):
+        return self.query(["downloaded = 0"], limit=limit, after=after)
+    
+    def to_frame(self, limit=None, after=None):
+        return self.query(limit=limit, after=after)
+    
+    def between(self, since=None, until=None, pending=False, limit=None, after=None):
+        ## A range scan over the `articles_published` index. Articles without a publication
+        ## time are left out.
+        where, params = ["published IS NOT NULL"], []
+        if since is not None:
+            where.append("published >= ?")
+            params.append(DateBound(since).isoformat(timespec='seconds'))
+        if until is not None:
+            where.append("published < ?")
+            params.append(DateBound(until).isoformat(timespec='seconds'))
+        if pending:
+            where.append("downloaded = 0")
+        
+        return self.query(where, params, limit=limit, order="published", after=after)
+    
+    def pages(self, page_size, pending=True, since=None, until=None):
+        ## Read the articles `between` `since` and `until` when either is passed, and the
+        ## `pending` articles (or all of them) otherwise
+        after = None
+        while True:
+            if since is not None or until is not None:
+                page = self.between(since, until, pending, limit=page_size, after=after)
+            elif pending:
+                page = self.pending(page_size, after)
+            else:
+                page = self.to_frame(page_size, after)
+            if page.empty:
+                return
+            
+            yield page
+            after = page.FullLink.iat[-1]
+    
+    def mark_downloaded(self, links):
+        now = dt.datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany("UPDATE articles SET downloaded = 1, downloaded_at = ? WHERE full_link = ?",
+                                  ((now, link) for link in links))
+    
+    def close(self):
+        self.conn.close()
+
+class corpus_writer:
+    """
+    `corpus_writer` appends articles to sharded, gzip compressed JSON lines files in place of one
+    .txt file per article. Every article is written as its own gzip member, and the shard, byte
+    offset and length of that member are kept in an SQLite offset index, so a single article can
+    be read back without decompressing the rest of its shard. Whole shards can still be read
+    with `gzip.open`, which reads the members one after another.
+    
+    Parameters
+    ----------
+    corpus_folder : str
+    |    The folder that the shards (`corpus-00000.jsonl.gz`, ...) and the offset index
+    |    (`corpus_index.db`) are saved to. It will be created if it does not exist.
+    
+    shard_size : int
+    |    The number of compressed bytes written to a shard before the next shard is started.
+    |    The default is 64 MB.
+    
+    Methods
+    ----------
+    `write`
+    |    Append an article (the `list` returned by `ExtractArticle`) to the current shard.
+    
+    `read`
+    |    Return the fields of a single article by its url.
+    
+    `urls`
+    |    Return the set of urls already saved in the corpus.
+    
+    `close`
+    |    Flush the current shard and the offset index.
+    
+    Iterating over a `corpus_writer` yields the fields of every saved article.
+    """
+    
+    def __init__(self, corpus_folder, shard_size=64 * 2**20):
+        os.makedirs(corpus_folder, exist_ok=True)
+        
+        self.corpus_folder = corpus_folder
+        self.shard_size    = shard_size
+        self.conn          = sqlite3.connect(os.path.join(corpus_folder, 'corpus_index.db'))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url        TEXT PRIMARY KEY,
+                title      TEXT,
+                shard      TEXT NOT NULL,
+                offset     INTEGER NOT NULL,
+                length     INTEGER NOT NULL,
+                fetched_at TEXT
+            )""")
+        self.conn.commit()
+        
+        ## Pick up appending to the last shard of an earlier run
+        shards = sorted(f for f in os.listdir(corpus_folder) if f.endswith('.jsonl.gz'))
+        self.shard_n = len(shards) - 1 if shards else 0
+        self.shard   = None
+        self.pending = 0
+    
+    def shard_name(self):
+        return f"corpus-{self.shard_n:05d}.jsonl.gz"
+    
+    def write(self, article, title="", link=""):
+        fields = ArticleFields(article, title, link)
+        member = gzip.compress((json.dumps(fields) + '\n').encode('utf-8'))
+        
+        ## Start a new shard once the current one is full
+        if self.shard is None:
+            self.shard = open(os.path.join(self.corpus_folder, self.shard_name()), 'ab')
+        if self.shard.tell() > 0 and self.shard.tell() + len(member) > self.shard_size:
+            self.shard.close()
+            self.shard_n += 1
+            self.shard    = open(os.path.join(self.corpus_folder, self.shard_name()), 'ab')
+        
+        offset = self.shard.tell()
+        self.shard.write(member)
+        self.conn.execute("INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?)",
+                          (link, fields['title'], self.shard_name(), offset, len(member),
+                           fields['fetched_at']))
+        
+        ## Commit the offset index in batches rather than once per article
+        self.pending += 1
+        if self.pending >= 100:
+            self.flush()
+    
+    def flush(self):
+        if self.shard is not None:
+            self.shard.flush()
+        self.conn.commit()
+        self.pending = 0
+    
+    def read(self, link):
+        row = self.conn.execute("SELECT shard, offset, length FROM articles WHERE url = ?",
+                                (link,)).fetchone()
+        if row is None:
+            raise KeyError(link)
+        
+        shard, offset, length = row
+        if self.shard is not None and shard == self.shard_name():
+            self.shard.flush()
+        
+        with open(os.path.join(self.corpus_folder, shard), 'rb') as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+    
+    def urls(self):
+        return {url for (url,) in self.conn.execute("SELECT url FROM articles")}
+    
+    def __iter__(self):
+        self.flush()
+        for shard in sorted(f for f in os.listdir(self.corpus_folder) if f.endswith('.jsonl.gz')):
+            with gzip.open(os.path.join(self.corpus_folder, shard), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+    
+    def close(self):
+        self.flush()
+        if self.shard is not None:
+            self.shard.close()
+            self.shard = None
+        self.conn.close()
+
+class page_cache:
+    """
+    `page_cache` keeps the raw html of downloaded pages on disk, so pages that have not changed
+    are not downloaded again, and articles can be extracted again from the saved pages without
+    any network I/O (see the `offline` mode of `scrape_index`). Pages are gzip compressed and
+    saved under the sha256 of their content, so identical pages are only stored once, and an
+    SQLite index maps every url to its page, its ETag/Last-Modified validators and the time it
+    was fetched and last used.
+    
+    Parameters
+    ----------
+    cache_folder : str
+    |    The folder the pages (`objects/`) and the index (`cache_index.db`) are saved to.
+    |    It will be created if it does not exist.
+    
+    max_size : int
+    |    The largest number of compressed bytes kept in the cache. Once it is exceeded the least
+    |    recently used pages are evicted. The default is 2 GB.
+    
+    ttl : float
+    |    The number of seconds a cached page is served without asking the site. Older pages are
+    |    revalidated with a conditional request, which only downloads the page again if it has
+    |    changed. The default is 7 days.
+    
+    Methods
+    ----------
+    `get`
+    |    Return the cached html of a url, or None when it is not cached or older than `max_age`
+    |    seconds (the `ttl` by default). Pass `max_age=float('inf')` to accept any cached page.
+    
+    `lookup`
+    |    Return the cache entry of a url (its digest, validators and fetch time), or None.
+    
+    `validators`
+    |    Return the If-None-Match/If-Modified-Since headers of a conditional request for an entry.
+    
+    `put`
+    |    Save the html of a url, along with the ETag and Last-Modified headers it was sent with.
+    
+    `touch`
+    |    Mark a cached page as revalidated (the site answered 304 Not Modified).
+    
+    `evict`
+    |    Remove the least recently used pages until the cache fits in `max_size`.
+    
+    The cache also supports `len()` and `link in cache`.
+    """
+    
+    def __init__(self, cache_folder, max_size=2 * 2**30, ttl=7 * 24 * 3600):
+        os.makedirs(os.path.join(cache_folder, 'objects'), exist_ok=True)
+        
+        self.cache_folder = cache_folder
+        self.max_size     = max_size
+        self.ttl          = ttl
+        self._lock        = threading.Lock()
+        
+        ## The cache is shared by the `fetch_engine` worker threads, which take turns through the lock
+        self.conn = sqlite3.connect(os.path.join(cache_folder, 'cache_index.db'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url           TEXT PRIMARY KEY,
+                digest        TEXT NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                fetched_at    REAL NOT NULL,
+                accessed_at   REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS objects (
+                digest TEXT PRIMARY KEY,
+                size   INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_lru ON pages (accessed_at);
+            CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest);
+        """)
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+    
+    def object_path(self, digest):
+        return os.path.join(self.cache_folder, 'objects', digest[:2], digest + '.html.gz')
+    
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    
+    def __contains__(self, link):
+        return self.lookup(link) is not None
+    
+    def lookup(self, link):
+        with self._lock:
+            row = self.conn.execute("""SELECT digest, etag, last_modified, fetched_at FROM pages
+                                       WHERE url = ?""", (link,)).fetchone()
+        if row is None:
+            return None
+        
+        return dict(zip(['digest', 'etag', 'last_modified', 'fetched_at'], row))
+    
+    def validators(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        return headers
+    
+    def get(self, link, max_age=None):
+        entry = self.lookup(link)
+        max_age = self.ttl if max_age is None else max_age
+        if entry is None or time.time() - entry['fetched_at'] > max_age:
+            return None
+        
+        try:
+            with open(self.object_path(entry['digest']), 'rb') as f:
+                page = gzip.decompress(f.read()).decode('utf-8')
+        except OSError:
+            ### The page file is gone (e.g. deleted by hand), forget the entry
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM pages WHERE url = ?", (link,))
+                self.release(entry['digest'])
+            return None
+        
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), link))
+        
+        return page
+    
+    def put(self, link, page, etag=None, last_modified=None):
+        data   = page.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        file   = self.object_path(digest)
+        now    = time.time()
+        
+        with self._lock:
+            ### Identical pages share one file
+            known = self.conn.execute("SELECT 1 FROM objects WHERE digest = ?", (digest,)).fetchone()
+            if known is None or not os.path.exists(file):
+                os.makedirs(os.path.dirname(file), exist_ok=True)
+                member = gzip.compress(data)
+                with open(file + '.tmp', 'wb') as f:
+                    f.write(member)
+                os.replace(file + '.tmp', file)
+                if known is None:
+                    self.size += len(member)
+                self.conn.execute("INSERT OR REPLACE INTO objects VALUES (?, ?)", (digest, len(member)))
+            
+            old = self.conn.execute("SELECT digest FROM pages WHERE url = ?", (link,)).fetchone()
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                                  (link, digest, etag, last_modified, now, now))
+                if old is not None and old[0] != digest:
+                    self.release(old[0])
+            
+            if self.size > self.max_size:
+                self.evict_locked()
+    
+    def touch(self, link):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                              (now, now, link))
+    
+    def release(self, digest):
+        ## Delete a page file once no url points at it. Called with the lock held.
+        if self.conn.execute("SELECT 1 FROM pages WHERE digest = ?", (digest,)).fetchone() is not None:
+            return
+        
+        row = self.conn.execute("SELECT size FROM objects WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            self.conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+            self.size -= row[0]
+        try:
+            os.remove(self.object_path(digest))
+        except OSError:
+            pass
+    
+    def evict(self):
+        with self._lock:
+            self.evict_locked()
+    
+    def evict_locked(self):
+        ## Drop the least recently used pages, a batch at a time, until the cache fits
+        with self.conn:
+            while self.size > self.max_size:
+                rows = self.conn.execute("""SELECT url, digest FROM pages
+                                            ORDER BY accessed_at LIMIT 100""").fetchall()
+                if not rows:
+                    break
+                for url, digest in rows:
+                    self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    self.release(digest)
+                    if self.size <= self.max_size:
+                        break
+    
+    def urls(self):
+        with self._lock:
+            return {url for (url,) in self.conn.execute("SELECT url FROM pages")}
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures of the test suite. The saved pages in `benchmarks/fixtures` are served over HTTP
+on the local machine by a `replay_server`, so the crawl is tested without the live site or a
+browser.
+"""
+import os, sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+## The package. The helpers in `sites.py` are imported from this folder.
+sys.path.insert(0, ROOT)
+
+from scrape_coindesk.replay import replay_server
+from sites import FIXTURES
+
+@pytest.fixture(scope='session')
+def fixture_pages():
+    ## {path: html} of every saved page, served under its file name, e.g. /coindesk_article_1.html
+    pages = {}
+    for file in sorted(os.listdir(FIXTURES)):
+        with open(os.path.join(FIXTURES, file), encoding='utf-8') as f:
+            pages['/' + file] = f.read()
+    return pages
+
+@pytest.fixture
+def server(fixture_pages):
+    with replay_server(fixture_pages) as server:
+        yield server
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Sites and browsers the tests and the benchmarks crawl instead of the live site. `FixtureSite`
+builds a whole site out of the saved pages in `benchmarks/fixtures`, to be served by a
+`replay_server`, and `listing_driver` stands in for a Firefox driver with an expanded listing open.
+
+The benchmarks import this module from the `tests` folder, e.g.
+    sys.path.insert(0, os.path.join(ROOT, 'tests'))
+    from sites import FixtureSite
+"""
+import datetime as dt, os, re
+
+ROOT     = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+## An article card of the saved listing, and the link and publication time inside it
+CARD = re.compile(r'<div class="list-item-card post">.*?</div></div>\n', re.S)
+LINK = re.compile(r'href="/markets/\d{4}/\d\d/\d\d/[^"/]+/"')
+TIME = re.compile(r'datetime="[^"]+"')
+
+def FixtureSite(n_articles, per_page, listing, first=0):
+    ## Build the {path: html} of a site with `n_articles` articles, newest first, `per_page` to a
+    ## listing page, out of the saved listing's article cards and the saved article pages.
+    ## Articles are numbered from `first`, so sites built with overlapping numbers cross-post.
+    with open(os.path.join(FIXTURES, 'coindesk_listing.html'), encoding='utf-8') as f:
+        page = f.read()
+    cards = CARD.findall(page)
+    head, tail = page[:page.index(cards[0])], page[page.index(cards[-1]) + len(cards[-1]):]
+    
+    articles = []
+    for file in sorted(os.listdir(FIXTURES)):
+        if 'article' in file:
+            with open(os.path.join(FIXTURES, file), encoding='utf-8') as f:
+                articles.append(f.read())
+    
+    pages, newest = {}, dt.datetime(2021, 5, 15, 14)
+    for start in range(first, first + n_articles, per_page):
+        listed = []
+        for i in range(start, min(first + n_articles, start + per_page)):
+            published = newest - dt.timedelta(hours=3 * i)
+            path      = f"/markets/{published:%Y/%m/%d}/story-{i}/"
+            card      = LINK.sub(f'href="{path}"', cards[i % len(cards)], count=1)
+            listed.append(TIME.sub(f'datetime="{published:%Y-%m-%dT%H:%M:%SZ}"', card, count=1))
+            pages[path] = articles[i % len(articles)]
+        pages[listing.format(page=(start - first) // per_page + 1)] = head + ''.join(listed) + tail
+    
+    return pages
+
+def ListingCards(site):
+    ## The article cards of the listing pages of a `FixtureSite`, in the order they are listed
+    return [card for path, html in sorted(site.items()) if '/story-' not in path
+            for card in CARD.findall(html)]
+
+class listing_driver:
+    ## Stands in for a Firefox driver with an expanded listing open, answering `ListingBatches`
+    ## with the html of the article cards it asks for. `cards` can be any sequence that slices
+    ## into a list of cards, so a large listing can be built as it is read, like the browser
+    ## serializes it.
+    def __init__(self, cards):
+        self.cards = cards
+    
+    def get(self, link):
+        pass
+    
+    def execute_script(self, script, start, batch_size):
+        batch = self.cards[start:start + batch_size]
+        return [len(batch), ''.join(batch)]
+    
+    def quit(self):
+        pass
+
+class listing_pool:
+    ## Hands the stand-in browser to `create_index`, the way a `driver_pool` does
+    def __init__(self, driver):
+        self.driver = driver
+    
+    def acquire(self):
+        return self.driver
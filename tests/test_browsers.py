@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import threading, time
+
+from scrape_coindesk import browsers
+from scrape_coindesk.browsers import driver_pool
+
+class FakeFirefox:
+    ## Stands in for a Firefox driver, counting the browsers open at once
+    lock, open, most = threading.Lock(), 0, 0
+    capabilities = {}
+    
+    def __init__(self):
+        time.sleep(.02)  # Browsers take a while to start
+        with FakeFirefox.lock:
+            FakeFirefox.open += 1
+            FakeFirefox.most  = max(FakeFirefox.most, FakeFirefox.open)
+    
+    def get(self, link):
+        time.sleep(.005)
+    
+    def quit(self):
+        with FakeFirefox.lock:
+            FakeFirefox.open -= 1
+
+def test_recycled_browsers_never_exceed_the_pool_size(monkeypatch):
+    monkeypatch.setattr(browsers, 'StartFirefox', lambda headless=True: FakeFirefox())
+    FakeFirefox.open, FakeFirefox.most = 0, 0
+    
+    ### Every browser is worn out after one page, so each hand back starts a replacement
+    pool = driver_pool(size=2, max_pages=1, max_memory_mb=None)
+    def Worker():
+        for _ in range(10):
+            driver = pool.acquire()
+            driver.get('http://127.0.0.1/')
+            driver.quit()
+    
+    workers = [threading.Thread(target=Worker) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    ### Wait for the last replacements to start, then close the pool
+    for _ in range(pool.size):
+        pool.slots.acquire()
+    pool.close()
+    
+    assert FakeFirefox.most <= 2
+    assert FakeFirefox.open == 0
+
+def test_idle_browsers_are_reused(monkeypatch):
+    monkeypatch.setattr(browsers, 'StartFirefox', lambda headless=True: FakeFirefox())
+    FakeFirefox.open, FakeFirefox.most = 0, 0
+    
+    pool   = driver_pool(size=1, max_pages=10, max_memory_mb=None)
+    first  = pool.acquire()
+    first.get('http://127.0.0.1/')
+    inner  = first._driver
+    first.quit()
+    
+    second = pool.acquire()
+    assert second._driver is inner and second.pages == 1
+    second.quit()
+    pool.close()
+    assert FakeFirefox.open == 0
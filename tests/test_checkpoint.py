@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import io, os
+import datetime as dt
+from contextlib import redirect_stdout
+
+from scrape_coindesk import article_store, link_filter
+from scrape_coindesk.checkpoint import crawl_checkpoint
+from scrape_coindesk.crawl import create_index, run_crawl, resume_crawl
+from scrape_coindesk.replay import replay_server
+from sites import FixtureSite, ListingCards, listing_driver, listing_pool
+
+HOME    = "https://www.coindesk.com"
+LISTING = '/markets/{page}'
+
+def Crawl(tmp_path, server, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return run_crawl(str(tmp_path / 'crawl.journal'), server.url + LISTING.format(page=1),
+                         server.url, str(tmp_path / 'articles'), page_url=server.url + LISTING,
+                         concurrency=4, requests_per_second=100, browser_fallback=False, **kwargs)
+
+def Resume(tmp_path):
+    with redirect_stdout(io.StringIO()):
+        return resume_crawl(str(tmp_path / 'crawl.journal'))
+
+def test_resume_downloads_only_the_articles_left(tmp_path):
+    ## The first run finds every article in the listing, but none of the article pages
+    site  = FixtureSite(30, 10, LISTING)
+    pages = {path: html for path, html in site.items() if '/story-' not in path}
+    os.makedirs(tmp_path / 'articles')
+    with replay_server(pages) as server:
+        si = Crawl(tmp_path, server)
+        assert len(si.articles) == 30 and not si.articles.Downloaded.any()
+        
+        ### The article pages come back, and only they are fetched by the resumed crawl
+        pages.update(site)
+        served = server.stats['served']
+        si = Resume(tmp_path)
+        assert si.articles.Downloaded.all()
+        assert server.stats['served'] - served == 30
+        
+        ### A finished crawl has nothing left to fetch
+        served = server.stats['served']
+        si = Resume(tmp_path)
+        assert si.articles.Downloaded.all() and server.stats['served'] == served
+
+    journal = crawl_checkpoint(str(tmp_path / 'crawl.journal'))
+    assert journal.state['cursor']['index'] == 'done'
+    assert set(journal.state['status'].values()) == {'done'}
+
+def test_resume_keeps_the_store_cache_and_dedup_settings(tmp_path):
+    os.makedirs(tmp_path / 'articles')
+    settings = dict(store=str(tmp_path / 'index.db'), cache=str(tmp_path / 'cache'),
+                    cache_ttl=60, dedup=str(tmp_path / 'seen.bloom'), dedup_capacity=1000)
+    with replay_server(FixtureSite(20, 10, LISTING)) as server:
+        si = Crawl(tmp_path, server, **settings)
+    assert si.articles.Downloaded.all()
+    
+    ### The settings are recorded in the journal, for `resume_crawl`
+    run = crawl_checkpoint(str(tmp_path / 'crawl.journal')).state['run']
+    assert {key: run[key] for key in settings} == settings
+    
+    ### And every object was built with them
+    store = article_store(settings['store'])
+    assert len(store) == 20 and len(store.pending()) == 0
+    store.close()
+    assert si.cache.ttl == 60
+    dedup = link_filter(settings['dedup'])
+    assert dedup.bits is not None and len(dedup) == 20   # Saved as a Bloom filter
+
+## The window of the crawls below, and the articles of `FixtureSite` published inside it
+SINCE, UNTIL = dt.datetime(2021, 5, 13, 12), dt.datetime(2021, 5, 14, 12)
+
+def InWindow(site):
+    ## The paths of the articles published between SINCE and UNTIL, out of the story numbers
+    newest = dt.datetime(2021, 5, 15, 14)
+    return {path for path in site if '/story-' in path and
+            SINCE <= newest - dt.timedelta(hours=3 * int(path.rstrip('/').rsplit('-', 1)[1])) < UNTIL}
+
+def test_resumed_windowed_crawl_stays_in_the_window(tmp_path):
+    site  = FixtureSite(30, 10, LISTING)
+    pages = {path: html for path, html in site.items() if '/story-' not in path}
+    os.makedirs(tmp_path / 'articles')
+    with replay_server(pages) as server:
+        si = Crawl(tmp_path, server, since=SINCE, until=UNTIL)
+        assert not si.articles.Downloaded.any()
+        
+        pages.update(site)
+        si = Resume(tmp_path)
+        fetched = {link[len(server.url):] + '/' for link in si.articles.FullLink}
+    assert si.articles.Downloaded.all()
+    assert fetched == InWindow(site) and 0 < len(fetched) < 30
+
+def test_browser_index_only_records_the_window(tmp_path):
+    site    = FixtureSite(30, 10, LISTING)
+    journal = str(tmp_path / 'crawl.journal')
+    pool    = listing_pool(listing_driver(ListingCards(site)))
+    with redirect_stdout(io.StringIO()):
+        ci = create_index(HOME + '/markets', HOME, pool=pool,
+                          checkpoint=journal, since=SINCE, until=UNTIL, batch_size=7)
+        ci.page_source()
+    ci.checkpoint.flush()
+    
+    recorded = set(crawl_checkpoint(journal).state['index'])
+    assert recorded == InWindow(site)
+    assert {link[len(HOME):] + '/' for link in ci.articles.FullLink} == InWindow(site)
+    
+    ### A journal written before the window was applied is trimmed when the crawl resumes
+    checkpoint = crawl_checkpoint(journal)
+    checkpoint.indexed('Old story', '/markets/2021/05/01/old-story/')
+    checkpoint.indexed('New story', '/markets/2021/06/01/new-story/')
+    checkpoint.flush()
+    resumed = create_index(HOME + '/markets', HOME, page_url=HOME + LISTING, checkpoint=journal,
+                           since=SINCE, until=UNTIL).go()
+    assert {link[len(HOME):] + '/' for link in resumed.articles.FullLink} == InWindow(site)
+
+def test_until_backfill_passes_over_newer_stored_articles(tmp_path):
+    ## The store holds the newest articles, and a backfill indexes the ones before them
+    store = article_store(str(tmp_path / 'index.db'))
+    split = dt.datetime(2021, 5, 14)
+    with replay_server(FixtureSite(30, 10, LISTING)) as server:
+        def Index(**window):
+            with redirect_stdout(io.StringIO()):
+                return create_index(server.url + '/markets', server.url, page_url=server.url + LISTING,
+                                    store=store, **window).go()
+        
+        assert len(Index(since=split).articles) == 13
+        backfill = Index(until=split).articles
+        assert len(backfill) == 17 and (backfill.Published < split).all()
+        assert len(store) == 30
+        
+        ### The newer articles are now all known, and stop the next run on its first article
+        assert Index(since=split).articles.empty
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import io, os
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pytest
+
+from scrape_coindesk import create_index, scrape_index, crawl_metrics, ArticleIndex, CanonicalLink
+from scrape_coindesk.dedup import link_filter
+from scrape_coindesk.replay import replay_server
+from sites import FixtureSite
+
+HOME    = "https://www.coindesk.com"
+LISTING = '/markets/{page}'
+
+@pytest.mark.parametrize('capacity', [None, 1000])
+def test_link_filter_keeps_canonical_links_between_runs(tmp_path, capacity):
+    path   = str(tmp_path / 'seen')
+    seen   = link_filter(path, capacity=capacity)
+    assert seen.add(HOME + '/markets/2021/05/15/story/')
+    assert not seen.add(HOME.upper().replace('HTTPS', 'https') + '/markets/2021/05/15/story?utm_source=x')
+    assert len(seen) == 1
+    seen.close()
+    
+    seen = link_filter(path)
+    assert HOME + '/markets/2021/05/15/story' in seen
+    assert HOME + '/markets/2021/05/15/other' not in seen
+    assert (seen.bits is not None) == (capacity is not None)
+
+def test_article_index_keys_every_link_on_its_canonical_form():
+    ## Plain article paths take the column-wise path, the others go through `CanonicalLink`
+    links = ['/markets/2021/05/15/story/', '/markets/2021/05/15/story?utm_source=x',
+             '//markets//2021/05/14/other/', HOME.upper().replace('HTTPS', 'https') + ':443/tech/x/',
+             '/policy/2021/05/13/rule?b=2&a=1#top', '/markets/2021/02/30/bad-date/']
+    articles = ArticleIndex([(str(i), link) for i, link in enumerate(links)], HOME)
+    assert list(articles.FullLink) == list(dict.fromkeys(CanonicalLink(HOME + link) for link in links))
+    assert list(articles.Href) == [link for i, link in enumerate(links) if i != 1]
+    assert articles.Published.iloc[0] == pd.Timestamp(2021, 5, 15) and articles.Published.isna().sum() == 2
+    
+    ### Link extensions and the dedup filter leave articles out
+    sections = ArticleIndex([(str(i), link) for i, link in enumerate(links)], HOME, 'markets', 'policy',
+                            dedup={CanonicalLink(HOME + links[4])})
+    assert [link[len(HOME):] for link in sections.FullLink] == ['/markets/2021/05/15/story',
+                                                               '/markets/2021/05/14/other',
+                                                               '/markets/2021/02/30/bad-date']
+
+def Crawl(server, folder, dedup):
+    ## Index the replayed site and download its articles, returning the links downloaded
+    with redirect_stdout(io.StringIO()):
+        ci = create_index(server.url + LISTING.format(page=1), server.url,
+                          page_url=server.url + LISTING, requests_per_second=100,
+                          metrics=crawl_metrics(), dedup=dedup).go()
+        si = scrape_index(ci.articles, server.url, folder, concurrency=4, requests_per_second=100,
+                          browser_fallback=False, metrics=crawl_metrics(), dedup=dedup)
+        si.scrape()
+    return set(ci.articles.FullLink), set(si.articles.FullLink[si.articles.Downloaded])
+
+def test_failed_downloads_are_indexed_again(tmp_path):
+    ## Every third article page is missing on the first run
+    site  = FixtureSite(30, 10, LISTING)
+    pages = {path: html for path, html in site.items() if not path.endswith(('0/', '3/', '6/'))}
+    os.makedirs(tmp_path / 'articles')
+    dedup = str(tmp_path / 'seen')
+    with replay_server(pages) as server:
+        indexed, downloaded = Crawl(server, str(tmp_path / 'articles'), dedup)
+        assert len(indexed) == 30 and 0 < len(downloaded) < 30
+        assert set(link_filter(dedup).links) == downloaded
+        
+        ### The next run only indexes the articles that were not downloaded
+        pages.update(site)
+        again, downloaded_again = Crawl(server, str(tmp_path / 'articles'), dedup)
+        assert again == indexed - downloaded == downloaded_again
+        
+        ### And once they are all downloaded, nothing is left to index
+        assert Crawl(server, str(tmp_path / 'articles'), dedup) == (set(), set())
+
+def test_articles_are_fetched_from_the_listed_link(tmp_path):
+    ## The site only serves the article paths as listed, with their trailing slash
+    os.makedirs(tmp_path / 'articles')
+    with replay_server(FixtureSite(20, 10, LISTING)) as server:
+        indexed, downloaded = Crawl(server, str(tmp_path / 'articles'), None)
+        assert len(downloaded) == 20
+        assert server.stats['not_found'] == 1   # The listing page after the last one
+    
+    ### The articles are still keyed on their canonical links
+    assert not any(link.endswith('/') for link in indexed)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import time
+import urllib.error
+from urllib.parse import urlsplit
+
+import pytest
+
+from scrape_coindesk.fetch import fetch_engine
+from scrape_coindesk.scheduler import crawl_scheduler
+from scrape_coindesk.metrics import crawl_metrics
+from scrape_coindesk.store import page_cache
+from scrape_coindesk.replay import replay_server
+from scrape_coindesk.extract import ExtractArticle, ArticleRendered
+
+ARTICLES = ['/coindesk_article_1.html', '/coindesk_article_2.html', '/coindesk_article_3.html']
+
+def Engine(**kwargs):
+    kwargs.setdefault('scheduler', crawl_scheduler(100, backoff_base=.01, max_retries=5))
+    return fetch_engine(metrics=crawl_metrics(), **kwargs)
+
+def test_fetch_html_returns_the_served_page(server, fixture_pages):
+    engine = Engine()
+    page   = engine.fetch_html(server.url + ARTICLES[0])
+    
+    assert page == fixture_pages[ARTICLES[0]]
+    assert engine.metrics.counters['requests'] == 1
+    assert engine.metrics.counters['bytes_fetched'] == len(page.encode('utf-8'))
+
+def test_fetch_html_raises_on_missing_pages(server):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        Engine().fetch_html(server.url + '/missing.html')
+    assert error.value.code == 404
+
+def test_fresh_cached_pages_are_not_requested(server, tmp_path):
+    engine = Engine(cache=page_cache(str(tmp_path)))
+    first  = engine.fetch_html(server.url + ARTICLES[0])
+    second = engine.fetch_html(server.url + ARTICLES[0])
+    
+    assert first == second
+    assert server.stats['requests'] == 1
+    assert engine.metrics.counters['cache_hits'] == 1
+
+def test_request_html_revalidates_with_the_etag(server, tmp_path, fixture_pages):
+    ## Listing pages are always revalidated, and an unchanged page is answered with a 304
+    engine = Engine(cache=page_cache(str(tmp_path)), revalidate=True)
+    link   = server.url + ARTICLES[0]
+    engine.fetch_html(link)
+    assert engine.cache.lookup(link)['etag'] is not None
+    
+    page = engine.fetch_html(link)
+    assert page == fixture_pages[ARTICLES[0]]
+    assert server.stats['served'] == 1 and server.stats['not_modified'] == 1
+    assert engine.metrics.counters['cache_revalidated'] == 1
+
+def test_request_html_waits_out_retry_after(fixture_pages):
+    with replay_server(fixture_pages, throttle_rate=1, retry_after=3) as server:
+        engine = Engine()
+        link   = server.url + ARTICLES[0]
+        with pytest.raises(urllib.error.HTTPError) as error:
+            engine.request_html(link)
+    
+    assert error.value.code == 429
+    state = engine.scheduler.hosts[urlsplit(link).netloc]
+    assert state['blocked_until'] - time.monotonic() > 2
+    assert state['rate'] == 50
+
+def test_map_yields_every_article(server, fixture_pages):
+    engine  = Engine(concurrency=3)
+    jobs    = [(i, server.url + ARTICLES[i % 3]) for i in range(9)] + [(9, server.url + '/missing.html')]
+    results = {key: (article, source) for key, article, source in engine.map(jobs)}
+    
+    assert sorted(results) == list(range(10))
+    for i in range(9):
+        article, source = results[i]
+        assert source == 'http' and ArticleRendered(article)
+        assert article == ExtractArticle(fixture_pages[ARTICLES[i % 3]])
+    
+    ### A missing page is not worth retrying, its error is handed back in place of the article
+    assert isinstance(results[9][0], urllib.error.HTTPError)
+    assert engine.metrics.counters['retries'] == 0
+    assert engine.metrics.counters['failures'] == 1
+
+def test_map_retries_failed_requests(fixture_pages):
+    with replay_server(fixture_pages, failure_rate=.15, drop_rate=.05, seed=1) as server:
+        engine  = Engine(concurrency=4, scheduler=crawl_scheduler(100, backoff_base=.01, max_retries=20))
+        retried = []
+        jobs    = [(i, server.url + ARTICLES[i % 3]) for i in range(12)]
+        results = list(engine.map(jobs, on_retry=lambda key, link, attempt: retried.append(key)))
+    
+    assert sorted(key for key, _, _ in results) == list(range(12))
+    assert all(ArticleRendered(article) for _, article, _ in results)
+    assert server.stats['failed'] + server.stats['dropped'] > 0
+    assert len(retried) == engine.metrics.counters['retries'] == server.stats['failed'] + server.stats['dropped']
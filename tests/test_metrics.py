@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import json
+
+from scrape_coindesk.metrics import crawl_metrics
+
+def Metrics():
+    ## Three writes and one extraction, spread over the buckets, with a few counters
+    metrics = crawl_metrics(buckets=(1, .1, .01))
+    for seconds in (.005, .05, 5):
+        metrics.observe('write', seconds)
+    metrics.observe('extraction', .01)
+    metrics.count('requests', 4)
+    metrics.count('bytes_fetched', 1000)
+    metrics.count('near_duplicates')
+    return metrics
+
+def test_observations_fall_in_their_buckets():
+    metrics = Metrics()
+    assert metrics.buckets == (.01, .1, 1)
+    assert metrics.histograms['write']['counts'] == [1, 1, 0, 1]
+    assert metrics.histograms['write']['count'] == 3
+    assert abs(metrics.histograms['write']['sum'] - 5.055) < 1e-9
+    
+    ### A bucket's upper bound is inclusive
+    assert metrics.histograms['extraction']['counts'] == [1, 0, 0, 0]
+
+def test_counters_add_up_and_reset():
+    metrics = Metrics()
+    metrics.count('requests')
+    assert metrics.counters['requests'] == 5 and metrics.counters['bytes_fetched'] == 1000
+    assert metrics.counters['near_duplicates'] == 1 and metrics.counters['failures'] == 0
+    
+    with metrics.timer('navigation'):
+        pass
+    assert metrics.histograms['navigation']['count'] == 1
+    
+    metrics.reset()
+    assert metrics.histograms == {} and set(metrics.counters.values()) == {0}
+
+def test_hooks_receive_every_observation():
+    metrics, seen = crawl_metrics(), []
+    metrics.add_hook(lambda kind, name, value: seen.append((kind, name, value)))
+    metrics.observe('write', .5)
+    metrics.count('requests', 2)
+    with metrics.timer('extraction'):
+        pass
+    
+    assert seen[:2] == [('timing', 'write', .5), ('counter', 'requests', 2)]
+    assert seen[2][:2] == ('timing', 'extraction') and seen[2][2] >= 0
+
+def test_to_json():
+    summary = json.loads(Metrics().to_json())
+    assert summary['counters']['requests'] == 4
+    assert summary['stages']['write']['count'] == 3
+    assert summary['stages']['write']['buckets'] == {'0.01': 1, '0.1': 1, '1': 0, '+Inf': 1}
+    assert summary['pages_per_second'] > 0
+
+def test_to_prometheus():
+    lines = Metrics().to_prometheus().splitlines()
+    assert "# TYPE crawl_requests_total counter" in lines
+    assert "crawl_requests_total 4" in lines
+    assert "crawl_near_duplicates_total 1" in lines
+    assert "# TYPE crawl_stage_seconds histogram" in lines
+    
+    ### The buckets are cumulative, and end with the +Inf bucket holding every observation
+    buckets = [line.rsplit(' ', 1) for line in lines if line.startswith('crawl_stage_seconds_bucket{stage="write"')]
+    assert buckets == [['crawl_stage_seconds_bucket{stage="write",le="0.01"}', '1'],
+                       ['crawl_stage_seconds_bucket{stage="write",le="0.1"}', '2'],
+                       ['crawl_stage_seconds_bucket{stage="write",le="1"}', '2'],
+                       ['crawl_stage_seconds_bucket{stage="write",le="+Inf"}', '3']]
+    assert 'crawl_stage_seconds_sum{stage="write"} 5.055' in lines
+    assert 'crawl_stage_seconds_count{stage="write"} 3' in lines
+
+def test_dump_picks_the_format_from_the_file_name(tmp_path):
+    metrics = Metrics()
+    metrics.dump(str(tmp_path / 'crawl.prom'))
+    metrics.dump(str(tmp_path / 'crawl.json'))
+    
+    assert (tmp_path / 'crawl.prom').read_text().startswith('# TYPE crawl_requests_total counter')
+    assert json.loads((tmp_path / 'crawl.json').read_text())['counters']['bytes_fetched'] == 1000
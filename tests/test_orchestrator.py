@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import io, os
+from contextlib import redirect_stdout
+
+from scrape_coindesk import crawl_metrics
+from scrape_coindesk.dedup import link_filter
+from scrape_coindesk.orchestrator import crawl_orchestrator
+from scrape_coindesk.replay import replay_server
+from scrape_coindesk.similarity import near_duplicates
+from sites import FixtureSite
+
+## (section, articles, first article number). Articles 20 to 29 are cross-posted to both sections.
+SECTIONS = [('markets', 30, 0), ('policy', 20, 20)]
+
+def Site():
+    site = {}
+    for name, n_articles, first in SECTIONS:
+        site.update(FixtureSite(n_articles, 10, f'/{name}/{{page}}', first))
+    return site
+
+def Crawl(server, folder, **kwargs):
+    sections = [{'name': name, 'index_site': server.url + f'/{name}/1',
+                 'page_url': server.url + f'/{name}/{{page}}'} for name, _, _ in SECTIONS]
+    co = crawl_orchestrator(sections, folder, concurrency=4, requests_per_second=100,
+                            browser_fallback=False, metrics=crawl_metrics(), **kwargs)
+    with redirect_stdout(io.StringIO()):
+        return co, co.run()
+
+def Saved(folder):
+    return sum(len(files) for _, _, files in os.walk(folder))
+
+def test_cross_posted_articles_are_downloaded_once(tmp_path):
+    site = Site()
+    with replay_server(site) as server:
+        co, articles = Crawl(server, str(tmp_path))
+        served = server.stats['served'] - (len(site) - 40)   # Less the listing pages
+    
+    assert len(articles) == articles.FullLink.nunique() == 40
+    assert articles.Downloaded.all() and served == 40 == Saved(tmp_path)
+    assert set(articles.Section) == {'markets', 'policy'}
+    assert list(co.report.Section) == ['markets', 'policy'] and co.report.Error.isna().all()
+    assert co.report.Indexed.sum() == co.report.Downloaded.sum() == 40
+
+def test_downloaded_articles_are_left_out_of_the_next_run(tmp_path):
+    dedup = str(tmp_path / 'seen')
+    with replay_server(Site()) as server:
+        _, first  = Crawl(server, str(tmp_path / 'first'), dedup=dedup)
+        co, second = Crawl(server, str(tmp_path / 'second'), dedup=dedup)
+    
+    assert len(first) == len(link_filter(dedup)) == 40
+    assert len(second) == 0 and Saved(tmp_path / 'second') == 0
+    assert co.report.Error.isna().all()
+
+def test_near_duplicates_are_shared_by_the_sections(tmp_path):
+    ## `FixtureSite` repeats the three saved articles, so all but three pages are copies
+    index = str(tmp_path / 'similar.db')
+    with replay_server(Site()) as server:
+        _, articles = Crawl(server, str(tmp_path / 'articles'), duplicates=index,
+                            skip_duplicates=True)
+    
+    assert articles.Downloaded.all()
+    assert articles.Duplicate_Of.notna().sum() == len(articles) - 3
+    assert Saved(tmp_path / 'articles') == 3
+    assert len(near_duplicates(index).duplicates()) == len(articles) - 3
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from scrape_coindesk.fetch import fetch_engine
+from scrape_coindesk.pipeline import parse_pipeline
+from scrape_coindesk.scheduler import crawl_scheduler
+from scrape_coindesk.metrics import crawl_metrics
+from scrape_coindesk.extract import ExtractArticle
+
+ARTICLES = ['/coindesk_article_1.html', '/coindesk_article_2.html', '/coindesk_article_3.html']
+
+def Parse(server, cores, monkeypatch):
+    ## Run 12 articles through a pipeline built on a machine with `cores` cores
+    monkeypatch.setattr(os, 'cpu_count', lambda: cores)
+    engine   = fetch_engine(concurrency=4, scheduler=crawl_scheduler(100), metrics=crawl_metrics())
+    pipeline = parse_pipeline(engine, processes=2, batch_size=5)
+    jobs     = [(i, server.url + ARTICLES[i % 3]) for i in range(12)]
+    batches  = list(pipeline.map(jobs))
+    return pipeline, batches
+
+@pytest.mark.parametrize('cores', [1, 2])
+def test_every_article_is_parsed(server, fixture_pages, monkeypatch, cores):
+    pipeline, batches = Parse(server, cores, monkeypatch)
+    assert pipeline.threads == (cores == 1)
+    if pipeline.threads:   # Parsed chunks can top a batch up past `batch_size`
+        assert all(len(batch) <= 5 for batch in batches)
+    
+    articles = {key: article for batch in batches for key, article, source in batch}
+    assert sorted(articles) == list(range(12))
+    for key, article in articles.items():
+        assert article == ExtractArticle(fixture_pages[ARTICLES[key % 3]])
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import json
+import pickle
+
+import pytest
+
+from scrape_coindesk import extract
+from scrape_coindesk.cli import ParseArgs
+from scrape_coindesk.crawl import create_index
+from scrape_coindesk.profiles import COINDESK, GENERIC, LoadProfile, Alternation
+
+def test_coindesk_profile_compiles_to_the_default_patterns():
+    profile = LoadProfile('coindesk')
+    assert profile.anchor.pattern == extract.ARTICLE_ANCHOR.pattern
+    assert profile.listing_time.pattern == extract.LISTING_TIME.pattern
+    assert profile.elements.pattern == extract.ARTICLE_ELEMENTS.pattern
+    assert profile.markup.pattern == extract.ARTICLE_MARKUP.pattern
+    assert profile.headers.pattern == extract.ARTICLE_HEADERS.pattern
+    assert profile.excluded_titles == frozenset(extract.EXCLUDED_TITLES)
+    assert profile.excluded_title_parts.pattern == extract.EXCLUDED_TITLE_PARTS.pattern
+    assert profile.boilerplate.pattern == extract.ARTICLE_BOILERPLATE.pattern
+
+def test_coindesk_profile_extracts_the_same_as_the_defaults(fixture_pages):
+    profile = LoadProfile('coindesk')
+    for name, page in fixture_pages.items():
+        if 'listing' in name:
+            assert list(profile.dated_article_links(page)) == list(extract.DatedArticleLinks(page))
+        else:
+            assert profile.extract_article(page) == extract.ExtractArticle(page)
+    
+    ### The boilerplate patterns are regexes, e.g. its `.` matches any character
+    line = 'Please consider using a different web browser for better experience!'
+    assert profile.boilerplate.sub('', line) == extract.ARTICLE_BOILERPLATE.sub('', line) == ''
+
+def test_filters_take_literals_or_a_regex():
+    assert Alternation(['by', 'a.b', 'by the']).pattern == r'by\ the|a\.b|by'
+    assert Alternation('a.b|c').pattern == 'a.b|c'
+    assert Alternation([]) is None and Alternation('') is None
+
+@pytest.mark.parametrize('spec', [COINDESK, GENERIC])
+def test_profiles_load_from_json_and_pickle(tmp_path, spec):
+    path = tmp_path / 'profile.json'
+    path.write_text(json.dumps(spec), encoding='utf-8')
+    
+    profile = LoadProfile(str(path))
+    for compiled in (profile, pickle.loads(pickle.dumps(profile))):
+        assert compiled.name == spec['name']
+        assert compiled.boilerplate == LoadProfile(spec).boilerplate
+        assert compiled.excluded_title_parts.pattern == LoadProfile(spec).excluded_title_parts.pattern
+
+def test_the_profile_home_is_the_default_home_page():
+    listing = 'http://127.0.0.1:8000/markets/{page}'
+    def Home(*home, **kwargs):
+        return create_index(listing.format(page=1), *home, page_url=listing, **kwargs).index_site_home_link
+    
+    assert Home(profile='coindesk') == COINDESK['home']
+    assert Home() == Home(profile='generic') == 'http://127.0.0.1:8000'
+    assert Home('https://example.com', profile='coindesk') == 'https://example.com'
+    
+    ### The command line takes the same defaults
+    assert ParseArgs(['out', '--site', listing.format(page=1), '--profile', 'coindesk']).home == COINDESK['home']
+    assert ParseArgs(['out', '--site', listing.format(page=1)]).home == 'http://127.0.0.1:8000'
+    with pytest.raises(SystemExit):
+        ParseArgs(['out', '--profile', 'no-such-profile'])
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import io, os, socket, sys, types
+import urllib.error
+from contextlib import redirect_stdout
+
+import pytest
+
+from scrape_coindesk import ArticleIndex, crawl_metrics, scrape_index
+from scrape_coindesk.scheduler import Retryable, crawl_scheduler
+from sites import FIXTURES, listing_pool
+
+def HTTPError(code):
+    return urllib.error.HTTPError('http://127.0.0.1/', code, 'error', {}, None)
+
+@pytest.mark.parametrize('error', [HTTPError(429), HTTPError(500), HTTPError(503),
+                                   urllib.error.URLError('refused'), socket.timeout('timed out'),
+                                   TimeoutError(), ConnectionResetError(), ConnectionRefusedError()])
+def test_transient_errors_are_retried(error):
+    assert Retryable(error)
+
+@pytest.mark.parametrize('error', [HTTPError(404), HTTPError(403), ValueError(), KeyError('x'),
+                                   TypeError(), AttributeError(), IndexError(), RuntimeError()])
+def test_other_errors_are_not_retried(error):
+    assert not Retryable(error)
+
+def test_browser_errors_are_retried(monkeypatch):
+    ## Stand in for selenium's exceptions module, which is not needed to run the crawl
+    class WebDriverException(Exception):
+        pass
+    exceptions = types.ModuleType('selenium.common.exceptions')
+    exceptions.WebDriverException = WebDriverException
+    monkeypatch.setitem(sys.modules, 'selenium.common.exceptions', exceptions)
+
+    assert Retryable(WebDriverException('browser crashed'))
+    assert not Retryable(RuntimeError())
+
+class article_driver:
+    ## Stands in for the Firefox driver of the one-at-a-time loop. Every link is served the saved
+    ## article page, after raising the errors queued up for it, one per visit.
+    def __init__(self, errors):
+        with open(os.path.join(FIXTURES, 'coindesk_article_1.html'), encoding='utf-8') as f:
+            self.article = f.read()
+        self.errors, self.visits = errors, []
+    
+    def get(self, link):
+        self.visits.append(link.rsplit('/', 1)[-1])
+        if self.errors.get(self.visits[-1]):
+            raise self.errors[self.visits[-1]].pop(0)
+        self.page_source = self.article
+    
+    def quit(self):
+        pass
+
+def Scrape(folder, errors):
+    articles = ArticleIndex([(f"Story {i}", f"/markets/2021/05/15/story-{i}") for i in range(3)],
+                            "https://www.coindesk.com")
+    driver   = article_driver(errors)
+    si = scrape_index(articles, "https://www.coindesk.com", str(folder), pool=listing_pool(driver),
+                      scheduler=crawl_scheduler(100, backoff_base=.01), metrics=crawl_metrics())
+    with redirect_stdout(io.StringIO()):
+        si.scrape()
+    return si, driver.visits
+
+def test_only_retryable_errors_are_downloaded_again(tmp_path):
+    ## A dropped connection is tried again, a parsing bug is given up on at once
+    si, visits = Scrape(tmp_path, {'story-0': [ConnectionResetError()], 'story-1': [ValueError()]})
+    assert list(si.articles.Downloaded) == [True, False, True]
+    assert visits == ['story-0', 'story-1', 'story-2', 'story-0']
+    assert si.metrics.counters['retries'] == 1 and si.metrics.counters['failures'] == 1
+
+def test_interrupting_the_download_stops_it(tmp_path):
+    with pytest.raises(KeyboardInterrupt):
+        Scrape(tmp_path, {'story-1': [KeyboardInterrupt()]})
+    assert sorted(os.listdir(tmp_path)) == ['Story 0.txt']
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from scrape_coindesk.extract import ExtractArticle
+from scrape_coindesk.similarity import near_duplicates
+
+def Article(fixture_pages, n):
+    return ExtractArticle(fixture_pages[f'/coindesk_article_{n}.html'])
+
+def test_republished_articles_are_near_duplicates(tmp_path, fixture_pages):
+    index    = near_duplicates(str(tmp_path / 'similar.db'))
+    original = Article(fixture_pages, 1)
+    assert index.add('original', original) is None
+    
+    ### The same story with a new headline and a sentence added
+    updated = ['Title: Updated'] + original[1:] + ['UPDATE: This story was updated with a comment.']
+    key, similarity = index.add('updated', updated)
+    assert key == 'original' and similarity >= index.threshold
+    
+    ### A different article is not
+    assert index.add('other', Article(fixture_pages, 2)) is None
+    assert len(index) == 3 and 'updated' in index
+    assert index.duplicates() == [('updated', 'original', similarity)]
+    index.close()
+
+def test_the_index_is_kept_between_runs(tmp_path, fixture_pages):
+    index = near_duplicates(str(tmp_path / 'similar.db'))
+    index.add('original', Article(fixture_pages, 1))
+    index.close()
+    
+    index = near_duplicates(str(tmp_path / 'similar.db'))
+    assert index.check(Article(fixture_pages, 1))[0] == 'original'
+    assert index.check(Article(fixture_pages, 3)) is None
+    index.close()
+
+def test_scan_finds_the_copies_in_a_download_folder(tmp_path, fixture_pages):
+    folder = tmp_path / 'articles'
+    folder.mkdir()
+    for name, n in (('a', 1), ('b', 2), ('c', 1)):
+        (folder / f'{name}.txt').write_text('\n'.join(Article(fixture_pages, n)), encoding='utf-8')
+    
+    index = near_duplicates(str(tmp_path / 'similar.db'))
+    found = list(index.scan(str(folder)))
+    assert len(found) == 1 and {found[0][0], found[0][1]} <= {'a.txt', 'c.txt'}
+    assert found[0][2] == 1.0
+    index.close()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import io, os, time
+import datetime as dt
+from contextlib import redirect_stdout
+
+from scrape_coindesk.crawl import ArticleIndex, create_index, scrape_index
+from scrape_coindesk.extract import DatedArticleLinks
+from scrape_coindesk.store import article_store, page_cache
+from scrape_coindesk.replay import replay_server
+from sites import FixtureSite
+
+HOME = "https://www.coindesk.com"
+
+def Listing(fixture_pages):
+    return ArticleIndex(DatedArticleLinks(fixture_pages['/coindesk_listing.html']), HOME)
+
+def test_article_store_keeps_the_index_between_runs(tmp_path, fixture_pages):
+    articles = Listing(fixture_pages)
+    store    = article_store(str(tmp_path / 'index.db'))
+    store.upsert(articles)
+    store.close()
+    
+    store = article_store(str(tmp_path / 'index.db'))
+    assert len(store) == len(articles) > 0
+    assert articles.FullLink.iloc[0] in store
+    assert HOME + '/not-indexed' not in store
+    
+    stored = store.to_frame()
+    assert list(stored.columns) == article_store.columns
+    assert set(stored.FullLink) == set(articles.FullLink)
+    assert (stored.Published.to_numpy() == articles.loc[stored.index, 'Published'].to_numpy()).all()
+
+def test_downloads_are_kept_when_indexed_again(tmp_path, fixture_pages):
+    articles = Listing(fixture_pages)
+    store    = article_store(str(tmp_path / 'index.db'))
+    store.upsert(articles)
+    
+    done = list(articles.FullLink[:3])
+    store.mark_downloaded(done)
+    assert set(store.pending().FullLink) == set(articles.FullLink) - set(done)
+    
+    ### The next run indexes the same articles, none downloaded
+    store.upsert(articles)
+    assert len(store) == len(articles)
+    assert set(store.pending().FullLink) == set(articles.FullLink) - set(done)
+    assert store.pending(limit=2).shape[0] == 2
+
+def test_between_reads_a_date_range(tmp_path, fixture_pages):
+    articles = Listing(fixture_pages)
+    store    = article_store(str(tmp_path / 'index.db'))
+    store.upsert(articles)
+    
+    published = articles.Published.dropna().sort_values()
+    since, until = published.iloc[len(published) // 4], published.iloc[3 * len(published) // 4]
+    window = store.between(since, until)
+    
+    expected = articles[(articles.Published >= since) & (articles.Published < until)]
+    assert set(window.FullLink) == set(expected.FullLink)
+    assert window.Published.is_monotonic_increasing
+    assert store.between(dt.date(1990, 1, 1), dt.date(1990, 2, 1)).empty
+    
+    store.mark_downloaded(window.FullLink[:1])
+    assert len(store.between(since, until, pending=True)) == len(window) - 1
+
+def test_pages_read_the_store_a_page_at_a_time(tmp_path, fixture_pages):
+    articles = Listing(fixture_pages)
+    store    = article_store(str(tmp_path / 'index.db'))
+    store.upsert(articles)
+    
+    pages = list(store.pages(4, pending=False))
+    assert [len(page) for page in pages[:-1]] == [4] * (len(pages) - 1) and 0 < len(pages[-1]) <= 4
+    assert [link for page in pages for link in page.FullLink] == list(store.to_frame().FullLink)
+    
+    ### Downloads flagged while the pages are read do not make the next pages skip articles
+    read = []
+    for page in store.pages(4):
+        read += list(page.FullLink)
+        store.mark_downloaded(page.FullLink[:2])
+    assert read == list(articles.FullLink) and len(store.pending()) == len(articles) // 2
+    
+    ### A date range is read oldest first
+    since = articles.Published.min() + dt.timedelta(days=1)
+    window = [link for page in store.pages(3, pending=False, since=since) for link in page.FullLink]
+    assert window == list(store.between(since).FullLink)
+
+def test_scrape_reads_the_store_a_page_at_a_time(tmp_path):
+    store = article_store(str(tmp_path / 'index.db'))
+    os.makedirs(tmp_path / 'articles')
+    with replay_server(FixtureSite(30, 10, '/markets/{page}')) as server, redirect_stdout(io.StringIO()):
+        create_index(server.url + '/markets/1', server.url, page_url=server.url + '/markets/{page}',
+                     store=store).go()
+        
+        ### Every article shares its title with articles on the other pages
+        with store.conn:
+            store.conn.execute("UPDATE articles SET title = 'Story ' || (rowid % 3)")
+        si = scrape_index(None, server.url, str(tmp_path / 'articles'), store=store, page_size=7,
+                          concurrency=4, requests_per_second=100, browser_fallback=False)
+        si.scrape()
+    
+    assert len(si.articles) == 30 and si.articles.Downloaded.all()
+    assert len(os.listdir(tmp_path / 'articles')) == 30 == si.articles.File.nunique()
+    assert len(store.pending()) == 0
+
+def test_corpus_writer_reads_single_articles_back(tmp_path, fixture_pages):
+    from scrape_coindesk.extract import ExtractArticle
+    from scrape_coindesk.store import corpus_writer
+    
+    ### A tiny shard size, so every article after the first starts a new shard
+    articles = {f"{HOME}/markets/{i}": ExtractArticle(fixture_pages[f'/coindesk_article_{i}.html'])
+                for i in (1, 2, 3)}
+    corpus = corpus_writer(str(tmp_path), shard_size=1)
+    for link, article in articles.items():
+        corpus.write(article, 'index title', link)
+    corpus.close()
+    
+    assert len([f for f in os.listdir(tmp_path) if f.endswith('.jsonl.gz')]) == 3
+    corpus = corpus_writer(str(tmp_path))
+    assert corpus.urls() == set(articles)
+    for link, article in articles.items():
+        fields = corpus.read(link)
+        assert fields['url'] == link
+        assert fields['title'] == article[0][len('Title: '):]
+        assert len(fields['paragraphs']) > 0
+    
+    ### Whole shards read back in order, and a new run appends to the last shard
+    assert [fields['url'] for fields in corpus] == list(articles)
+    corpus.write(articles[f"{HOME}/markets/1"], '', f"{HOME}/markets/4")
+    corpus.close()
+    assert len([f for f in os.listdir(tmp_path) if f.endswith('.jsonl.gz')]) == 3
+    assert len(corpus_writer(str(tmp_path)).urls()) == 4
+
+def test_page_cache_serves_pages_until_their_ttl(tmp_path, fixture_pages):
+    page  = fixture_pages['/coindesk_article_1.html']
+    cache = page_cache(str(tmp_path), ttl=3600)
+    cache.put(HOME + '/a', page, etag='"abc"', last_modified='Sat, 15 May 2021 14:00:00 GMT')
+    assert cache.get(HOME + '/a') == page
+    assert HOME + '/a' in cache and cache.get(HOME + '/b') is None
+    
+    ### An expired page needs revalidating, with the validators it was saved with
+    expired = page_cache(str(tmp_path), ttl=0)
+    time.sleep(.01)
+    assert expired.get(HOME + '/a') is None
+    assert expired.get(HOME + '/a', max_age=float('inf')) == page
+    assert expired.validators(expired.lookup(HOME + '/a')) == {
+        'If-None-Match': '"abc"', 'If-Modified-Since': 'Sat, 15 May 2021 14:00:00 GMT'}
+    
+    ### Until the site answers 304 Not Modified
+    expired.ttl = 60
+    expired.touch(HOME + '/a')
+    assert expired.get(HOME + '/a') == page
+
+def test_page_cache_shares_identical_pages(tmp_path, fixture_pages):
+    page  = fixture_pages['/coindesk_article_1.html']
+    cache = page_cache(str(tmp_path))
+    cache.put(HOME + '/a', page)
+    size = cache.size
+    cache.put(HOME + '/b', page)
+    
+    assert len(cache) == 2 and cache.size == size
+    assert cache.lookup(HOME + '/a')['digest'] == cache.lookup(HOME + '/b')['digest']
+
+def test_page_cache_evicts_the_least_recently_used_pages(tmp_path, fixture_pages):
+    pages = [fixture_pages[f'/coindesk_article_{i}.html'] for i in (1, 2)]
+    pages.append(pages[1][:len(pages[1]) // 2])   # Smaller than the page it replaces
+    cache = page_cache(str(tmp_path))
+    for i, page in enumerate(pages[:2]):
+        cache.put(HOME + f'/{i}', page)
+        time.sleep(.01)
+    
+    ### Reading the first page makes the second the least recently used, and the cache only
+    ### has room for two pages
+    time.sleep(.01)
+    cache.get(HOME + '/0')
+    cache.max_size = cache.size + 1
+    time.sleep(.01)
+    cache.put(HOME + '/2', pages[2])
+    
+    assert HOME + '/1' not in cache
+    assert cache.get(HOME + '/0') == pages[0] and cache.get(HOME + '/2') == pages[2]
+    assert cache.size <= cache.max_size